@@ -0,0 +1,134 @@
+"""
+Compare the safe_get based location parser with the compiled extractors (row dicts
+and columnar RecordBatch output), and the stdlib JSON decoder with orjson when it is
+installed.
+
+    python -m benchmarks.bench_parse --pages 200 --edges 50
+"""
+import argparse
+import datetime
+import json
+import logging
+import time
+import tracemalloc
+import pyarrow as pa
+from example_client.base_client import BaseClient
+from example_client.endpoints.locations import parse_locations
+from utils import extractors
+
+def make_page(page_no, edges):
+    return {
+        "data": {
+            "item": {
+                "locations": {
+                    "edges": [
+                        {
+                            "node": {
+                                "id": f"loc-{page_no}-{i}",
+                                "location": f"Location {i % 97}",
+                                "text": "Some descriptive text about the location",
+                                "interestScore": {"usersInterested": i % 1000, "usersVoted": i % 313},
+                                "displayableProperty": {
+                                    "qualifiersInMarkdownList": [{"markdown": "**bold**"}, {"markdown": "_it_"}],
+                                    "value": {"markdown": "*value*"},
+                                },
+                            }
+                        }
+                        for i in range(edges)
+                    ]
+                }
+            }
+        }
+    }
+
+def parse_locations_safe_get(data, item_id, config=None):
+    """The parser before compiled extractors: one safe_get walk per column."""
+    safe_get = BaseClient.safe_get
+    extract_array = BaseClient.extract_array
+
+    master_list = []
+    for obj in data:
+        list_data = safe_get(obj, "data", "item", "locations", "edges")
+        if list_data:
+            master_list.extend(list_data)
+
+    locations_data = []
+    for item_edge in master_list:
+        node_data = safe_get(item_edge, "node")
+        if not node_data:
+            continue
+        raw_list = extract_array(
+            safe_get(node_data, "displayableProperty", "qualifiersInMarkdownList"),
+            [("markdown",)]
+        )
+        locations_data.append({
+            "item_id": item_id,
+            "id": safe_get(node_data, "id"),
+            "location": safe_get(node_data, "location"),
+            "text": safe_get(node_data, "text"),
+            "usersInterested": safe_get(node_data, "interestScore", "usersInterested"),
+            "usersVoted": safe_get(node_data, "interestScore", "usersVoted"),
+            "markdownValueList": json.dumps(raw_list),
+            "markdownValue": safe_get(node_data, "displayableProperty", "value", "markdown"),
+            "recorded_at": datetime.datetime.utcnow().isoformat()
+        })
+    return locations_data
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def retained_bytes(func):
+    """Python heap (traced by tracemalloc) plus Arrow memory held by func's result."""
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size += pa.total_allocated_bytes() - arrow_before
+    del result
+    return size
+
+def without_timestamp(rows):
+    return [{k: v for k, v in row.items() if k != "recorded_at"} for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Location parser benchmark")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--edges", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    pages = [make_page(page_no, args.edges) for page_no in range(args.pages)]
+    bodies = [json.dumps(page).encode("utf-8") for page in pages]
+    rows = args.pages * args.edges
+
+    assert without_timestamp(parse_locations(pages, "1")) == without_timestamp(parse_locations_safe_get(pages, "1"))
+
+    columnar = {"columnar": True}
+    assert without_timestamp(parse_locations(pages, "1", columnar).to_pylist()) == without_timestamp(parse_locations(pages, "1"))
+
+    for name, parse, config in [
+        ("safe_get", parse_locations_safe_get, None),
+        ("compiled", parse_locations, None),
+        ("columnar", parse_locations, columnar),
+    ]:
+        best = best_of(args.repeat, lambda: parse(pages, "1", config))
+        retained = retained_bytes(lambda: parse(pages, "1", config))
+        print(f"{name:>9}: {rows / best:>12,.0f} rows/sec ({best:.3f}s for {rows} rows, {retained / rows:,.0f} bytes/row held)")
+
+    decoders = [("json", json.loads)]
+    if extractors.orjson is not None:
+        decoders.append(("orjson", extractors.orjson.loads))
+    for name, decode in decoders:
+        best = best_of(args.repeat, lambda: [decode(body) for body in bodies])
+        print(f"{name:>9}: {len(bodies) / best:>12,.0f} pages/sec decoded ({best:.3f}s for {len(bodies)} pages)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+End-to-end throughput of main.py against benchmarks/mock_server.py, which stands in
+for both the proxies and the GraphQL API. Each engine runs in its own process with a
+fresh DuckDB file so peak RSS is per run.
+
+    python -m benchmarks.bench_pipeline --ids 2000 --latency 0.02 --error-429 0.02
+    python -m benchmarks.bench_pipeline --engines async -- --max-in-flight 400
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "BENCH_RESULT "
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Mock server did not start on port {port}")
+
+def server_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+def prepare_database(path):
+    import duckdb
+    from example_client.endpoints.locations import LOCATIONS_SCHEMA
+
+    columns = ", ".join(f'"{field.name}" {"BIGINT" if field.type == "int64" else "VARCHAR"}' for field in LOCATIONS_SCHEMA)
+    con = duckdb.connect(path)
+    con.execute(f"CREATE TABLE location_details ({columns})")
+    con.execute(
+        "CREATE TABLE failed_location_details_requests "
+        "(example_id VARCHAR, reason_code VARCHAR, error_message VARCHAR, recorded_at VARCHAR, table_name VARCHAR)"
+    )
+    con.close()
+
+def count_rows(path):
+    import duckdb
+
+    con = duckdb.connect(path)
+    rows = con.execute("SELECT count(*) FROM location_details").fetchone()[0]
+    failed = con.execute("SELECT count(*) FROM failed_location_details_requests").fetchone()[0]
+    con.close()
+    return rows, failed
+
+def run_child(args, main_args):
+    """Run main.main() in this process against the mock server and print one result line."""
+    db_path = os.path.join(args.workdir, "bench.duckdb")
+    for prefix in ("", "_2"):
+        os.environ[f"SCRAPOXY{prefix}_USER"] = "bench"
+        os.environ[f"SCRAPOXY{prefix}_TOKEN"] = "bench"
+        os.environ[f"SCRAPOXY{prefix}_PORT"] = str(args.port)
+    os.environ["SCRAPOXY_URL"] = "127.0.0.1"
+    os.environ["GRAPHQL_URL"] = f"http://127.0.0.1:{args.port}/"
+    os.environ["DUCKDB_TOKEN"] = db_path
+
+    sys.path.insert(0, REPO_ROOT)
+    prepare_database(db_path)
+    # logs/ and checkpoints/ land in the scratch directory
+    os.chdir(args.workdir)
+
+    # Every adapter reports to its ProxyPool, so wrapping observe sees each request.
+    from utils.proxy_pool import ProxyPool
+    latencies = []
+    lock = threading.Lock()
+    observe = ProxyPool.observe
+
+    def recording_observe(self, proxy, latency, status, error):
+        if latency is not None:
+            with lock:
+                latencies.append(latency)
+        return observe(self, proxy, latency, status, error)
+    ProxyPool.observe = recording_observe
+
+    import main
+    sys.argv = ["main.py"] + main_args
+    start = time.perf_counter()
+    main.main()
+    elapsed = time.perf_counter() - start
+
+    rows, failed = count_rows(db_path)
+    result = {
+        "seconds": elapsed,
+        "rows": rows,
+        "failed": failed,
+        "observed_requests": len(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def run_engine(args, engine, main_args):
+    with tempfile.TemporaryDirectory(prefix=f"bench-{engine}-") as workdir:
+        command = [
+            sys.executable, "-m", "benchmarks.bench_pipeline", "--child",
+            "--port", str(args.port), "--workdir", workdir, "--",
+            "--engine", engine, "--id-source", "mock", "--max-records", str(args.ids),
+        ] + main_args
+        before = server_stats(args.port)["requests"]
+        completed = subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        served = server_stats(args.port)["requests"] - before - 1
+
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result["served_requests"] = served
+            return result
+    raise RuntimeError(f"{engine} run exited with {completed.returncode} without a result")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against a local mock server")
+    parser.add_argument("--ids", type=int, default=1000, help="IDs to mine per run.")
+    parser.add_argument("--engines", nargs="+", choices=["threads", "async"], default=["threads", "async"])
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--latency-dist", default="lognormal")
+    parser.add_argument("--error-404", type=float, default=0.0)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    parser.add_argument("--redirect", type=float, default=0.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("main_args", nargs=argparse.REMAINDER, help="Extra main.py arguments after `--`.")
+    args = parser.parse_args()
+    main_args = args.main_args[1:] if args.main_args[:1] == ["--"] else args.main_args
+
+    if args.child:
+        run_child(args, main_args)
+        return
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_server", "--port", str(args.port),
+            "--pages", str(args.pages), "--page-size", str(args.page_size),
+            "--latency", str(args.latency), "--latency-dist", args.latency_dist,
+            "--error-404", str(args.error_404), "--error-429", str(args.error_429),
+            "--error-5xx", str(args.error_5xx), "--redirect", str(args.redirect),
+        ],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(args.port)
+        for engine in args.engines:
+            result = run_engine(args, engine, main_args)
+            seconds = result["seconds"]
+            p50 = f"{result['p50'] * 1000:.1f}ms" if result["p50"] is not None else "-"
+            p99 = f"{result['p99'] * 1000:.1f}ms" if result["p99"] is not None else "-"
+            print(
+                f"{engine:>8}: {result['served_requests'] / seconds:>8,.0f} req/sec, "
+                f"{result['rows'] / seconds:>10,.0f} rows/sec, p50 {p50}, p99 {p99}, "
+                f"peak RSS {result['peak_rss_mb']:,.0f} MB "
+                f"({result['rows']} rows, {result['failed']} failed, {seconds:.2f}s)"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare the pandas and Arrow DuckDB write paths.
+
+    python -m benchmarks.bench_writer --rows 200000 --batch-size 5000
+
+--bad-rows N also checks the writer's handling of values that do not fit the schema:
+N rows get "12k" as usersInterested, and flush_batch must write every other ID's rows
+and back up the rows of the IDs it rejects.
+"""
+import argparse
+import datetime
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+import duckdb
+from example_client.endpoints.locations import LOCATIONS_SCHEMA
+from utils.data_store import write_to_duckdb, write_arrow_to_duckdb, ArrowBatchBuilder
+from utils.sinks import DuckDBSink
+from utils.workers import flush_batch
+
+class NullProgress:
+    def increment_meta(self, key, increment=1):
+        pass
+
+def make_rows(count):
+    recorded_at = datetime.datetime.utcnow().isoformat()
+    return [
+        {
+            "item_id": f"{i // 50:07d}",
+            "id": f"loc-{i}",
+            "location": f"Location {i % 997}",
+            "text": "Some descriptive text about the location",
+            "usersInterested": i % 1000,
+            "usersVoted": i % 313,
+            "markdownValueList": '[{"markdown": "**bold**"}]',
+            "markdownValue": "*value*",
+            "recorded_at": recorded_at,
+        }
+        for i in range(count)
+    ]
+
+def create_table(con, table_name):
+    columns = ", ".join(f'"{field.name}" {duckdb_type(field.type)}' for field in LOCATIONS_SCHEMA)
+    con.execute(f"CREATE OR REPLACE TABLE {table_name} ({columns})")
+
+def duckdb_type(arrow_type):
+    return "BIGINT" if arrow_type == "int64" else "VARCHAR"
+
+def bench_pandas(rows, batch_size):
+    con = duckdb.connect()
+    create_table(con, "bench")
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        write_to_duckdb(rows[offset:offset + batch_size], "bench", con, NullProgress())
+    elapsed = time.perf_counter() - start
+    assert con.execute("SELECT COUNT(*) FROM bench").fetchone()[0] == len(rows)
+    con.close()
+    return elapsed
+
+def bench_arrow(rows, batch_size):
+    con = duckdb.connect()
+    create_table(con, "bench")
+    builder = ArrowBatchBuilder(LOCATIONS_SCHEMA)
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        builder.extend(rows[offset:offset + batch_size])
+        write_arrow_to_duckdb(builder.to_record_batch(), "bench", con, NullProgress())
+        builder.clear()
+    elapsed = time.perf_counter() - start
+    assert con.execute("SELECT COUNT(*) FROM bench").fetchone()[0] == len(rows)
+    con.close()
+    return elapsed
+
+def check_bad_rows(rows, batch_size, bad_rows):
+    rows = [dict(row) for row in rows]
+    step = max(1, len(rows) // bad_rows)
+    for row in rows[::step][:bad_rows]:
+        row["usersInterested"] = "12k"
+    rejected_ids = {row["item_id"] for row in rows if row["usersInterested"] == "12k"}
+    expected = sum(1 for row in rows if row["item_id"] not in rejected_ids)
+
+    config = {"table_name": "bench"}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-writer-") as workdir:
+        # write_to_disk backs rows up under ./failed_batches
+        os.chdir(workdir)
+        try:
+            path = os.path.join(workdir, "bench.duckdb")
+            con = duckdb.connect(path)
+            create_table(con, "bench")
+            con.close()
+            sink = DuckDBSink(path, "bench", NullProgress())
+            builder = ArrowBatchBuilder(LOCATIONS_SCHEMA)
+            for offset in range(0, len(rows), batch_size):
+                builder.extend(rows[offset:offset + batch_size])
+                flush_batch(builder, config, sink, NullProgress())
+            written = sink.con.execute("SELECT COUNT(*) FROM bench").fetchone()[0]
+            sink.close()
+            backups = glob.glob("failed_batches/*/*")
+        finally:
+            os.chdir(cwd)
+
+    print(f"bad rows: {written} of {expected} expected rows written, {len(rejected_ids)} IDs rejected into {len(backups)} backups")
+    return written == expected and bool(backups)
+
+def main():
+    parser = argparse.ArgumentParser(description="DuckDB writer benchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bad-rows", type=int, default=0, help="Check flush_batch with this many bad-typed rows.")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rows = make_rows(args.rows)
+
+    for name, bench in [("pandas", bench_pandas), ("arrow", bench_arrow)]:
+        best = min(bench(rows, args.batch_size) for _ in range(args.repeat))
+        print(f"{name:>6}: {args.rows / best:>12,.0f} rows/sec ({best:.3f}s for {args.rows} rows, batch {args.batch_size})")
+
+    if args.bad_rows and not check_bad_rows(rows, args.batch_size, args.bad_rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
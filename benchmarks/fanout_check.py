@@ -0,0 +1,145 @@
+"""
+Runs main.py once against benchmarks/mock_server.py and checks what reached the
+database: every mined ID is either written with all of its rows or dead-lettered,
+never both, nothing was logged as an error, and with --checkpoint the journal
+marked each of them exactly once and kept none of their pages.
+--enum-values splits every ID into that many pagination chains.
+
+    python -m benchmarks.fanout_check --ids 300 --enum-values 3 -- --checkpoint run.sqlite --parse-processes 2
+    python -m benchmarks.fanout_check --enum-values 3 --error-404 0.03 -- --checkpoint run.sqlite
+
+Extra main.py arguments after `--` run with the scratch directory as working
+directory, so relative paths such as the checkpoint file land there.
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from benchmarks.bench_pipeline import REPO_ROOT, prepare_database, wait_for_port
+
+# Runs main.py with an enum on the locations endpoint, which has none by default.
+BOOTSTRAP = """
+import sys
+sys.path.insert(0, {root!r})
+import main
+from example_client.endpoints_config import endpoints
+if {enum_values}:
+    endpoints["locations"]["enums"] = {{"sortBy": [f"order{{i}}" for i in range({enum_values})]}}
+main.main()
+"""
+
+def mined_rows(path):
+    import duckdb
+
+    con = duckdb.connect(path, read_only=True)
+    written = dict(con.execute("SELECT item_id, count(*) FROM location_details GROUP BY item_id").fetchall())
+    failed = {row[0] for row in con.execute("SELECT DISTINCT example_id FROM failed_location_details_requests").fetchall()}
+    con.close()
+    return {str(key): value for key, value in written.items()}, {str(key) for key in failed}
+
+def journal_summary(path):
+    con = sqlite3.connect(path)
+    marked = con.execute(
+        "SELECT example_id, count(*) FROM completed_ids WHERE run_id = (SELECT MAX(run_id) FROM runs) GROUP BY example_id"
+    ).fetchall()
+    pages = con.execute("SELECT count(*) FROM pages").fetchone()[0]
+    con.close()
+    return dict(marked), pages
+
+def logged_errors(path):
+    with open(path) as log:
+        return [line.rstrip() for line in log if " - ERROR - " in line]
+
+def run_main(args, workdir, main_args):
+    env = dict(os.environ)
+    for prefix in ("", "_2"):
+        env[f"SCRAPOXY{prefix}_USER"] = "bench"
+        env[f"SCRAPOXY{prefix}_TOKEN"] = "bench"
+        env[f"SCRAPOXY{prefix}_PORT"] = str(args.port)
+    env["SCRAPOXY_URL"] = "127.0.0.1"
+    env["GRAPHQL_URL"] = f"http://127.0.0.1:{args.port}/"
+    env["DUCKDB_TOKEN"] = os.path.join(workdir, "check.duckdb")
+    command = [
+        sys.executable, "-c", BOOTSTRAP.format(root=REPO_ROOT, enum_values=args.enum_values),
+        "--endpoint", "locations", "--headless",
+        "--max-records", str(args.ids),
+    ] + main_args
+    with open(os.path.join(workdir, "main.log"), "w") as log:
+        return subprocess.run(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every ID of a run is written whole or dead-lettered")
+    parser.add_argument("--ids", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=3, help="Pages per ID and enum combination.")
+    parser.add_argument("--page-size", type=int, default=5, help="Edges per page.")
+    parser.add_argument("--enum-values", type=int, default=0, help="Pagination chains per ID, 0 for one without enums.")
+    parser.add_argument("--error-404", type=float, default=0.0, help="Share of requests the mock answers with 404.")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="Share of requests the mock answers with a 5xx.")
+    parser.add_argument("--port", type=int, default=18092)
+    parser.add_argument("--workdir", help="Keep the run's files here instead of a temporary directory.")
+    parser.add_argument("main_args", nargs=argparse.REMAINDER, help="Extra main.py arguments after `--`.")
+    args = parser.parse_args()
+    main_args = args.main_args[1:] if args.main_args[:1] == ["--"] else args.main_args
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_server", "--port", str(args.port), "--pages", str(args.pages),
+            "--page-size", str(args.page_size), "--error-404", str(args.error_404), "--error-5xx", str(args.error_5xx),
+        ],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(args.port)
+        with tempfile.TemporaryDirectory(prefix="fanout-check-") as scratch:
+            workdir = args.workdir or scratch
+            os.makedirs(workdir, exist_ok=True)
+            # A kept workdir keeps its cache and journal between runs, but not the rows.
+            if os.path.exists(os.path.join(workdir, "check.duckdb")):
+                os.remove(os.path.join(workdir, "check.duckdb"))
+            prepare_database(os.path.join(workdir, "check.duckdb"))
+            exit_code = run_main(args, workdir, main_args)
+            written, failed = mined_rows(os.path.join(workdir, "check.duckdb"))
+            errors = logged_errors(os.path.join(workdir, "main.log"))
+            journal = None
+            if "--checkpoint" in main_args:
+                journal = journal_summary(os.path.join(workdir, main_args[main_args.index("--checkpoint") + 1]))
+    finally:
+        server.terminate()
+        server.wait()
+
+    problems = []
+    full = args.pages * args.page_size * max(args.enum_values, 1)
+    partial = {example_id for example_id, rows in written.items() if rows < full}
+    both = set(written) & failed
+    mined = set(written) | failed
+    print(f"exit code {exit_code}: {len(written)} IDs written ({full} rows each), {len(failed)} dead-lettered")
+    if len(mined) != args.ids:
+        problems.append(f"{len(mined)} of {args.ids} IDs mined")
+    if partial:
+        problems.append(f"{len(partial)} IDs written with missing rows, e.g. {sorted(partial)[:3]}")
+    if both:
+        problems.append(f"{len(both)} IDs both written and dead-lettered, e.g. {sorted(both)[:3]}")
+    if errors:
+        problems.append(f"{len(errors)} errors logged, e.g. {errors[0]}")
+    if journal is not None:
+        marked, pages = journal
+        print(f"journal: {len(marked)} IDs marked, {pages} pages kept")
+        if set(marked) != mined:
+            problems.append(f"journal marked {len(marked)} IDs, {len(mined)} were mined")
+        if pages:
+            problems.append(f"{pages} journaled pages kept for IDs that are finished")
+        twice = [example_id for example_id, count in marked.items() if count > 1]
+        if twice:
+            problems.append(f"{len(twice)} IDs marked more than once, e.g. {sorted(twice)[:3]}")
+
+    for problem in problems:
+        print(problem)
+    if exit_code or problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
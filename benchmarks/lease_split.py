@@ -0,0 +1,150 @@
+"""
+Runs several main.py nodes against one --coordinator lease table and checks that they
+split the job's IDs: every ID of the shared source table is mined, and by one node
+only. Each node gets its own DuckDB file holding the same source table, as in
+production, and benchmarks/mock_server.py stands in for the proxies and the API.
+
+    python -m benchmarks.lease_split --ids 5000 --nodes 2 --lease-size 200
+    python -m benchmarks.lease_split --kill-after 2 --lease-ttl 3
+
+With --kill-after, the first node is killed mid-run; the others take over its ranges
+once the lease expires, so its unfinished ranges may be mined twice but none are lost.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_pipeline import REPO_ROOT, prepare_database, wait_for_port
+
+def prepare_node(path, ids):
+    import duckdb
+
+    prepare_database(path)
+    con = duckdb.connect(path)
+    con.execute(f"CREATE TABLE db_location_for_ids AS SELECT range AS id FROM range(1, {ids + 1})")
+    con.close()
+
+def mined_ids(path):
+    import duckdb
+
+    con = duckdb.connect(path, read_only=True)
+    ids = con.execute(
+        "SELECT DISTINCT item_id FROM location_details "
+        "UNION SELECT DISTINCT example_id FROM failed_location_details_requests"
+    ).fetchall()
+    con.close()
+    return {int(row[0]) for row in ids}
+
+def lease_summary(path):
+    import sqlite3
+
+    con = sqlite3.connect(path)
+    rows = con.execute(
+        "SELECT owner, status, count(*), sum(id_count), sum(attempts - 1) FROM lease_ranges GROUP BY owner, status"
+    ).fetchall()
+    con.close()
+    return rows
+
+def node_command(args, workdir, name, main_args):
+    return [
+        sys.executable, os.path.join(REPO_ROOT, "main.py"), "--endpoint", "locations", "--id-source", "duckdb", "--headless",
+        "--max-records", str(args.ids), "--coordinator", os.path.join(workdir, "leases.sqlite"), "--worker-id", name,
+        "--lease-size", str(args.lease_size), "--lease-ttl", str(args.lease_ttl),
+    ] + main_args
+
+def node_env(args, workdir, name):
+    env = dict(os.environ)
+    for prefix in ("", "_2"):
+        env[f"SCRAPOXY{prefix}_USER"] = "bench"
+        env[f"SCRAPOXY{prefix}_TOKEN"] = "bench"
+        env[f"SCRAPOXY{prefix}_PORT"] = str(args.port)
+    env["SCRAPOXY_URL"] = "127.0.0.1"
+    env["GRAPHQL_URL"] = f"http://127.0.0.1:{args.port}/"
+    env["DUCKDB_TOKEN"] = os.path.join(workdir, f"{name}.duckdb")
+    return env
+
+def run_nodes(args, workdir, main_args):
+    names = [f"node{index + 1}" for index in range(args.nodes)]
+    for name in names:
+        prepare_node(os.path.join(workdir, f"{name}.duckdb"), args.ids)
+
+    nodes = {}
+    for name in names:
+        log = open(os.path.join(workdir, f"{name}.log"), "w")
+        nodes[name] = subprocess.Popen(
+            node_command(args, workdir, name, main_args),
+            # logs/ and checkpoints/ land in the scratch directory
+            cwd=workdir,
+            env=node_env(args, workdir, name),
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+        log.close()
+
+    if args.kill_after:
+        time.sleep(args.kill_after)
+        nodes[names[0]].send_signal(signal.SIGKILL)
+        print(f"Killed {names[0]} after {args.kill_after}s")
+
+    exit_codes = {name: process.wait() for name, process in nodes.items()}
+    return names, exit_codes
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that nodes sharing a lease table split the IDs between them")
+    parser.add_argument("--ids", type=int, default=2000, help="Rows in the shared source table.")
+    parser.add_argument("--nodes", type=int, default=2)
+    parser.add_argument("--lease-size", type=int, default=100)
+    parser.add_argument("--lease-ttl", type=float, default=5.0)
+    parser.add_argument("--kill-after", type=float, default=0.0, help="Kill the first node after this many seconds.")
+    parser.add_argument("--port", type=int, default=18091)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--workdir", help="Keep the nodes' files here instead of a temporary directory.")
+    parser.add_argument("main_args", nargs=argparse.REMAINDER, help="Extra main.py arguments after `--`.")
+    args = parser.parse_args()
+    main_args = args.main_args[1:] if args.main_args[:1] == ["--"] else args.main_args
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_server", "--port", str(args.port),
+            "--pages", "1", "--latency", str(args.latency), "--latency-dist", "fixed",
+        ],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        # a killed node leaves broken connections the server would print tracebacks for
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(args.port)
+        with tempfile.TemporaryDirectory(prefix="lease-split-") as scratch:
+            workdir = args.workdir or scratch
+            os.makedirs(workdir, exist_ok=True)
+            start = time.perf_counter()
+            names, exit_codes = run_nodes(args, workdir, main_args)
+            elapsed = time.perf_counter() - start
+
+            mined = {name: mined_ids(os.path.join(workdir, f"{name}.duckdb")) for name in names}
+            for owner, status, ranges, ids, reassigned in lease_summary(os.path.join(workdir, "leases.sqlite")):
+                print(f"{owner or '-':>8} {status:>8}: {ranges} ranges, {ids} IDs, {reassigned} reassignments")
+    finally:
+        server.terminate()
+        server.wait()
+
+    expected = set(range(1, args.ids + 1))
+    seen = set()
+    duplicated = set()
+    for name in names:
+        print(f"{name:>8}: {len(mined[name])} IDs, exit code {exit_codes[name]}")
+        duplicated |= seen & mined[name]
+        seen |= mined[name]
+    missing = expected - seen
+    print(f"{len(seen & expected)}/{len(expected)} IDs mined in {elapsed:.1f}s, {len(duplicated)} by several nodes, {len(missing)} missing")
+
+    # A killed node may have mined part of ranges the others took over.
+    if missing or (duplicated and not args.kill_after):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
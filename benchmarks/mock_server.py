@@ -0,0 +1,197 @@
+"""
+Local stand-in for the GraphQL API that speaks the persisted-query protocol.
+
+It also accepts absolute-URI requests, so it can be configured as the proxy too:
+point SCRAPOXY_URL/SCRAPOXY_PORT and GRAPHQL_URL at it and the whole pipeline runs
+locally. GET /stats returns request counters.
+
+    python -m benchmarks.mock_server --port 18080 --pages 3 --page-size 20 --latency 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+class MockSettings:
+    def __init__(
+            self,
+            pages=3,
+            page_size=None,
+            latency=0.0,
+            latency_dist="fixed",
+            error_404=0.0,
+            error_429=0.0,
+            error_5xx=0.0,
+            redirect=0.0,
+            retry_after=1
+    ):
+        self.pages = pages
+        self.page_size = page_size
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.error_404 = error_404
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.redirect = redirect
+        self.retry_after = retry_after
+
+    def sample_latency(self):
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_dist == "uniform":
+            return random.uniform(0, 2 * self.latency)
+        if self.latency_dist == "exponential":
+            return random.expovariate(1 / self.latency)
+        if self.latency_dist == "lognormal":
+            # Median at `latency` with a long right tail.
+            return random.lognormvariate(0, 0.75) * self.latency
+        return self.latency
+
+def make_node(example_id, enum_key, page_no, i):
+    return {
+        "node": {
+            "id": f"{example_id}-{enum_key}-{page_no}-{i}",
+            "location": f"Location {i % 97}",
+            "text": "Some descriptive text about the location",
+            "interestScore": {"usersInterested": i % 1000, "usersVoted": i % 313},
+            "displayableProperty": {
+                "qualifiersInMarkdownList": [{"markdown": "**bold**"}],
+                "value": {"markdown": "*value*"},
+            },
+        }
+    }
+
+def make_page(operation, settings):
+    """One page of location edges for a persisted query operation."""
+    if not operation.get("extensions", {}).get("persistedQuery", {}).get("sha256Hash"):
+        return {"errors": [{"message": "PersistedQueryNotFound"}]}
+
+    variables = operation.get("variables", {})
+    example_id = variables.get("unique_id") or variables.get("const")
+    page_no = int(variables.get("after") or 0)
+    page_size = settings.page_size or int(variables.get("first", 20))
+    enum_key = "-".join(
+        str(value) for key, value in sorted(variables.items())
+        if key not in ("unique_id", "const", "after", "first", "locale")
+    )
+    has_next = page_no + 1 < settings.pages
+    return {
+        "data": {
+            "item": {
+                "locations": {
+                    "edges": [make_node(example_id, enum_key, page_no, i) for i in range(page_size)],
+                    "pageInfo": {"endCursor": str(page_no + 1) if has_next else None, "hasNextPage": has_next},
+                }
+            }
+        }
+    }
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        settings = self.server.settings
+        time.sleep(settings.sample_latency())
+
+        # Requests through the "proxy" carry an absolute URI.
+        path = urlsplit(self.path)
+        roll = random.random()
+        if roll < settings.error_429:
+            return self._send(429, headers={"Retry-After": str(settings.retry_after)})
+        roll -= settings.error_429
+        if roll < settings.error_5xx:
+            return self._send(random.choice((500, 502, 503, 504)))
+        roll -= settings.error_5xx
+        if roll < settings.error_404:
+            return self._send(404)
+        roll -= settings.error_404
+        if roll < settings.redirect and "moved=1" not in path.query:
+            location = f"{path.scheme}://{path.netloc}{path.path}?moved=1" if path.netloc else f"{path.path}?moved=1"
+            return self._send(308, headers={"Location": location})
+
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            return self._send(400, b'{"errors": [{"message": "Invalid JSON"}]}')
+        if isinstance(payload, list):
+            result = [make_page(operation, settings) for operation in payload]
+        else:
+            result = make_page(payload, settings)
+        self._send(200, json.dumps(result).encode("utf-8"), {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        self._send(200, json.dumps(self.server.stats()).encode("utf-8"), {"Content-Type": "application/json"})
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, settings):
+        super().__init__(address, MockHandler)
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, status):
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {"requests": sum(self.counts.values()), "status": dict(self.counts)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock persisted-query GraphQL server and proxy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--pages", type=int, default=3, help="Pages per ID and enum combination.")
+    parser.add_argument("--page-size", type=int, help="Edges per page (default: the request's `first`).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean (median for lognormal) latency in seconds.")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential", "lognormal"], default="fixed")
+    parser.add_argument("--error-404", type=float, default=0.0, help="Share of requests answered with 404.")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="Share of requests answered with a 5xx.")
+    parser.add_argument("--redirect", type=float, default=0.0, help="Share of requests redirected with 308.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s.")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        pages=args.pages,
+        page_size=args.page_size,
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        error_404=args.error_404,
+        error_429=args.error_429,
+        error_5xx=args.error_5xx,
+        redirect=args.redirect,
+        retry_after=args.retry_after
+    )
+    server = MockServer((args.host, args.port), settings)
+    print(f"Mock GraphQL server on http://{args.host}:{args.port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 
 import logging
 import requests
+from utils.id_source import MockIdSource, DuckDBIdSource
+from utils.data_store import ColumnBuilder
 
 logger = logging.getLogger("base_client_logger")
 
@@ -8,8 +10,18 @@ class BaseClient:
     def __init__(self, token=None, max_records=100):
         self.token = token
         self.max_records = max_records
-        self.session = requests.Session()
-        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        Authorized session for calling the API directly. Created on first use: the
+        workers send their requests through the shared proxy adapter instead.
+        """
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update({"Authorization": f"Bearer {self.token}"})
+        return self._session
 
     @staticmethod
     def safe_get(data, *keys):
@@ -28,12 +40,22 @@ class BaseClient:
     def extract_array(data, fields=None):
         """
         Extracts an array of dictionaries with specific fields.
+        Each field is a key path; the output is keyed by the dotted path so it stays JSON serializable.
         """
         if not isinstance(data, list):
             return []
         if not fields:
             return data
-        return [{field: BaseClient.safe_get(item, *field) for field in fields} for item in data]
+        return [{".".join(field): BaseClient.safe_get(item, *field) for field in fields} for item in data]
+
+    @staticmethod
+    def column_builder(schema, **constants):
+        """
+        Columnar alternative to building a dict per row: parsers append values into
+        per-column lists and get an Arrow RecordBatch of `schema` ready for the writer.
+        Keyword constants (item_id, recorded_at, ...) are shared by every row.
+        """
+        return ColumnBuilder(schema, constants)
 
     def get_example_endpoint_ids(self, table_name, column_counter, counter_filter=1, limit=100, order_type="desc"):
         """
@@ -43,6 +65,47 @@ class BaseClient:
         # Simulate fetching IDs
         return [(f"{id:07d}", counter_filter) for id in range(1, limit + 1)]
 
+    def get_id_source(
+            self,
+            endpoint_config,
+            source="mock",
+            counter_filter=1,
+            limit=100,
+            order_type="desc",
+            chunk_size=10000,
+            skip_mined=True,
+            fresh_within=None
+    ):
+        """
+        Streaming counterpart of get_example_endpoint_ids. "duckdb" reads endpoint_config["source_table"]
+        through a cursor in chunks; "mock" generates the same fake IDs lazily.
+        With skip_mined, the duckdb source leaves out IDs already in the endpoint's table_name or
+        failed_table (only those recorded within fresh_within seconds, when given).
+        """
+        exclude = []
+        if skip_mined:
+            exclude.append((endpoint_config["table_name"], endpoint_config.get("id_column", "item_id")))
+            if endpoint_config.get("failed_table"):
+                exclude.append((endpoint_config["failed_table"], "example_id"))
+        if source == "mock":
+            return MockIdSource(limit=limit or self.max_records or 100, counter_filter=counter_filter)
+        if source == "duckdb":
+            return DuckDBIdSource(
+                self.token,
+                endpoint_config["source_table"],
+                id_column=endpoint_config.get("source_id_column", "id"),
+                counter_column=endpoint_config.get("column_counter"),
+                counter_filter=counter_filter,
+                limit=limit,
+                order_type=order_type,
+                chunk_size=chunk_size,
+                exclude=exclude,
+                fresh_within=fresh_within
+            )
+        raise ValueError(f"Unknown ID source: {source}")
+
     def close(self):
-        """Close the session."""
-        self.session.close()
+        """Close the session if one was opened."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -1,86 +1,267 @@
+import asyncio
 import logging
+import json
+import os
 from example_client.base_client import BaseClient
-from utils.workers import format_failed
+from utils.rate_limit import rate_limiter, endpoint_bucket_key, parse_retry_after
+from utils.parse_pool import parse_pool, body_page
+from utils.response_cache import response_cache
+from utils.recorder import response_recorder
+from utils.extractors import loads
+from utils.metrics import retries_total
+from utils.eventrecorder import trace_context
+from utils.retry_scheduler import FetchFailure, TransientFailure, PermanentFailure, failure_for_status
 import requests
+import aiohttp
 from itertools import product
 
-logging.getLogger("urllib3").setLevel(logging.DEBUG)
-logging.getLogger("requests").setLevel(logging.DEBUG)
-
 logger = logging.getLogger("retry_logger")
 
+# Overridable so the pipeline can run against benchmarks/mock_server.py
+GRAPHQL_URL = os.getenv("GRAPHQL_URL", "https://caching.graphql.example.com/")
+HEADERS = {'content-type': 'application/json'}
+MAX_THROTTLED_RETRIES = 5
 
-def get_data_for_params(example_id, base_variables, config=None, session=None, enum_params=None):
+
+def build_payload(config, variables):
     """
-    API Requests with pagination and variables. If enum_params, merges with base_variables.
+    Persisted query payload for a single page.
     """
-    headers = {'content-type': 'application/json'}
-    url = "https://caching.graphql.example.com/"
-    extensions = {
-        "persistedQuery": {
-            "sha256Hash": config["query_hash"],
-            "version": 1,
-        }
+    return {
+        "operationName": config["endpoint_name"],
+        "variables": variables,
+        "extensions": {
+            "persistedQuery": {
+                "sha256Hash": config["query_hash"],
+                "version": 1,
+            }
+        },
     }
 
+
+def build_base_variables(example_id, record_count, config):
+    """
+    Variables shared by every page and enum combination of an ID.
+    """
+    base_variables = {
+        "first": config.get("page_size_min", min(50, record_count)),
+        "locale": "en-US",
+    }
+    id_key = config.get("id_param", "const")
+    base_variables[id_key] = example_id
+
+    if config.get("sort"):
+        base_variables["sort"] = config["sort"]
+
+    if config.get("additional_vars"):
+        base_variables.update(config["additional_vars"])
+    return base_variables
+
+
+def enum_combinations(config):
+    """
+    Every combination of the enums in the config, or None when there are none.
+    Repeated enum values are dropped so no combination is fetched twice.
+    """
+    enums = config.get("enums")
+    if not enums:
+        return None
+    enum_keys = list(enums.keys())
+    values = [list(dict.fromkeys(options)) for options in enums.values()]
+    return [dict(zip(enum_keys, combo)) for combo in product(*values)]
+
+
+def tag_enum_params(data, enum_params, config):
+    """
+    Copies the enum combination onto every node so parsers can tell pages apart.
+    """
+    try:
+        for edge in BaseClient.safe_get(data, *config['data_location']):
+            edge["node"]["enum_params"] = enum_params.copy()
+    except (KeyError, TypeError) as k:
+        logger.warning(f"Unable to add enum: {k}")
+
+
+def next_page_cursor(data, config):
+    """
+    Cursor for the page after `data`, or None when it is the last page.
+    """
+    page_info = BaseClient.safe_get(data, *config['pageinfo_location'])
+    if not page_info:
+        return None
+    next_cursor = page_info.get("endCursor", None)
+    has_next_page = page_info.get("hasNextPage", None)
+    if not next_cursor or not has_next_page:
+        return None
+    return next_cursor
+
+
+def decode_page(raw, example_id, enum_params, config):
+    """
+    Turns a response body into (data, next_cursor).
+    """
+    data = loads(raw)
+    if enum_params:
+        tag_enum_params(data, enum_params, config)
+    return data, next_page_cursor(data, config)
+
+
+def peek_page(raw, config):
+    """
+    (next_cursor, usable) read from a body's pageInfo object alone, without decoding
+    the rest of it. None when the body needs a full decode to tell: the pageInfo key
+    is missing, null or appears more than once, the body reports errors, or it does
+    not end like a complete object. usable approximates batch_result_usable by
+    looking for the edges key.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if b'"errors"' in raw or not raw.rstrip().endswith(b"}"):
+        return None
+    key = f'"{config["pageinfo_location"][-1]}"'.encode("utf-8")
+    start = raw.find(key)
+    if start < 0 or raw.find(key, start + 1) >= 0:
+        return None
+    opening = raw.find(b"{", start)
+    closing = raw.find(b"}", opening)
+    if opening < 0 or closing < 0 or raw[start + len(key):opening].strip() != b":":
+        return None
+    try:
+        page_info = loads(raw[opening:closing + 1])
+    except json.JSONDecodeError:
+        return None
+    next_cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+    usable = f'"{config["data_location"][-1]}"'.encode("utf-8") in raw
+    return next_cursor or None, usable
+
+
+def receive_page(raw, example_id, enum_params, config):
+    """
+    ((data, next_cursor), usable) for a response body. With the parse pool running,
+    data is a body page: only the pageInfo is read here and the body is decoded once,
+    by the pool, together with the ID's other pages. A body that cannot be peeked at
+    is decoded here and skips the pool.
+    """
+    if parse_pool.active:
+        peeked = peek_page(raw, config)
+        if peeked is not None:
+            next_cursor, usable = peeked
+            return (body_page(raw, enum_params), next_cursor), usable
+    page = decode_page(raw, example_id, enum_params, config)
+    return page, batch_result_usable(page[0], config)
+
+
+def cache_key(variables, config):
+    return response_cache.key(config["endpoint_name"], config["query_hash"], variables)
+
+
+def record_response(raw, example_id, variables, enum_params, config):
+    if response_recorder.active:
+        response_recorder.page(config["name"], example_id, enum_params, variables.get("after"), raw)
+
+
+def record_attempt(example_id, config):
+    """Marks the start of an attempt at a whole ID, so a replay drops the pages of failed ones."""
+    if response_recorder.active:
+        response_recorder.begin(config["name"], example_id)
+
+
+def cached_page(example_id, variables, enum_params, config):
+    """
+    (cache key, page) for a page in the response cache, (key, None) when it has to be
+    fetched, or (None, None) without a cache.
+    """
+    if not response_cache.active:
+        return None, None
+    key = cache_key(variables, config)
+    raw = response_cache.get(key)
+    if raw is not None:
+        try:
+            page, _ = receive_page(raw, example_id, enum_params, config)
+            record_response(raw, example_id, variables, enum_params, config)
+            return key, page
+        except json.JSONDecodeError as e:
+            logger.warning(f"Invalid cached response for {example_id}, refetching: {e}")
+            response_cache.invalidate(key)
+    return key, None
+
+
+def fetch_page(example_id, variables, config=None, session=None, enum_params=None):
+    """
+    Single page request. Returns (data, next_cursor), with next_cursor None on the
+    last page. A failed request raises TransientFailure (timeouts, throttling, 5xx,
+    bad JSON) or PermanentFailure (404 and other 4xx, redirects) for the worker to
+    retry or dead-letter. When the parse pool is running, data is usually a body
+    page that the pool decodes along with the ID's other pages. With the response cache open, cached bodies
+    are used instead of the network and new ones are stored unless they carry errors
+    or no edges, so a transient GraphQL error is not replayed from the cache.
+    """
+    with trace_context(example_id, enum_params, variables.get("after")):
+        key, page = cached_page(example_id, variables, enum_params, config)
+        if page is not None:
+            return page
+
+        payload = build_payload(config, variables)
+        endpoint_name = config['name']
+        throttled = 0
+
+        while True:
+            try:
+                rate_limiter.acquire(endpoint_bucket_key(endpoint_name))
+                response = session.post(GRAPHQL_URL, headers=HEADERS, json=payload, timeout=(4, 3))
+                if response.status_code == 429 and throttled < MAX_THROTTLED_RETRIES:
+                    throttled += 1
+                    retries_total.inc(endpoint=endpoint_name, reason="429")
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    rate_limiter.pause(endpoint_bucket_key(endpoint_name), delay)
+                    logger.warning(f"429 Too Many Requests for {example_id}, pausing {endpoint_name} for {delay:.1f}s")
+                    continue
+                response.raise_for_status()
+                if response.history:
+                    logger.warning(f"Permanent Redirect : {example_id}")
+                    raise PermanentFailure("308 Permanent Redirect", str(response.url))
+
+                page, usable = receive_page(response.content, example_id, enum_params, config)
+                logger.debug(f"Fetched {len(response.content)} bytes for {example_id} after {variables.get('after')}")
+                record_response(response.content, example_id, variables, enum_params, config)
+                if key is not None and usable:
+                    response_cache.put(key, response.content)
+                return page
+            except json.JSONDecodeError as e:
+                logger.error(f"json decode error for {example_id}: {e}")
+                raise TransientFailure("Invalid JSON", str(e))
+            except requests.exceptions.HTTPError as e:
+                logger.warning(f"HTTP error for {example_id}: {e}")
+                raise failure_for_status(response.status_code, str(e))
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Request failed: {e}")
+                raise TransientFailure(type(e).__name__, str(e))
+
+
+def get_data_for_params(example_id, base_variables, config=None, session=None, enum_params=None):
+    """
+    API Requests with pagination and variables. If enum_params, merges with base_variables.
+    """
     variables = base_variables.copy()
     if enum_params:
         variables.update(enum_params)
 
     all_data = []
     next_cursor = None
-    has_next_page = False
-    endpoint_name = config['name']
 
     while True:
         current_vars = variables.copy()
-        if next_cursor and has_next_page:
+        if next_cursor:
             current_vars["after"] = next_cursor
 
-        payload = {
-            "operationName": config["endpoint_name"],
-            "variables": current_vars,
-            "extensions": extensions,
-        }
-
-        try:
-            response = session.post(url, headers=headers, json=payload, timeout=(4, 3))
-            response.raise_for_status()
-            if response.history:
-                logger.warning(f"Permanent Redirect : {example_id}")
-                format_failed(example_id, "308 Permanent Redirect", str(response.url), config["table_name"])
-                return None
-
-            data = response.json()
-            if enum_params:
-                try:
-                    for edge in BaseClient.safe_get(data, *config['data_location']):
-                        edge["node"]["enum_params"] = enum_params.copy()
-                except KeyError as k:
-                    logger.warning(f"Unable to add enum: {k}")
-
-            all_data.append(data)
-
-            page_info = BaseClient.safe_get(data, *config['pageinfo_location'])
-            if not page_info:
-                break
-            next_cursor = page_info.get("endCursor", None)
-            has_next_page = page_info.get("hasNextPage", None)
-
-            if not next_cursor or not has_next_page:
-                break
-        except requests.exceptions.JSONDecodeError as e:
-            logger.error(f"json decode error for {example_id}: {e}")
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 404:
-                logger.warning(f"404 Not Found: {example_id}")
-                format_failed(example_id, "404 Not Found", str(e), config['table_name'])
-            else:
-                logger.error(f"HTTP error for {example_id}: {e}")
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
+        page = fetch_page(example_id, current_vars, config, session, enum_params)
+        if page is None:
             return None
+        data, next_cursor = page
+        all_data.append(data)
+
+        if not next_cursor:
+            break
 
     return all_data
 
@@ -90,26 +271,13 @@ def enum_requests(example_id, record_count=50, config=None, session=None):
     Checks for enums in the config. If present, iterate over all enum combinations.
     Otherwise, call the data function directly.
     """
-    base_variables = {
-        "first": config.get("page_size_min", min(50, record_count)),
-        "locale": "en-US",
-    }
-    id_key = config.get("id_param", "const")
-    base_variables[id_key] = example_id
-
-    if config.get("sort"):
-        base_variables["sort"] = config["sort"]
+    record_attempt(example_id, config)
+    base_variables = build_base_variables(example_id, record_count, config)
 
-    if config.get("additional_vars"):
-        base_variables.update(config["additional_vars"])
-
-    enums = config.get("enums")
+    combos = enum_combinations(config)
     all_results = []
-    if enums:
-        enum_keys = list(enums.keys())
-        enum_values = list(enums.values())
-        for combo in product(*enum_values):
-            enum_params = dict(zip(enum_keys, combo))
+    if combos:
+        for enum_params in combos:
             data = get_data_for_params(example_id, base_variables, config, session, enum_params)
             if data:
                 all_results.extend(data)
@@ -118,10 +286,295 @@ def enum_requests(example_id, record_count=50, config=None, session=None):
     return all_results
 
 
+def post_batch(payloads, config=None, session=None):
+    """
+    Sends several operations as one GraphQL batch (a JSON array) and returns the list
+    of results in the same order. Raises like fetch_page; an answer that is not a list
+    of one result per operation raises PermanentFailure("Batch Unsupported").
+    """
+    endpoint_name = config['name']
+    throttled = 0
+
+    while True:
+        try:
+            rate_limiter.acquire(endpoint_bucket_key(endpoint_name))
+            response = session.post(GRAPHQL_URL, headers=HEADERS, json=payloads, timeout=(4, 3 * len(payloads)))
+            if response.status_code == 429 and throttled < MAX_THROTTLED_RETRIES:
+                throttled += 1
+                retries_total.inc(endpoint=endpoint_name, reason="429")
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                rate_limiter.pause(endpoint_bucket_key(endpoint_name), delay)
+                logger.warning(f"429 Too Many Requests for a batch of {len(payloads)}, pausing {endpoint_name} for {delay:.1f}s")
+                continue
+            response.raise_for_status()
+            if response.history:
+                raise PermanentFailure("308 Permanent Redirect", str(response.url))
+            results = loads(response.content)
+        except json.JSONDecodeError as e:
+            logger.error(f"json decode error for a batch of {len(payloads)}: {e}")
+            raise TransientFailure("Invalid JSON", str(e))
+        except requests.exceptions.HTTPError as e:
+            logger.warning(f"HTTP error for a batch of {len(payloads)}: {e}")
+            raise failure_for_status(response.status_code, str(e))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise TransientFailure(type(e).__name__, str(e))
+
+        if not isinstance(results, list) or len(results) != len(payloads):
+            raise PermanentFailure("Batch Unsupported", f"Expected {len(payloads)} results")
+        logger.debug(f"Fetched {len(response.content)} bytes for a batch of {len(payloads)}")
+        return results
+
+
+def batch_result_usable(result, config):
+    """
+    A result (of a batch or a single request) can be used and cached as it is unless
+    it reports errors or has no edges.
+    """
+    return (
+        isinstance(result, dict)
+        and not result.get("errors")
+        and BaseClient.safe_get(result, *config['data_location']) is not None
+    )
+
+
+def decode_batch_result(result, example_id, variables, enum_params, config, key=None):
+    """
+    Turns one result of a batch into (data, next_cursor) like decode_page. It is
+    re-encoded only for the cache and the recorder, which store bodies; the parse
+    pool gets the decoded result as it is.
+    """
+    if key is not None or response_recorder.active:
+        raw = json.dumps(result).encode("utf-8")
+        record_response(raw, example_id, variables, enum_params, config)
+        if key is not None:
+            response_cache.put(key, raw)
+    if enum_params:
+        tag_enum_params(result, enum_params, config)
+    next_cursor = next_page_cursor(result, config)
+    if parse_pool.active:
+        return body_page(result, enum_params), next_cursor
+    return result, next_cursor
+
+
+def fetch_batch(chains, config=None, session=None):
+    """
+    One page for each (example_id, enum_params, variables) in chains, fetched in a
+    single batched request. Returns a list in the same order holding (data, next_cursor)
+    or the FetchFailure of that page. Results with errors are fetched again on their
+    own, as is the whole batch when the server refuses it with a permanent error;
+    a transient failure of the batch fails every page in it.
+    """
+    pages = [None] * len(chains)
+    pending = []
+    for index, (example_id, enum_params, variables) in enumerate(chains):
+        with trace_context(example_id, enum_params, variables.get("after")):
+            key, page = cached_page(example_id, variables, enum_params, config)
+        if page is not None:
+            pages[index] = page
+        else:
+            pending.append((index, key))
+
+    results = None
+    if len(pending) > 1:
+        try:
+            results = post_batch([build_payload(config, chains[index][2]) for index, _ in pending], config, session)
+        except TransientFailure as e:
+            for index, _ in pending:
+                pages[index] = e
+            return pages
+        except PermanentFailure as e:
+            logger.warning(f"Batch of {len(pending)} refused ({e.reason_code}), fetching one by one")
+
+    for position, (index, key) in enumerate(pending):
+        example_id, enum_params, variables = chains[index]
+        result = results[position] if results is not None else None
+        try:
+            if result is not None and batch_result_usable(result, config):
+                with trace_context(example_id, enum_params, variables.get("after")):
+                    pages[index] = decode_batch_result(result, example_id, variables, enum_params, config, key)
+            else:
+                if results is not None:
+                    logger.debug(f"Batched result for {example_id} had errors, fetching it on its own")
+                pages[index] = fetch_page(example_id, variables, config, session, enum_params)
+        except FetchFailure as e:
+            pages[index] = e
+    return pages
+
+
+def batch_enum_requests(items, config=None, session=None):
+    """
+    Batched version of enum_requests for several (example_id, record_count) items.
+    Every pagination chain of every ID is advanced one page per round, and each round
+    is sent as GraphQL batches of config["batch_operations"] operations. Returns
+    {example_id: pages}, with the FetchFailure instead of pages for an ID whose
+    requests failed.
+    """
+    size = max(1, config.get("batch_operations") or 1)
+    results = {}
+    chains = []
+    for example_id, record_count in items:
+        record_attempt(example_id, config)
+        results[example_id] = []
+        base_variables = build_base_variables(example_id, record_count, config)
+        for enum_params in enum_combinations(config) or [None]:
+            variables = base_variables.copy()
+            if enum_params:
+                variables.update(enum_params)
+            chains.append((example_id, enum_params, variables))
+
+    while chains:
+        next_chains = []
+        for start in range(0, len(chains), size):
+            chunk = [chain for chain in chains[start:start + size] if not isinstance(results[chain[0]], FetchFailure)]
+            if not chunk:
+                continue
+            for (example_id, enum_params, variables), page in zip(chunk, fetch_batch(chunk, config, session)):
+                if isinstance(results[example_id], FetchFailure):
+                    continue
+                if isinstance(page, FetchFailure):
+                    results[example_id] = page
+                    continue
+                data, next_cursor = page
+                results[example_id].append(data)
+                if next_cursor:
+                    next_chains.append((example_id, enum_params, dict(variables, after=next_cursor)))
+        chains = next_chains
+    return results
+
+
+def plan_requests(example_id, record_count=50, config=None):
+    """
+    Independent pagination chains for an ID: one per enum combination, or a single
+    chain without enum params. Used by fanout_worker to spread an ID across workers;
+    a failed page is retried on its own, so the ID is only attempted once.
+    """
+    record_attempt(example_id, config)
+    return enum_combinations(config) or [None]
+
+
+def get_page(example_id, record_count=50, config=None, session=None, enum_params=None, cursor=None):
+    """
+    One page of one pagination chain. Returns (data, next_cursor) or raises, like fetch_page.
+    """
+    variables = build_base_variables(example_id, record_count, config)
+    if enum_params:
+        variables.update(enum_params)
+    if cursor:
+        variables["after"] = cursor
+    return fetch_page(example_id, variables, config, session, enum_params)
+
+
+async def async_fetch_page(
+        example_id,
+        variables,
+        config=None,
+        session=None,
+        enum_params=None
+):
+    """
+    Coroutine version of fetch_page for an AsyncRotatingProxySession.
+    """
+    with trace_context(example_id, enum_params, variables.get("after")):
+        key, page = cached_page(example_id, variables, enum_params, config)
+        if page is not None:
+            return page
+
+        payload = build_payload(config, variables)
+        endpoint_name = config['name']
+        throttled = 0
+
+        while True:
+            try:
+                await rate_limiter.acquire_async(endpoint_bucket_key(endpoint_name))
+                response = await session.post(GRAPHQL_URL, headers=HEADERS, json=payload, timeout=(4, 3))
+                if response.status == 429 and throttled < MAX_THROTTLED_RETRIES:
+                    throttled += 1
+                    retries_total.inc(endpoint=endpoint_name, reason="429")
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    rate_limiter.pause(endpoint_bucket_key(endpoint_name), delay)
+                    logger.warning(f"429 Too Many Requests for {example_id}, pausing {endpoint_name} for {delay:.1f}s")
+                    continue
+                response.raise_for_status()
+                if response.history:
+                    logger.warning(f"Permanent Redirect : {example_id}")
+                    raise PermanentFailure("308 Permanent Redirect", str(response.url))
+
+                page, usable = receive_page(response.body, example_id, enum_params, config)
+                logger.debug(f"Fetched {len(response.body)} bytes for {example_id} after {variables.get('after')}")
+                record_response(response.body, example_id, variables, enum_params, config)
+                if key is not None and usable:
+                    response_cache.put(key, response.body)
+                return page
+            except json.JSONDecodeError as e:
+                logger.error(f"json decode error for {example_id}: {e}")
+                raise TransientFailure("Invalid JSON", str(e))
+            except aiohttp.ClientResponseError as e:
+                logger.warning(f"HTTP error for {example_id}: {e}")
+                raise failure_for_status(e.status, str(e))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Request failed: {e!r}")
+                raise TransientFailure(type(e).__name__, repr(e))
+
+
+async def async_get_data_for_params(example_id, base_variables, config=None, session=None, enum_params=None, **kwargs):
+    """
+    Coroutine version of get_data_for_params.
+    """
+    variables = base_variables.copy()
+    if enum_params:
+        variables.update(enum_params)
+
+    all_data = []
+    next_cursor = None
+
+    while True:
+        current_vars = variables.copy()
+        if next_cursor:
+            current_vars["after"] = next_cursor
+
+        page = await async_fetch_page(example_id, current_vars, config, session, enum_params, **kwargs)
+        if page is None:
+            return None
+        data, next_cursor = page
+        all_data.append(data)
+
+        if not next_cursor:
+            break
+
+    return all_data
+
+
+async def async_enum_requests(example_id, record_count=50, config=None, session=None, **kwargs):
+    """
+    Coroutine version of enum_requests. Enum combinations are fetched concurrently;
+    the session caps how many requests are actually in flight.
+    """
+    record_attempt(example_id, config)
+    base_variables = build_base_variables(example_id, record_count, config)
+
+    combos = enum_combinations(config)
+    if not combos:
+        return await async_get_data_for_params(example_id, base_variables, config, session, **kwargs)
+
+    pages = await asyncio.gather(*[
+        async_get_data_for_params(example_id, base_variables, config, session, enum_params, **kwargs)
+        for enum_params in combos
+    ], return_exceptions=True)
+    all_results = []
+    for data in pages:
+        # Let every combination finish before the ID as a whole is retried or dead-lettered.
+        if isinstance(data, BaseException):
+            raise data
+        if data:
+            all_results.extend(data)
+    return all_results
+
+
 def get_location_details(example_id, record_count=100, config=None, session=None):
     """Get locations of example thing."""
     headers = {'content-type': 'application/json'}
-    url = "https://caching.graphql.example.com/"
+    url = GRAPHQL_URL
 
     try:
         payload = {
@@ -144,18 +597,13 @@ def get_location_details(example_id, record_count=100, config=None, session=None
 
         if response.history:
             logger.warning(f"Permanent Redirect : {example_id}")
-            format_failed(example_id, "308 Permanent Redirect", str(response.url), config["table_name"])
-            return None
+            raise PermanentFailure("308 Permanent Redirect", str(response.url))
 
     except requests.exceptions.HTTPError as e:
-        if response.status_code == 404:
-            logger.warning(f"404 Not Found: {example_id}")
-            format_failed(example_id, "404 Not Found", str(e), config['table_name'])
-        else:
-            logger.error(f"HTTP error for {example_id}: {e}")
-        return None
+        logger.warning(f"HTTP error for {example_id}: {e}")
+        raise failure_for_status(response.status_code, str(e))
     except requests.exceptions.RequestException as e:
         logger.error(f"Request failed: {e}")
-        return None
+        raise TransientFailure(type(e).__name__, str(e))
 
     return response.json()
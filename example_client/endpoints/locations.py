@@ -1,74 +1,86 @@
 import logging
 from example_client.base_client import BaseClient
+from utils.extractors import compile_array, compile_getters, compile_path, compile_spec
 import datetime
 import json
+import pyarrow as pa
 logger = logging.getLogger("retry_logger")
 
+# Column types of the rows parse_locations produces, used by the Arrow write path.
+LOCATIONS_SCHEMA = pa.schema([
+    ("item_id", pa.string()),
+    ("id", pa.string()),
+    ("location", pa.string()),
+    ("text", pa.string()),
+    ("usersInterested", pa.int64()),
+    ("usersVoted", pa.int64()),
+    ("markdownValueList", pa.string()),
+    ("markdownValue", pa.string()),
+    ("recorded_at", pa.string()),
+])
 
-def parse_locations(data, item_id):
-    """
-    API-specific logic that transforms the raw JSON.
-    We can reuse BaseClient.safe_get, BaseClient.extract_array, etc.
-    """
 
-    safe_get = BaseClient.safe_get
-    extract_array = BaseClient.extract_array
+def markdown_list(qualifiers):
+    return json.dumps(extract_markdown(qualifiers))
 
-    master_list = []
+
+extract_markdown = compile_array(["markdown"])
+get_edges = compile_path("data.item.locations.edges")
+get_node = compile_path("node")
+
+# Output columns of a location node, compiled once into a single row builder
+# and into per-column getters for the columnar path.
+LOCATION_COLUMNS = {
+    "id": "id",
+    "location": "location",
+    "text": "text",
+    "usersInterested": "interestScore.usersInterested",
+    "usersVoted": "interestScore.usersVoted",
+    "markdownValueList": ("displayableProperty.qualifiersInMarkdownList", markdown_list),
+    "markdownValue": "displayableProperty.value.markdown",
+}
+extract_location = compile_spec(LOCATION_COLUMNS)
+location_getters = compile_getters(LOCATION_COLUMNS)
+
+
+def parse_locations(data, item_id, config=None):
+    """
+    API-specific logic that transforms the raw JSON: one row per location edge
+    across all pages, built by the compiled extract_location. With config["columnar"]
+    the rows are filled column by column into an Arrow RecordBatch instead of dicts.
+    """
     if not data:
         logger.error("No data passed to parse_locations.")
         return None
-    try:
-        if isinstance(data, list):
-            for obj in data:
-                list_data = safe_get(obj, "data", "item", "locations", "edges")
-                if list_data:
-                    master_list.extend(list_data)
-        else:
-            master_item = safe_get(data, "data", "item", "locations", "edges")
-            if master_item:
-                master_list.append(master_item) 
-                if isinstance(master_item, list):
-                    master_list.extend(master_item)
-                else:
-                    master_list.append(master_item)
-
 
-    except Exception as e:
-        logger.error(f"Error processing initial data structure: {e}")
-        return None
+    master_list = []
+    for page in data if isinstance(data, list) else [data]:
+        edges = get_edges(page)
+        if isinstance(edges, list):
+            master_list.extend(edges)
 
     if not master_list:
         logger.warning(f"No location edges found for item_id: {item_id}")
         return []
 
     try:
+        recorded_at = datetime.datetime.utcnow().isoformat()
+        if config and config.get("columnar"):
+            nodes = [node for node in map(get_node, master_list) if node]
+            if len(nodes) < len(master_list):
+                logger.warning(f"{len(master_list) - len(nodes)} edges without node data for item_id: {item_id}")
+            builder = BaseClient.column_builder(LOCATIONS_SCHEMA, item_id=item_id, recorded_at=recorded_at)
+            builder.extend_from(nodes, location_getters)
+            return builder.to_record_batch()
+
         locations_data = []
         for item_edge in master_list:
-            node_data = safe_get(item_edge, "node")
+            node_data = get_node(item_edge)
             if not node_data:
                 logger.warning(f"No node data in edge for item_id: {item_id}")
                 continue
-
-            raw_list = extract_array(
-                safe_get(node_data, "displayableProperty", "qualifiersInMarkdownList"),
-                [("markdown",)]
-            )
-            markdown_value_list = json.dumps(raw_list) if isinstance(raw_list, list) else raw_list
-
-            item_details = {
-                "item_id": item_id,
-                "id": safe_get(node_data, "id"),
-                "location": safe_get(node_data, "location"),
-                "text": safe_get(node_data, "text"),
-                "usersInterested": safe_get(node_data, "interestScore", "usersInterested"),
-                "usersVoted": safe_get(node_data, "interestScore", "usersVoted"),
-                "markdownValueList": markdown_value_list,
-                "markdownValue": safe_get(node_data, "displayableProperty", "value", "markdown"),
-                "recorded_at": datetime.datetime.utcnow().isoformat()
-            }
-            locations_data.append(item_details)
+            locations_data.append({"item_id": item_id, **extract_location(node_data), "recorded_at": recorded_at})
         return locations_data
     except Exception as e:
         logger.error(f"Error in parse_locations processing nodes: {e}")
-        return None
\ No newline at end of file
+        return None
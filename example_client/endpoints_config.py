@@ -1,5 +1,5 @@
-from example_client.endpoints.locations import parse_locations
-from example_client.client import enum_requests
+from example_client.endpoints.locations import parse_locations, LOCATIONS_SCHEMA
+from example_client.client import GRAPHQL_URL, enum_requests, async_enum_requests, batch_enum_requests, plan_requests, get_page, decode_page
 
 endpoints = {
     "locations": {
@@ -8,12 +8,33 @@ endpoints = {
         "failed_table": "failed_location_details_requests",
         "source_table": "db_location_for_ids",
         "filter_func": parse_locations,
+        # Typed columns for the Arrow write path; remove to fall back to pandas
+        "arrow_schema": LOCATIONS_SCHEMA,
+        # parse_locations fills Arrow columns directly instead of building a dict per row
+        "columnar": True,
         "get_function": enum_requests,
+        "async_get_function": async_enum_requests,
+        # Fetches several IDs per request when "batch_operations" is set (threads engine, without fanout)
+        "batch_function": batch_enum_requests,
+        "batch_operations": None,
+        # Spread enum combinations and pages over the worker pool (fanout_worker)
+        "fanout": True,
+        "plan_function": plan_requests,
+        "page_function": get_page,
+        # Turns a recorded response body back into a page for --replay
+        "decode_function": decode_page,
+        # Host the connection pools are pre-warmed against with --prewarm
+        "url": GRAPHQL_URL,
         "endpoint_name": "LocationsPaginated",
         "query_hash": "abc",
         "column_counter": None,
-        "data_location": ("path", "to", "json", "data"),
-        "pageinfo_location": ("path", "to", "json", "pageInfo"),
+        "data_location": ("data", "item", "locations", "edges"),
+        "pageinfo_location": ("data", "item", "locations", "pageInfo"),
         "id_param": "unique_id",
+        # Optional token bucket shared by all workers, e.g. {"rate": 10.0, "burst": 20}
+        "rate_limit": None,
+        # Where rows go (utils/sinks.py); None writes to DuckDB. e.g. {"type": "parquet", "path": "output",
+        # "partition_by": {"recorded_date": ("recorded_at", date_partition)}, "max_bytes": 134217728, "max_age": 300}
+        "sink": None,
     },
 }
\ No newline at end of file
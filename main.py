@@ -7,7 +7,22 @@ from queue import Queue
 from dotenv import load_dotenv
 from utils.eventrecorder import Recorder
 from utils.progress_bar import ProgressUpdater
-from utils.workers import worker, writer_thread, failure_worker
+from utils.workers import id_feeder, request_observers, worker, fanout_worker, multi_worker, replay_worker, writer_thread, failure_worker
+from utils.fanout import ResultAssembler
+from utils.fair_queue import FairQueue
+from utils.checkpoint import CheckpointJournal
+from utils.id_source import FilteredIdSource
+from utils.async_workers import run_async_engine
+from utils.concurrency import AdaptiveConcurrencyController
+from utils.proxy_pool import ProxyPool
+from utils.http_retry import shared_proxy_adapter
+from utils.parse_pool import parse_pool
+from utils.response_cache import response_cache
+from utils.recorder import response_recorder
+from utils.lease import LeaseTable, LeasedIdSource
+from utils.metrics import metrics, queue_depth, retry_observer
+from utils.retry_scheduler import retry_scheduler
+from utils.rate_limit import rate_limiter, endpoint_bucket_key, proxy_bucket_key
 from example_client.base_client import BaseClient
 from example_client.endpoints_config import endpoints
 from utils.config_loader import load_config
@@ -15,7 +30,8 @@ from utils.config_loader import load_config
 load_dotenv()
 
 # Initialize logging
-logger = Recorder(script_name="ThreadedAPI", directory="logs", level="INFO").logger
+recorder = Recorder(script_name="ThreadedAPI", directory="logs", level="INFO")
+logger = recorder.logger
 
 # Load configuration
 config = load_config()
@@ -24,6 +40,27 @@ SENTINEL = object()
 NUM_THREADS = 4
 BATCH_SIZE = 10
 MAX_RECORDS = 100
+RECORD_QUEUE_SIZE = 10000
+ID_CHUNK_SIZE = 10000
+CHECKPOINT_DIR = "checkpoints"
+MAX_IN_FLIGHT = 200
+MIN_WORKERS = 1
+MAX_WORKERS = 32
+PROXY_RATE_LIMIT = None
+PROXY_BURST = None
+FLUSH_ROWS = None
+FLUSH_BYTES = 64 * 1024 * 1024
+FLUSH_AGE = 10.0
+PARSE_PROCESSES = 0
+LEASE_SIZE = 1000
+LEASE_TTL = 60.0
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_BYTES = 1024 ** 3
+RECORD_SEGMENT_BYTES = 64 * 1024 * 1024
+RETRY_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+POOL_IDLE_TIMEOUT = 60.0
 
 def make_proxy(prefix=""):
     user = os.getenv(f"SCRAPOXY{prefix}_USER")
@@ -41,6 +78,15 @@ def make_proxy(prefix=""):
 
 proxies = [make_proxy(), make_proxy("_2")]
 
+def parse_endpoints(value):
+    """'a:2,b' -> {"a": 2.0, "b": None}; a missing weight falls back to the endpoint config."""
+    weights = {}
+    for part in value.split(","):
+        key, _, weight = part.strip().partition(":")
+        if key:
+            weights[key] = float(weight) if weight else None
+    return weights
+
 def main():
     parser = argparse.ArgumentParser(description="Threaded API Miner")
     parser.add_argument(
@@ -49,153 +95,670 @@ def main():
         default=os.getenv("DEFAULT_ENDPOINT", "locations"),
         help="The endpoint key to use (default: 'locations')."
     )
+    parser.add_argument(
+        "--endpoints",
+        help="Several endpoint keys to mine in one run with shared workers, e.g. 'locations:2,reviews' "
+             "(optional weights override each endpoint's 'weight'; threads engine only)."
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        default="threads",
+        help="Fetch engine: a pool of worker threads or a single asyncio event loop (default: 'threads')."
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=MAX_IN_FLIGHT,
+        help=f"Maximum concurrent requests for the async engine (default: {MAX_IN_FLIGHT})."
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Scale the live worker count from observed latency, error rate and queue depth."
+    )
+    parser.add_argument(
+        "--min-workers",
+        type=int,
+        default=MIN_WORKERS,
+        help=f"Adaptive floor for live workers (default: {MIN_WORKERS})."
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Adaptive ceiling for worker threads; the async engine uses --max-in-flight (default: {MAX_WORKERS})."
+    )
+    parser.add_argument(
+        "--id-source",
+        choices=["mock", "duckdb"],
+        default="mock",
+        help="Where IDs come from: generated mock IDs or the endpoint's source_table in DuckDB (default: 'mock')."
+    )
+    parser.add_argument(
+        "--max-records",
+        type=int,
+        default=MAX_RECORDS,
+        help=f"Maximum number of IDs to mine, 0 for no limit (default: {MAX_RECORDS})."
+    )
+    parser.add_argument(
+        "--skip-mined",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="With --id-source duckdb, leave out IDs already in the endpoint's table or failed table (default: on)."
+    )
+    parser.add_argument(
+        "--fresh-within",
+        type=float,
+        help="Only skip IDs mined within this many seconds; older ones are mined again."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help=f"Journal progress to this SQLite file (default with --resume: {CHECKPOINT_DIR}/<endpoint>.sqlite)."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last checkpointed run: skip finished IDs and restart pagination from saved cursors."
+    )
+    parser.add_argument(
+        "--proxy-rate",
+        type=float,
+        default=PROXY_RATE_LIMIT,
+        help="Requests per second allowed through each proxy (default: unlimited)."
+    )
+    parser.add_argument(
+        "--proxy-burst",
+        type=float,
+        default=PROXY_BURST,
+        help="Token bucket capacity per proxy (default: one second of --proxy-rate)."
+    )
+    parser.add_argument(
+        "--flush-rows",
+        type=int,
+        default=FLUSH_ROWS,
+        help="Rows buffered before the writer flushes to DuckDB (default: half of threads x batch size)."
+    )
+    parser.add_argument(
+        "--flush-bytes",
+        type=int,
+        default=FLUSH_BYTES,
+        help=f"Estimated buffered bytes that trigger a flush, 0 to disable (default: {FLUSH_BYTES})."
+    )
+    parser.add_argument(
+        "--flush-age",
+        type=float,
+        default=FLUSH_AGE,
+        help=f"Seconds the oldest buffered row may wait before a flush, 0 to disable (default: {FLUSH_AGE})."
+    )
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=PARSE_PROCESSES,
+        help="Decode responses and run the endpoint's filter_func in this many processes (default: 0, parse in the I/O threads)."
+    )
+    parser.add_argument(
+        "--coordinator",
+        help="Shared SQLite lease table; several processes or hosts pointing at it split the IDs between them."
+    )
+    parser.add_argument(
+        "--worker-id",
+        help="Name of this node in the lease table (default: hostname-pid)."
+    )
+    parser.add_argument(
+        "--lease-job",
+        help="Job name in the lease table, change it to mine the same endpoint again (default: the endpoint)."
+    )
+    parser.add_argument(
+        "--lease-size",
+        type=int,
+        default=LEASE_SIZE,
+        help=f"IDs per leased range (default: {LEASE_SIZE})."
+    )
+    parser.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=LEASE_TTL,
+        help=f"Seconds a lease survives without a heartbeat before other nodes may take it over (default: {LEASE_TTL})."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of an on-disk response cache consulted before the API (default: no cache)."
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=CACHE_TTL,
+        help=f"Seconds a cached response stays valid, 0 for no expiry (default: {CACHE_TTL})."
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=CACHE_MAX_BYTES,
+        help=f"Compressed size above which least recently used responses are evicted (default: {CACHE_MAX_BYTES})."
+    )
+    parser.add_argument(
+        "--record",
+        help="Directory to append raw responses to, as rotating gzip NDJSON segments."
+    )
+    parser.add_argument(
+        "--record-segment-bytes",
+        type=int,
+        default=RECORD_SEGMENT_BYTES,
+        help=f"Uncompressed bytes per recorded segment before rotating (default: {RECORD_SEGMENT_BYTES})."
+    )
+    parser.add_argument(
+        "--replay",
+        help="Parse and write the responses recorded in this directory instead of calling the API."
+    )
+    parser.add_argument(
+        "--retry-attempts",
+        type=int,
+        default=RETRY_ATTEMPTS,
+        help=f"Retries for an ID (or page) that failed with a timeout, throttling or 5xx before it is written to the failed table (default: {RETRY_ATTEMPTS})."
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=RETRY_DELAY,
+        help=f"Backoff before the first retry, doubled for each further attempt, with jitter (default: {RETRY_DELAY})."
+    )
+    parser.add_argument(
+        "--retry-max-delay",
+        type=float,
+        default=RETRY_MAX_DELAY,
+        help=f"Upper bound for the retry backoff in seconds (default: {RETRY_MAX_DELAY})."
+    )
+    parser.add_argument(
+        "--pool-idle-timeout",
+        type=float,
+        default=POOL_IDLE_TIMEOUT,
+        help=f"Close kept-alive connections to a proxy after this many idle seconds (default: {POOL_IDLE_TIMEOUT})."
+    )
+    parser.add_argument(
+        "--prewarm",
+        type=int,
+        default=0,
+        help="Open this many connections through every proxy before the workers start (threads engine)."
+    )
+    parser.add_argument(
+        "--batch-operations",
+        type=int,
+        help="Send this many operations per request as a GraphQL batch (overrides the endpoint's batch_operations)."
+    )
+    parser.add_argument(
+        "--sink",
+        choices=["duckdb", "parquet", "ndjson"],
+        help="Write rows to DuckDB or to rolling Parquet/NDJSON files (overrides the endpoint's sink type)."
+    )
+    parser.add_argument(
+        "--sink-path",
+        help="Directory for Parquet/NDJSON output (default: output)."
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        help="Level for every logger, e.g. DEBUG to include per-page and urllib3 messages (default: INFO)."
+    )
+    parser.add_argument(
+        "--debug-sample",
+        type=float,
+        default=1.0,
+        help="Share of DEBUG records to keep, to sample high-volume debug logging (default: 1.0)."
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Log progress periodically instead of drawing a progress bar (the default without a terminal)."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this local port."
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Write all metrics to this JSON file at exit."
+    )
     args = parser.parse_args()
-
-    endpoint_key = args.endpoint
-    if endpoint_key not in endpoints:
-        logger.error(f"Invalid endpoint key: {endpoint_key}. Available keys: {list(endpoints.keys())}")
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+    recorder.set_level(args.log_level, debug_sample=args.debug_sample)
+
+    if args.endpoints:
+        endpoint_weights = parse_endpoints(args.endpoints)
+    else:
+        endpoint_weights = {args.endpoint: None}
+    unknown = [key for key in endpoint_weights if key not in endpoints]
+    if unknown:
+        logger.error(f"Invalid endpoint key: {', '.join(unknown)}. Available keys: {list(endpoints.keys())}")
         return
+    multi_endpoint = len(endpoint_weights) > 1
+    if multi_endpoint:
+        for flag, used in (("--engine async", args.engine == "async"), ("--replay", args.replay), ("--coordinator", args.coordinator)):
+            if used:
+                parser.error(f"{flag} cannot be combined with several endpoints")
 
-    endpoint_config = endpoints[endpoint_key]
     app_state = {
         'terminate_flag': threading.Event(),
         'writer_terminate_flag': threading.Event(),
         'failure_terminate_flag': threading.Event()
     }
 
-    signal.signal(signal.SIGINT, handle_interrupt)
-
     def handle_interrupt(signal_num, frame):
-        logger.info("Interrupt received. Cleaning up...")
+        if app_state['terminate_flag'].is_set():
+            logger.info("Second interrupt received. Exiting without flushing.")
+            exit(1)
+        # Stop taking new work but let the writers flush what has been fetched,
+        # so the checkpoint journal reflects everything that reached the database.
+        logger.info("Interrupt received. Finishing in-flight work and flushing batches (Ctrl-C again to exit now)...")
         app_state['terminate_flag'].set()
-        app_state['writer_terminate_flag'].set()
-        app_state['failure_terminate_flag'].set()
-        exit(0)
 
     signal.signal(signal.SIGINT, handle_interrupt)
 
-    endpoint_config = endpoints[endpoint_key]
-
-    progress_updater = ProgressUpdater(total=MAX_RECORDS)
+    endpoint_configs = [endpoints[key] for key in endpoint_weights]
+    for endpoint_config in endpoint_configs:
+        if args.sink or args.sink_path:
+            sink = dict(endpoint_config.get("sink") or {})
+            if args.sink:
+                sink["type"] = args.sink
+            if args.sink_path:
+                sink["path"] = args.sink_path
+            endpoint_config["sink"] = sink
+        sink_type = (endpoint_config.get("sink") or {}).get("type", "duckdb")
+        if args.skip_mined and args.id_source == "duckdb" and sink_type != "duckdb":
+            logger.warning(f"--skip-mined looks for mined IDs in DuckDB tables, but {endpoint_config['name']} writes to {sink_type} files; IDs already in them are fetched again")
+
+        if args.batch_operations is not None:
+            endpoint_config["batch_operations"] = args.batch_operations
+        if endpoint_config.get("batch_operations") and (endpoint_config.get("fanout") or args.engine != "threads" or multi_endpoint):
+            logger.warning(f"batch_operations only applies to single-endpoint runs of the threads engine without fanout; {endpoint_config['name']} sends one operation per request")
+
+        endpoint_rate = endpoint_config.get("rate_limit")
+        if endpoint_rate:
+            rate_limiter.configure(endpoint_bucket_key(endpoint_config["name"]), endpoint_rate["rate"], endpoint_rate.get("burst"))
+
+    # One pool for every worker so proxy health is learned from all traffic.
+    proxy_pool = ProxyPool(proxies)
+
+    if args.proxy_rate:
+        for proxy_url, _ in proxies:
+            rate_limiter.configure(proxy_bucket_key(proxy_url), args.proxy_rate, args.proxy_burst)
+
+    if args.metrics_port or args.metrics_json:
+        metrics.open(port=args.metrics_port, json_path=args.metrics_json)
+    if args.retry_attempts:
+        retry_scheduler.start(args.retry_attempts, base_delay=args.retry_delay, max_delay=args.retry_max_delay)
+    if args.cache_dir:
+        response_cache.open(args.cache_dir, ttl=args.cache_ttl, max_bytes=args.cache_max_bytes)
+    if args.record:
+        response_recorder.open(args.record, segment_bytes=args.record_segment_bytes)
+    if args.parse_processes:
+        parse_pool.start({endpoint_config["name"]: endpoint_config for endpoint_config in endpoint_configs}, args.parse_processes)
+
+    max_records = args.max_records or None
+    progress_updater = ProgressUpdater(
+        total=None if args.replay or not max_records else max_records * len(endpoint_configs),
+        headless=True if args.headless else None,
+        logger=logger
+    )
     for key in ["✍️", "❌", "🤔", "🙋", "🫸"]:
         progress_updater.set_meta(key, 0)
 
-    base_data = BaseClient(config["DUCKDB_TOKEN"], max_records=MAX_RECORDS)
-    unprocessed_ids = base_data.get_example_endpoint_ids(
-        endpoint_config["table_name"],
-        endpoint_config.get("column_counter", 1),
+    weights = {
+        endpoint_config["name"]: weight if weight is not None else endpoint_config.get("weight", 1.0)
+        for endpoint_config, weight in zip(endpoint_configs, endpoint_weights.values())
+    }
+    start_time = time.time()
+    adapters, controller = run_endpoints(endpoint_configs, weights, args, app_state, proxy_pool, progress_updater, max_records)
+    close_run(args, proxy_pool, adapters, controller, progress_updater, start_time)
+
+def endpoint_id_source(endpoint_config, args, app_state, base_data, max_records):
+    """
+    The IDs to mine for an endpoint: its ID source (nothing with --replay, where the
+    recording stands in for it), claimed range by range with --coordinator, less the
+    IDs a resumed checkpoint journal has finished. Returns (id_source, lease_table, journal).
+    """
+    name = endpoint_config["name"]
+    id_source = base_data.get_id_source(
+        endpoint_config,
+        source=args.id_source,
         counter_filter=1,
-        limit=MAX_RECORDS,
-        order_type='desc'
+        limit=max_records,
+        order_type='desc',
+        chunk_size=ID_CHUNK_SIZE,
+        skip_mined=args.skip_mined,
+        fresh_within=args.fresh_within
     )
-
-    if not unprocessed_ids:
-        logger.info("No unprocessed IDs found.")
-        progress_updater.close()
-        return
-
-    record_queue = Queue()
-    result_queue = Queue()
-    failure_queue = Queue()
-
-    for id_tuple in unprocessed_ids:
-        record_queue.put(id_tuple)
-
-    for _ in range(NUM_THREADS):
-        record_queue.put(SENTINEL)
-
-    threads = []
-    for num in range(NUM_THREADS):
-        t = threading.Thread(
-            target=worker,
+    if args.replay:
+        id_source = []
+
+    lease_table = None
+    if args.coordinator:
+        lease_table = LeaseTable(
+            args.coordinator,
+            args.lease_job or name,
+            worker_id=args.worker_id,
+            range_size=args.lease_size,
+            ttl=args.lease_ttl
+        )
+        id_source = LeasedIdSource(id_source, lease_table, app_state['terminate_flag'])
+
+    journal = None
+    checkpoint_path = args.checkpoint or (os.path.join(CHECKPOINT_DIR, f"{name}.sqlite") if args.resume else None)
+    if checkpoint_path:
+        # Journals are kept per endpoint, so one checkpoint file can hold all of them.
+        journal = CheckpointJournal(checkpoint_path, name, resume=args.resume)
+        if journal.resumed:
+            # Checked a lease at most at a time so filtering does not claim ranges ahead.
+            id_source = FilteredIdSource(
+                id_source,
+                journal.completed_among,
+                chunk_size=args.lease_size if lease_table else 1000
+            )
+    return id_source, lease_table, journal
+
+def run_endpoints(endpoint_configs, weights, args, app_state, proxy_pool, progress_updater, max_records):
+    """
+    Mines one or several endpoints. Every endpoint keeps its own ID source, checkpoint
+    journal, writer and failure writer. A single endpoint has a record queue to itself,
+    fetched by its worker (fanout_worker for fan-out endpoints), the async engine or
+    a replay of a recording. Several endpoints share one pool of multi_worker threads
+    through a FairQueue that divides the workers by weight; fan-out endpoints are then
+    fetched a whole ID at a time by their get_function. The threads engine sends all
+    traffic through one connection pool adapter over the shared ProxyPool, so every
+    endpoint reuses the same kept-alive connections. Returns the adapters and the
+    concurrency controller for close_run.
+    """
+    multi_endpoint = len(endpoint_configs) > 1
+    threaded = args.engine == "threads" and not args.replay
+
+    if multi_endpoint:
+        fair_queue = FairQueue(weights, maxsize=RECORD_QUEUE_SIZE, sentinel=SENTINEL)
+        record_qsize = fair_queue.qsize
+    else:
+        # Bounded so IDs are read from the source only as fast as workers consume them.
+        # With a lease table, buffering more than a range would hoard IDs other nodes could mine.
+        record_queue = Queue(maxsize=min(RECORD_QUEUE_SIZE, args.lease_size) if args.coordinator else RECORD_QUEUE_SIZE)
+        record_qsize = record_queue.qsize
+    queue_depth.set_function(record_qsize, queue="record")
+
+    controller = None
+    num_threads = NUM_THREADS
+    if args.adaptive:
+        if args.engine == "threads":
+            num_threads = max(NUM_THREADS, args.max_workers)
+            initial, ceiling = NUM_THREADS, args.max_workers
+        else:
+            initial, ceiling = max(args.min_workers, args.max_in_flight // 4), args.max_in_flight
+        controller = AdaptiveConcurrencyController(
+            initial=initial,
+            floor=args.min_workers,
+            ceiling=ceiling,
+            queue_depth=record_qsize,
+            logger=logger
+        )
+        controller_thread = threading.Thread(
+            target=controller.run,
+            args=(app_state['terminate_flag'],),
+            name="ConcurrencyController"
+        )
+        controller_thread.daemon = True
+        controller_thread.start()
+
+    # Workers share one connection pool per proxy, sized so every worker can hold a
+    # kept-alive connection to any proxy. Mined alongside others, an endpoint's requests
+    # are labelled for metrics by the endpoint_context multi_worker makes them in.
+    adapter = None
+    if threaded:
+        label_config = None if multi_endpoint else endpoint_configs[0]
+        adapter = shared_proxy_adapter(
+            proxy_pool,
+            pool_maxsize=num_threads,
+            observers=request_observers(label_config, controller),
+            idle_timeout=args.pool_idle_timeout or None,
+            on_retry=retry_observer(label_config["name"] if label_config else None)
+        )
+        if args.prewarm:
+            for url in dict.fromkeys(endpoint_config.get("url") for endpoint_config in endpoint_configs):
+                if url:
+                    opened = adapter.prewarm(url, args.prewarm)
+                    logger.info(f"Pre-warmed {opened} connections to {url}")
+
+    if multi_endpoint:
+        num_consumers = 1
+    elif args.replay:
+        num_consumers = 0
+    else:
+        num_consumers = num_threads if args.engine == "threads" else 1
+
+    base_data = BaseClient(config["DUCKDB_TOKEN"], max_records=max_records)
+    routes = {}
+    feeders = []
+    writers = []
+    for endpoint_config in endpoint_configs:
+        name = endpoint_config["name"]
+        if multi_endpoint and endpoint_config.get("fanout"):
+            logger.info(f"{name} is fetched one ID at a time when mined alongside other endpoints")
+        id_source, lease_table, journal = endpoint_id_source(endpoint_config, args, app_state, base_data, max_records)
+
+        intake = fair_queue.lane(name) if multi_endpoint else record_queue
+        result_queue = Queue()
+        failure_queue = Queue()
+        prefix = f"{name}_" if multi_endpoint else ""
+        queue_depth.set_function(result_queue.qsize, queue=f"{prefix}result")
+        queue_depth.set_function(failure_queue.qsize, queue=f"{prefix}failure")
+        routes[name] = {
+            "config": endpoint_config,
+            "result_queue": result_queue,
+            "failure_queue": failure_queue,
+            "journal": journal,
+            "lease_table": lease_table,
+        }
+
+        suffix = f"-{name}" if multi_endpoint else ""
+        feeder = threading.Thread(
+            target=id_feeder,
+            args=(id_source, intake, num_consumers, app_state['terminate_flag'], progress_updater, SENTINEL),
+            name=f"IdFeeder{suffix}"
+        )
+        writer = threading.Thread(
+            target=writer_thread,
             args=(
-                record_queue,
                 result_queue,
+                intake,
+                NUM_THREADS,
+                BATCH_SIZE,
+                MAX_RECORDS,
+                endpoint_config,
+                config["DUCKDB_TOKEN"],
+                app_state['writer_terminate_flag'],
+                progress_updater,
+                SENTINEL,
+                journal
+            ),
+            kwargs={
+                "flush_rows": args.flush_rows,
+                "flush_bytes": args.flush_bytes or None,
+                "flush_age": args.flush_age or None,
+            },
+            name=f"WriterThread{suffix}"
+        )
+        failure_writer = threading.Thread(
+            target=failure_worker,
+            args=(
                 failure_queue,
+                intake,
                 BATCH_SIZE,
+                MAX_RECORDS,
                 endpoint_config,
                 config["DUCKDB_TOKEN"],
-                app_state['terminate_flag'],
+                app_state['failure_terminate_flag'],
                 progress_updater,
-                proxies,
-                SENTINEL
+                SENTINEL,
+                journal
             ),
-            name=f"Worker-{num}"
+            name=f"FailWriterThread{suffix}"
         )
-        t.daemon = True  # Ensure thread terminates with the main program
-        t.start()
-        threads.append(t)
-
-    writer = threading.Thread(
-        target=writer_thread,
-        args=(
-            result_queue,
-            record_queue,
-            NUM_THREADS,
-            BATCH_SIZE,
-            MAX_RECORDS,
-            endpoint_config,
-            config["DUCKDB_TOKEN"],
-            app_state['writer_terminate_flag'],
-            progress_updater,
-            SENTINEL
-        ),
-        name="WriterThread"
-    )
-    writer.daemon = True
-    writer.start()
-
-    failure_writer = threading.Thread(
-        target=failure_worker,
-        args=(
-            failure_queue,
-            record_queue,
-            BATCH_SIZE,
-            MAX_RECORDS,
-            endpoint_config,
-            config["DUCKDB_TOKEN"],
-            app_state['failure_terminate_flag'],
-            progress_updater,
-            SENTINEL
-        ),
-        name="FailWriterThread"
-    )
-    failure_writer.daemon = True
-    failure_writer.start()
+        for t in (feeder, writer, failure_writer):
+            t.daemon = True
+            t.start()
+        feeders.append(feeder)
+        writers.append((writer, result_queue))
+        writers.append((failure_writer, failure_queue))
 
-    start_time = time.time()
-
-    try:
-        record_queue.join(timeout=30)
-    except Exception as e:
-        logger.error(f"Error while waiting for record_queue to join: {e}")
-    
-    result_queue.put(SENTINEL)
+    threads = []
+    if multi_endpoint:
+        for num in range(num_threads):
+            t = threading.Thread(
+                target=multi_worker,
+                args=(
+                    fair_queue,
+                    routes,
+                    BATCH_SIZE,
+                    app_state['terminate_flag'],
+                    progress_updater,
+                    SENTINEL,
+                    controller,
+                    num
+                ),
+                kwargs={"adapter": adapter},
+                name=f"Worker-{num}"
+            )
+            t.daemon = True
+            t.start()
+            threads.append(t)
+    else:
+        endpoint_config, route = endpoint_configs[0], routes[endpoint_configs[0]["name"]]
+        # Fan-out workers share follow-up pages and enum combinations through unit_queue.
+        unit_queue = Queue()
+        assembler = ResultAssembler()
+        for num in range(num_threads if threaded else 0):
+            common_args = (
+                route["result_queue"],
+                route["failure_queue"],
+                BATCH_SIZE,
+                endpoint_config,
+                config["DUCKDB_TOKEN"],
+                app_state['terminate_flag'],
+                progress_updater,
+                proxy_pool,
+                SENTINEL,
+                controller,
+                num
+            )
+            if endpoint_config.get("fanout"):
+                target, worker_args = fanout_worker, (record_queue, unit_queue, assembler) + common_args
+                worker_kwargs = {"journal": route["journal"], "adapter": adapter}
+            else:
+                target, worker_args, worker_kwargs = worker, (record_queue,) + common_args, {"adapter": adapter}
+            t = threading.Thread(
+                target=target,
+                args=worker_args,
+                kwargs=worker_kwargs,
+                name=f"Worker-{num}"
+            )
+            t.daemon = True  # Ensure thread terminates with the main program
+            t.start()
+            threads.append(t)
+
+        if args.replay:
+            # Recorded responses stand in for the ID source and the fetching workers.
+            replay = threading.Thread(
+                target=replay_worker,
+                args=(
+                    args.replay,
+                    route["result_queue"],
+                    route["failure_queue"],
+                    BATCH_SIZE,
+                    endpoint_config,
+                    app_state['terminate_flag'],
+                    progress_updater
+                ),
+                name="Replay"
+            )
+            replay.daemon = True
+            replay.start()
+            threads.append(replay)
+        elif args.engine == "async":
+            run_async_engine(
+                record_queue,
+                route["result_queue"],
+                route["failure_queue"],
+                BATCH_SIZE,
+                endpoint_config,
+                args.max_in_flight,
+                app_state['terminate_flag'],
+                progress_updater,
+                proxy_pool,
+                SENTINEL,
+                controller,
+                idle_timeout=args.pool_idle_timeout or None
+            )
+
+    # Workers flush their local batch after reading the sentinel, so wait for them
+    # before telling the writers there is nothing more to come.
+    for t in threads:
+        t.join()
+    for feeder in feeders:
+        feeder.join()
+    if retry_scheduler.active:
+        retry_scheduler.stop()
+        logger.info(f"Retries: {retry_scheduler.stats}")
+
+    # Every endpoint's writers get their own sentinel and flush independently.
+    for writer, writer_queue in writers:
+        writer_queue.put(SENTINEL)
+    for writer, _ in writers:
+        writer.join()
+
+    interrupted = app_state['terminate_flag'].is_set()
     app_state['terminate_flag'].set()
-
-    try:
-        result_queue.join(timeout=30)
-    except Exception as e:
-        logger.error(f"Error while waiting for result_queue to join: {e}")
-
-    failure_queue.put(SENTINEL)
-
-    try:
-        failure_queue.join(timeout=30)
-    except Exception as e:
-        logger.error(f"Error while waiting for failure_queue to join: {e}")
-
     app_state['writer_terminate_flag'].set()
     app_state['failure_terminate_flag'].set()
-
-    for t in threads:
-        t.join(timeout=10)
-    writer.join(timeout=10)
-    failure_writer.join(timeout=10)
+    for name, route in routes.items():
+        if route["lease_table"] is not None:
+            # Only a run that went through every claimed ID may mark its ranges as done.
+            route["lease_table"].close(done=not interrupted)
+        journal = route["journal"]
+        if journal is not None:
+            logger.info(f"Checkpoint run {journal.run_id} for {name}: {journal.batch_seq} batches journaled to {journal.path}")
+            journal.close()
+    if multi_endpoint:
+        for name, lane_stats in fair_queue.stats().items():
+            logger.info(f"Endpoint {name}: {lane_stats}")
+    return [adapter] if adapter is not None else [], controller
+
+def close_run(args, proxy_pool, adapters, controller, progress_updater, start_time):
+    """Shut down the shared services of a run and log their statistics."""
+    parse_pool.shutdown()
+    if response_recorder.active:
+        logger.info(f"Recorded responses: {response_recorder.stats}")
+        response_recorder.close()
+    if response_cache.active:
+        logger.info(f"Response cache: {response_cache.stats}, {response_cache.total_bytes} bytes on disk")
+        response_cache.close()
+
+    for proxy_health in proxy_pool.snapshot():
+        logger.info(f"Proxy health: {proxy_health}")
+    for adapter in adapters:
+        for pool_stats in adapter.pool_stats():
+            logger.info(f"Connection pool: {pool_stats}")
+        if adapter.evictions:
+            logger.info(f"Closed idle connection pools {adapter.evictions} times")
+        adapter.close()
+    if controller is not None:
+        logger.info(f"Adaptive concurrency made {len(controller.decisions)} scaling decisions, final limit {controller.limit}.")
 
     progress_updater.close()
     end_time = time.time()
-    logger.info(f"Processed {MAX_RECORDS} records in {end_time - start_time:.2f} seconds.")
+    logger.info(f"Processed {progress_updater.progress_bar.n} records in {end_time - start_time:.2f} seconds.")
+    if metrics.active:
+        metrics.close()
+        if args.metrics_json:
+            logger.info(f"Metrics written to {args.metrics_json}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import ssl
+import time
+import aiohttp
+from utils.http_retry import DEFAULT_TIMEOUT
+from utils.proxy_pool import ProxyPool
+from utils.rate_limit import rate_limiter, proxy_bucket_key, parse_retry_after
+
+logger = logging.getLogger("retry_logger")
+
+class AsyncRotatingProxySession:
+    """
+    asyncio counterpart of requests_retry_session: picks a proxy per request from a ProxyPool,
+    retries 5xx responses and connection errors with backoff and caps the number
+    of requests in flight. Connections are kept alive for idle_timeout seconds and
+    at most max_in_flight are open; connection_stats counts new and reused ones.
+    """
+
+    def __init__(
+            self,
+            proxies,
+            max_in_flight=200,
+            timeout=DEFAULT_TIMEOUT,
+            retries=3,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504),
+            ca_cert=None,
+            observers=None,
+            idle_timeout=60.0
+    ):
+        if isinstance(proxies, ProxyPool):
+            self.proxy_pool = proxies
+        else:
+            self.proxy_pool = ProxyPool(proxies, ca_cert=ca_cert)
+
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = frozenset(status_forcelist)
+        self.observers = [self.proxy_pool.observe] + list(observers or [])
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.idle_timeout = idle_timeout
+        self.ssl_contexts = {}
+        self.session = None
+        self.connection_stats = {"created": 0, "reused": 0}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_in_flight,
+            limit_per_host=0,
+            keepalive_timeout=self.idle_timeout
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._count("created"))
+        trace_config.on_connection_reuseconn.append(self._count("reused"))
+        self.session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    def _count(self, key):
+        async def on_connection(session, context, params):
+            self.connection_stats[key] += 1
+        return on_connection
+
+    def _ssl_for(self, ca_cert):
+        if not ca_cert:
+            return None
+        if ca_cert not in self.ssl_contexts:
+            self.ssl_contexts[ca_cert] = ssl.create_default_context(cafile=ca_cert)
+        return self.ssl_contexts[ca_cert]
+
+    def _notify(self, proxy, latency, status, error):
+        """Report the outcome of each attempt to every observer as (proxy, latency, status, error)."""
+        for observer in self.observers:
+            try:
+                observer(proxy, latency, status, error)
+            except Exception as e:
+                logger.error(f"Request observer failed: {e}")
+
+    async def post(self, url, timeout=None, **kwargs):
+        """
+        POST through the next proxy. The body is read before returning, and kept as
+        `response.body`, so the response can be inspected after the connection is released.
+        """
+        connect_timeout, read_timeout = timeout or (self.timeout, self.timeout)
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+
+        for attempt in range(self.retries + 1):
+            proxy, ca_cert = self.proxy_pool.acquire()
+            await rate_limiter.acquire_async(proxy_bucket_key(proxy))
+            try:
+                async with self.semaphore:
+                    start = time.monotonic()
+                    try:
+                        async with self.session.post(
+                            url,
+                            proxy=proxy,
+                            ssl=self._ssl_for(ca_cert),
+                            timeout=client_timeout,
+                            **kwargs
+                        ) as response:
+                            response.body = await response.read()
+                    except Exception as e:
+                        self._notify(proxy, time.monotonic() - start, None, e)
+                        raise
+                    self._notify(proxy, time.monotonic() - start, response.status, None)
+                if response.status == 429:
+                    rate_limiter.pause(proxy_bucket_key(proxy), parse_retry_after(response.headers.get("Retry-After")))
+                if response.status not in self.status_forcelist or attempt == self.retries:
+                    return response
+                logger.debug(f"Retrying {url} after status {response.status}")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                logger.debug(f"Retrying {url} after {type(e).__name__}: {e}")
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
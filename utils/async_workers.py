@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from queue import Empty
+from utils.async_http import AsyncRotatingProxySession
+from utils.parse_pool import parse_pool
+from utils.workers import collect_results, hand_off, request_observers, retry_or_dead_letter
+from utils.retry_scheduler import retry_scheduler, FetchFailure
+
+logger = logging.getLogger(__name__)
+
+def run_async_engine(
+        record_queue,
+        result_queue,
+        failure_queue,
+        batch_size,
+        config,
+        max_in_flight,
+        terminate_flag,
+        progress_updater,
+        proxies,
+        sentinel,
+        controller=None,
+        idle_timeout=60.0
+):
+    """
+    asyncio alternative to the worker threads. Reads IDs from the same record_queue,
+    runs config["async_get_function"] for up to max_in_flight IDs at once and feeds
+    the usual result_queue and failure_queue, so writer_thread and failure_worker
+    are shared with the threaded engine. Blocks until a sentinel is read.
+    With an AdaptiveConcurrencyController, max_in_flight is the ceiling and only
+    the first controller.limit coroutines take new IDs.
+    """
+    asyncio.run(_run_async_engine(
+        record_queue,
+        result_queue,
+        failure_queue,
+        batch_size,
+        config,
+        max_in_flight,
+        terminate_flag,
+        progress_updater,
+        proxies,
+        sentinel,
+        controller,
+        idle_timeout
+    ))
+
+async def _run_async_engine(
+        record_queue,
+        result_queue,
+        failure_queue,
+        batch_size,
+        config,
+        max_in_flight,
+        terminate_flag,
+        progress_updater,
+        proxies,
+        sentinel,
+        controller,
+        idle_timeout
+):
+    id_queue = asyncio.Queue(maxsize=max_in_flight)
+    local_batch = []
+    observers = request_observers(config, controller)
+
+    async with AsyncRotatingProxySession(proxies, max_in_flight=max_in_flight, observers=observers, idle_timeout=idle_timeout) as session:
+        tasks = [
+            asyncio.create_task(async_worker(
+                id_queue,
+                record_queue,
+                result_queue,
+                failure_queue,
+                local_batch,
+                batch_size,
+                config,
+                session,
+                progress_updater,
+                controller,
+                index
+            ))
+            for index in range(max_in_flight)
+        ]
+        await pump_records(record_queue, id_queue, len(tasks), terminate_flag, sentinel)
+        if controller is not None:
+            controller.drain()
+        await asyncio.gather(*tasks)
+    logger.info(f"Connections: {session.connection_stats['created']} opened, {session.connection_stats['reused']} reused")
+
+    hand_off(local_batch, result_queue)
+
+async def pump_records(record_queue, id_queue, num_workers, terminate_flag, sentinel):
+    """
+    Moves items from the thread-safe record_queue onto the event loop until a sentinel
+    arrives, then tells every async worker to stop.
+    """
+    loop = asyncio.get_running_loop()
+
+    while not terminate_flag.is_set():
+        try:
+            item = await loop.run_in_executor(None, record_queue.get, True, 3)
+        except Empty:
+            continue
+
+        if item is sentinel:
+            # IDs still being fetched may fail and schedule a retry; once they are done,
+            # keep the sentinel behind any retry that can still come through the queue.
+            await id_queue.join()
+            if retry_scheduler.pending:
+                record_queue.put(sentinel)
+                record_queue.task_done()
+                await asyncio.sleep(0.2)
+                continue
+            record_queue.task_done()
+            break
+        await id_queue.put(item)
+
+    for _ in range(num_workers):
+        await id_queue.put(None)
+
+async def async_worker(
+        id_queue,
+        record_queue,
+        result_queue,
+        failure_queue,
+        local_batch,
+        batch_size,
+        config,
+        session,
+        progress_updater,
+        controller=None,
+        worker_index=0
+):
+    """
+    Coroutine counterpart of worker. local_batch is shared by all coroutines on the loop.
+    """
+    while True:
+        while controller is not None and worker_index >= controller.limit and not controller.draining:
+            await asyncio.sleep(0.1)
+
+        item = await id_queue.get()
+        if item is None:
+            break
+
+        example_id, record_count = item
+
+        try:
+            progress_updater.increment_meta("🙋", 1)
+            if not retry_scheduler.attempts_for(example_id):
+                progress_updater.update(1)
+            resp_data = await config["async_get_function"](
+                example_id,
+                record_count,
+                config,
+                session=session
+            )
+            if parse_pool.active and resp_data:
+                # Parsed in a pool process, off the event loop
+                resp_data = await parse_pool.parse_pages_async(resp_data, example_id, config["name"])
+
+            collect_results(
+                resp_data,
+                example_id,
+                record_count,
+                config,
+                local_batch,
+                batch_size,
+                result_queue,
+                failure_queue,
+                progress_updater
+            )
+        except FetchFailure as e:
+            retry_or_dead_letter(e, example_id, item, record_queue, config, failure_queue, progress_updater)
+        except Exception as e:
+            logger.error(f"Error processing ID {example_id}: {e}")
+        finally:
+            retry_scheduler.done(example_id)
+            record_queue.task_done()
+            id_queue.task_done()
+            progress_updater.set_meta("🫸", record_queue.qsize())
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from utils.metrics import flush_seconds
+
+logger = logging.getLogger(__name__)
+
+def estimate_bytes(rows):
+    """Rough in-memory size of a batch of row dicts, sampled from its first row."""
+    if hasattr(rows, "nbytes"):
+        return rows.nbytes
+    if not rows:
+        return 0
+    sample = rows[0]
+    row_bytes = sum(len(value) if isinstance(value, str) else 8 for value in sample.values())
+    return row_bytes * len(rows)
+
+class DoubleBufferedWriter:
+    """
+    Two buffers: the writer thread fills the active one while a background flusher
+    writes the other. The active buffer is swapped out once it reaches max_rows,
+    max_bytes (estimated) or max_age seconds since its first row. If the previous
+    flush is still running the active buffer keeps filling, and ingestion only waits
+    once it has grown to twice max_rows.
+
+    `flush` writes a buffer and clears it; `new_buffer` creates an empty one
+    (a list or an ArrowBatchBuilder). Flush latency is kept in `stats`. `on_idle`
+    is called from the flusher every idle_interval seconds it has nothing to flush,
+    so the sink can do time-based work on the thread that writes to it.
+    """
+
+    def __init__(self, flush, new_buffer, max_rows, max_bytes=None, max_age=None, name="Flusher", on_idle=None, idle_interval=1.0):
+        self.flush = flush
+        self.on_idle = on_idle
+        self.idle_interval = idle_interval
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.active = new_buffer()
+        self.spare = new_buffer()
+        self.pending = None
+        self.active_bytes = 0
+        self.active_since = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.stats = {
+            "flushes": 0,
+            "rows": 0,
+            "seconds": 0.0,
+            "max_seconds": 0.0,
+            "last_seconds": 0.0,
+        }
+
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, rows):
+        if not rows:
+            return
+        if self.active_since is None:
+            self.active_since = time.monotonic()
+        self.active.extend(rows)
+        if self.max_bytes:
+            self.active_bytes += estimate_bytes(rows)
+        self.maybe_swap()
+
+    def due(self):
+        if not len(self.active):
+            return False
+        if len(self.active) >= self.max_rows:
+            return True
+        if self.max_bytes and self.active_bytes >= self.max_bytes:
+            return True
+        return bool(self.max_age) and time.monotonic() - self.active_since >= self.max_age
+
+    def time_until_due(self, default=3):
+        """How long the writer can block on its queue before the age limit needs checking."""
+        if not self.max_age or self.active_since is None:
+            return default
+        return max(0.05, min(default, self.max_age - (time.monotonic() - self.active_since)))
+
+    def maybe_swap(self, force=False):
+        """Hand the active buffer to the flusher if a threshold is reached (or force)."""
+        if not len(self.active) or not (force or self.due()):
+            return
+        with self.condition:
+            if self.pending is not None:
+                if not force and len(self.active) < 2 * self.max_rows:
+                    return
+                while self.pending is not None:
+                    self.condition.wait()
+            self.pending, self.active, self.spare = self.active, self.spare, None
+            self.active_bytes = 0
+            self.active_since = None
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.pending is None and not self.closed:
+                    self.condition.wait(self.idle_interval if self.on_idle is not None else None)
+                buffer = self.pending
+                if buffer is None and self.closed:
+                    return
+            if buffer is None:
+                self._idle()
+                continue
+
+            rows = len(buffer)
+            start = time.monotonic()
+            try:
+                self.flush(buffer)
+            except Exception as e:
+                logger.error(f"Error flushing {rows} rows: {e}")
+                buffer.clear()
+            elapsed = time.monotonic() - start
+            flush_seconds.observe(elapsed, writer=self.thread.name)
+
+            with self.condition:
+                self.stats["flushes"] += 1
+                self.stats["rows"] += rows
+                self.stats["seconds"] += elapsed
+                self.stats["max_seconds"] = max(self.stats["max_seconds"], elapsed)
+                self.stats["last_seconds"] = elapsed
+                self.spare = buffer
+                self.pending = None
+                self.condition.notify_all()
+
+    def _idle(self):
+        if self.on_idle is None:
+            return
+        try:
+            self.on_idle()
+        except Exception as e:
+            logger.error(f"Error in {self.thread.name} idle check: {e}")
+
+    def close(self):
+        """Flush whatever is buffered and stop the flusher."""
+        self.maybe_swap(force=True)
+        with self.condition:
+            while self.pending is not None:
+                self.condition.wait()
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+        flushes = self.stats["flushes"]
+        if flushes:
+            logger.info(
+                f"{flushes} flushes, {self.stats['rows']} rows, "
+                f"avg {self.stats['seconds'] / flushes:.3f}s, max {self.stats['max_seconds']:.3f}s per flush"
+            )
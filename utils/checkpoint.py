@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+import pyarrow as pa
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# IDs per IN (...) lookup, below SQLite's limit on bound parameters.
+LOOKUP_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    endpoint TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completed_ids (
+    endpoint TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    example_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    endpoint TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    example_id TEXT NOT NULL,
+    chain INTEGER NOT NULL,
+    page_no INTEGER NOT NULL,
+    enum_params TEXT,
+    next_cursor TEXT,
+    payload BLOB NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    endpoint TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    table_name TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completed_ids ON completed_ids (endpoint, run_id, example_id);
+CREATE INDEX IF NOT EXISTS idx_pages ON pages (endpoint, run_id, example_id);
+"""
+
+def to_json(value):
+    """
+    Journal RecordBatches from columnar parsers as lists of row dicts, and response
+    bodies left for the parse pool as strings, which its decoder reads back as well.
+    """
+    if isinstance(value, pa.RecordBatch):
+        return value.to_pylist()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class CheckpointJournal:
+    """
+    SQLite journal of a run's progress for one endpoint.
+
+    Records IDs whose rows (or failure records) have been written, every fetched page
+    of a fan-out pagination chain with its endCursor until its ID is finished, and the
+    sequence number of every flushed batch. Each run gets a run_id; resume=True continues the endpoint's latest
+    run so finished IDs are skipped and half-paginated chains restart from their cursor.
+    """
+
+    def __init__(self, path, endpoint, resume=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.endpoint = endpoint
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(SCHEMA)
+
+        last_run = self.con.execute(
+            "SELECT MAX(run_id) FROM runs WHERE endpoint = ?", (endpoint,)
+        ).fetchone()[0]
+        self.resumed = resume and last_run is not None
+        if self.resumed:
+            self.run_id = last_run
+            logger.info(f"Resuming checkpoint run {self.run_id} for {endpoint} from {path}")
+        else:
+            if resume:
+                logger.warning(f"No checkpoint to resume for {endpoint} in {path}, starting a new run")
+            self.run_id = (last_run or 0) + 1
+            with self.con:
+                self.con.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?)",
+                    (endpoint, self.run_id, datetime.utcnow().isoformat())
+                )
+
+        self.batch_seq = self.con.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM batches WHERE endpoint = ? AND run_id = ?",
+            (endpoint, self.run_id)
+        ).fetchone()[0]
+
+    def completed_among(self, example_ids):
+        """
+        The IDs of example_ids already written or dead-lettered in this run, looked up
+        through the completed_ids index so the journal is never loaded as a whole.
+        """
+        completed = set()
+        example_ids = [str(example_id) for example_id in example_ids]
+        with self.lock:
+            for start in range(0, len(example_ids), LOOKUP_BATCH):
+                batch = example_ids[start:start + LOOKUP_BATCH]
+                rows = self.con.execute(
+                    "SELECT example_id FROM completed_ids WHERE endpoint = ? AND run_id = ? "
+                    f"AND example_id IN ({', '.join('?' * len(batch))})",
+                    [self.endpoint, self.run_id] + batch
+                ).fetchall()
+                completed.update(row[0] for row in rows)
+        return completed
+
+    def mark_completed(self, example_ids, status="written"):
+        """
+        Record IDs as written (or failed) and drop their journaled pages, which are
+        only needed to resume IDs that are not finished.
+        """
+        recorded_at = datetime.utcnow().isoformat()
+        example_ids = [str(example_id) for example_id in example_ids]
+        with self.lock, self.con:
+            self.con.executemany(
+                "INSERT INTO completed_ids VALUES (?, ?, ?, ?, ?)",
+                [(self.endpoint, self.run_id, example_id, status, recorded_at) for example_id in example_ids]
+            )
+            self.con.executemany(
+                "DELETE FROM pages WHERE endpoint = ? AND run_id = ? AND example_id = ?",
+                [(self.endpoint, self.run_id, example_id) for example_id in example_ids]
+            )
+
+    def record_page(self, example_id, chain, page_no, enum_params, next_cursor, data):
+        payload = zlib.compress(json.dumps(data, default=to_json).encode("utf-8"))
+        with self.lock, self.con:
+            self.con.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.endpoint,
+                    self.run_id,
+                    str(example_id),
+                    chain,
+                    page_no,
+                    json.dumps(enum_params) if enum_params else None,
+                    next_cursor,
+                    payload,
+                    datetime.utcnow().isoformat()
+                )
+            )
+
+    def load_pages(self, example_id):
+        """
+        Pages already fetched for an ID, as {chain: (pages, next_cursor)} where
+        next_cursor is None once the chain reached its last page.
+        """
+        with self.lock:
+            rows = self.con.execute(
+                "SELECT chain, page_no, next_cursor, payload FROM pages "
+                "WHERE endpoint = ? AND run_id = ? AND example_id = ? ORDER BY chain, page_no",
+                (self.endpoint, self.run_id, str(example_id))
+            ).fetchall()
+
+        chains = {}
+        for chain, page_no, next_cursor, payload in rows:
+            pages, _ = chains.get(chain, ([], None))
+            if page_no != len(pages):
+                continue  # duplicate of a page recorded twice
+            pages.append(json.loads(zlib.decompress(payload)))
+            chains[chain] = (pages, next_cursor)
+        return chains
+
+    def record_batch(self, table_name, row_count):
+        """Journal a flushed batch and return its sequence number."""
+        with self.lock, self.con:
+            self.batch_seq += 1
+            self.con.execute(
+                "INSERT INTO batches VALUES (?, ?, ?, ?, ?, ?)",
+                (self.endpoint, self.run_id, self.batch_seq, table_name, row_count, datetime.utcnow().isoformat())
+            )
+            return self.batch_seq
+
+    def close(self):
+        with self.lock:
+            self.con.close()
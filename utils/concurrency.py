@@ -0,0 +1,125 @@
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD controller for the number of live workers.
+
+    Workers report every request through observe() (it matches the adapter observer
+    signature) and park in wait_for_slot() while their index is above the current limit.
+    Every interval the controller looks at the requests seen since the last evaluation:
+    too many 429/5xx/transport errors or a slow latency percentile shrinks the limit
+    multiplicatively, a healthy window with a record_queue backlog grows it by one step.
+    """
+
+    def __init__(
+            self,
+            initial,
+            floor=1,
+            ceiling=32,
+            target_latency=2.0,
+            latency_percentile=0.9,
+            max_error_rate=0.05,
+            increase_step=1,
+            decrease_factor=0.75,
+            interval=5.0,
+            min_samples=10,
+            queue_depth=None,
+            logger=logger
+    ):
+        if not 1 <= floor <= ceiling:
+            raise ValueError("Concurrency floor must be at least 1 and no greater than the ceiling.")
+
+        self.floor = floor
+        self.ceiling = ceiling
+        self.limit = max(floor, min(initial, ceiling))
+        self.target_latency = target_latency
+        self.latency_percentile = latency_percentile
+        self.max_error_rate = max_error_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.interval = interval
+        self.min_samples = min_samples
+        self.queue_depth = queue_depth or (lambda: 0)
+        self.logger = logger
+
+        self.samples = []
+        self.decisions = []
+        self.draining = False
+        self.condition = threading.Condition()
+
+    def observe(self, proxy, latency, status, error=None):
+        """Record one request outcome."""
+        with self.condition:
+            self.samples.append((latency, status))
+
+    def wait_for_slot(self, index, terminate_flag):
+        """Block worker `index` until it is inside the current limit or the run is ending."""
+        with self.condition:
+            while index >= self.limit and not self.draining and not terminate_flag.is_set():
+                self.condition.wait(timeout=1)
+
+    def drain(self):
+        """Input is exhausted: release every parked worker so it can read its sentinel."""
+        with self.condition:
+            self.draining = True
+            self.condition.notify_all()
+
+    def evaluate(self):
+        """Apply one AIMD step to the samples collected since the last call."""
+        with self.condition:
+            samples, self.samples = self.samples, []
+            old_limit = self.limit
+
+        depth = self.queue_depth()
+        if len(samples) < self.min_samples:
+            return old_limit
+
+        errors = sum(1 for _, status in samples if status is None or status == 429 or status >= 500)
+        error_rate = errors / len(samples)
+        latencies = sorted(latency for latency, _ in samples)
+        latency = latencies[min(len(latencies) - 1, int(len(latencies) * self.latency_percentile))]
+
+        if error_rate > self.max_error_rate:
+            new_limit = max(self.floor, int(old_limit * self.decrease_factor))
+            reason = f"error rate {error_rate:.1%} above {self.max_error_rate:.1%}"
+        elif latency > self.target_latency:
+            new_limit = max(self.floor, int(old_limit * self.decrease_factor))
+            reason = f"p{int(self.latency_percentile * 100)} latency {latency:.2f}s above {self.target_latency:.2f}s"
+        elif depth > 0:
+            new_limit = min(self.ceiling, old_limit + self.increase_step)
+            reason = f"healthy with {depth} records queued"
+        else:
+            return old_limit
+
+        if new_limit == old_limit:
+            return old_limit
+
+        decision = {
+            "recorded_at": datetime.utcnow().isoformat(),
+            "old_limit": old_limit,
+            "new_limit": new_limit,
+            "reason": reason,
+            "requests": len(samples),
+            "error_rate": error_rate,
+            "latency": latency,
+            "queue_depth": depth,
+        }
+        with self.condition:
+            self.limit = new_limit
+            self.decisions.append(decision)
+            self.condition.notify_all()
+
+        self.logger.info(f"Scaling workers {old_limit} -> {new_limit}: {reason}")
+        return new_limit
+
+    def run(self, stop_flag):
+        """Evaluate every interval until stop_flag is set. Meant to run in its own thread."""
+        while not stop_flag.wait(self.interval):
+            try:
+                self.evaluate()
+            except Exception as e:
+                self.logger.error(f"Error in concurrency controller: {e}")
@@ -1,18 +1,24 @@
+import json
 import logging
+import os
 from datetime import datetime
 import pandas as pd
+import pyarrow as pa
 import duckdb
 
 logger = logging.getLogger(__name__)
 records_written = 0
 
 def write_to_disk(batch, table_name):
-    """Write batch to disk."""
+    """
+    Write batch to disk as Parquet, or as JSON lines when its values do not convert
+    to Parquet columns (e.g. rows rejected for not fitting the table's types).
+    """
     if not batch:
         logger.debug(f"No records to write to disk for {table_name}.")
         return
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     base_fail_path = './failed_batches/backups'
     out_type = 'parquet'
     parquet_dir = f'{base_fail_path}_{out_type}'
@@ -24,14 +30,24 @@ def write_to_disk(batch, table_name):
     try:
         parquet_file_path = os.path.join(parquet_dir, f'{file_name}.{out_type}')
         batch_df.to_parquet(parquet_file_path, engine='pyarrow', index=False)
-        logger.debug(f"Parquet file written to disk at {parquet_file_path}")
+        logger.info(f"Parquet file written to disk at {parquet_file_path}")
+        return
     except Exception as e:
-        logger.error(f"Error in write_to_disk (parquet): {e}")
+        logger.warning(f"Could not write {table_name} batch as parquet, writing NDJSON instead: {e}")
 
-    logger.debug(f"JSON & Parquet file written to disk at {fail_path}")
+    try:
+        ndjson_dir = f'{base_fail_path}_ndjson'
+        os.makedirs(ndjson_dir, exist_ok=True)
+        ndjson_file_path = os.path.join(ndjson_dir, f'{file_name}.ndjson')
+        with open(ndjson_file_path, "w", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps(row, default=str) + "\n")
+        logger.info(f"NDJSON file written to disk at {ndjson_file_path}")
+    except Exception as e:
+        logger.error(f"Error in write_to_disk (ndjson): {e}")
 
 def write_to_duckdb(batch, table_name, con, progress_updater):
-    """Write batch to DuckDB database."""
+    """Write batch to DuckDB database. Returns True if the rows reached DuckDB."""
     global records_written
 
     try:
@@ -41,6 +57,153 @@ def write_to_duckdb(batch, table_name, con, progress_updater):
         progress_updater.increment_meta("✍️", len(batch))
         records_written += len(batch)
         logger.info(f"Wrote {len(batch)} records to DuckDB (Total: {records_written})")
+        return True
     except duckdb.Error as e:
         logger.error(f"Error writing to DuckDB: {e}")
         write_to_disk(batch, table_name)
+        return False
+
+
+class ArrowBatchBuilder:
+    """
+    Accumulates row dicts straight into typed per-column lists for a declared
+    pyarrow schema, so a flush builds one RecordBatch without a DataFrame pivot
+    or per-flush dtype inference. Keys missing from a row become nulls. RecordBatches
+    from columnar parsers are kept as they are and concatenated at flush time.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.names = schema.names
+        self.columns = {name: [] for name in self.names}
+        self.batches = []
+        self.num_rows = 0
+
+    def extend(self, rows):
+        if isinstance(rows, pa.RecordBatch):
+            if rows.schema.equals(self.schema):
+                self.batches.append(rows)
+                self.num_rows += rows.num_rows
+                return
+            rows = rows.to_pylist()
+        for name, column in self.columns.items():
+            column.extend([row.get(name) for row in rows])
+        self.num_rows += len(rows)
+
+    def column(self, name):
+        values = list(self.columns[name])
+        for batch in self.batches:
+            values.extend(batch.column(name).to_pylist())
+        return values
+
+    def to_record_batch(self):
+        arrays = [pa.array(self.columns[field.name], type=field.type) for field in self.schema]
+        record_batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if not self.batches:
+            return record_batch
+        table = pa.Table.from_batches(self.batches + [record_batch], schema=self.schema).combine_chunks()
+        combined = table.to_batches()
+        return combined[0] if combined else record_batch
+
+    def to_pylist(self):
+        return self.to_record_batch().to_pylist()
+
+    def split_invalid(self, id_column):
+        """
+        For rows that do not fit the schema (to_record_batch raised): (record_batch,
+        rejected) where record_batch holds the IDs whose rows all fit, or None, and
+        rejected the row dicts of every ID with a value that does not. IDs are kept
+        whole so a table never holds part of one.
+        """
+        rows = [dict(zip(self.names, values)) for values in zip(*(self.columns[name] for name in self.names))]
+        for batch in self.batches:
+            rows.extend(batch.to_pylist())
+
+        bad_ids = set()
+        for field in self.schema:
+            values = [row.get(field.name) for row in rows]
+            try:
+                pa.array(values, type=field.type)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+            for row, value in zip(rows, values):
+                try:
+                    pa.array([value], type=field.type)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    bad_ids.add(row.get(id_column))
+
+        valid = [row for row in rows if row.get(id_column) not in bad_ids]
+        rejected = [row for row in rows if row.get(id_column) in bad_ids]
+        record_batch = pa.RecordBatch.from_pylist(valid, schema=self.schema) if valid else None
+        return record_batch, rejected
+
+    def clear(self):
+        for column in self.columns.values():
+            column.clear()
+        self.batches.clear()
+        self.num_rows = 0
+
+    def __len__(self):
+        return self.num_rows
+
+class ColumnBuilder:
+    """
+    Per-column lists a parser fills for one ID, producing a RecordBatch of `schema`
+    without a dict per row. Columns given as constants (e.g. item_id, recorded_at)
+    are stored once and repeated when the batch is built; columns never filled are null.
+    """
+
+    def __init__(self, schema, constants=None):
+        self.schema = schema
+        self.constants = constants or {}
+        self.columns = {name: [] for name in schema.names if name not in self.constants}
+        self.num_rows = 0
+
+    def extend_from(self, items, getters):
+        """Add one row per item, filling each (column, getter) pair column by column."""
+        for name, get in getters:
+            self.columns[name].extend([get(item) for item in items])
+        self.num_rows += len(items)
+
+    def append(self, row):
+        for name, column in self.columns.items():
+            column.append(row.get(name))
+        self.num_rows += 1
+
+    def to_record_batch(self):
+        arrays = []
+        for field in self.schema:
+            if field.name in self.constants:
+                arrays.append(pa.repeat(pa.scalar(self.constants[field.name], type=field.type), self.num_rows))
+            elif len(self.columns[field.name]) != self.num_rows:
+                arrays.append(pa.nulls(self.num_rows, type=field.type))
+            else:
+                arrays.append(pa.array(self.columns[field.name], type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def __len__(self):
+        return self.num_rows
+
+def write_arrow_to_duckdb(record_batch, table_name, con, progress_updater):
+    """
+    Write an Arrow RecordBatch to DuckDB. DuckDB scans the registered batch in place,
+    and columns are matched by name. Returns True if the rows reached DuckDB.
+    """
+    global records_written
+
+    try:
+        con.register("arrow_batch", record_batch)
+        try:
+            con.execute(f'INSERT INTO {table_name} BY NAME SELECT * FROM arrow_batch')
+        finally:
+            con.unregister("arrow_batch")
+
+        progress_updater.increment_meta("✍️", record_batch.num_rows)
+        records_written += record_batch.num_rows
+        logger.info(f"Wrote {record_batch.num_rows} records to DuckDB (Total: {records_written})")
+        return True
+    except duckdb.Error as e:
+        logger.error(f"Error writing to DuckDB: {e}")
+        write_to_disk(record_batch.to_pylist(), table_name)
+        return False
@@ -1,47 +1,152 @@
+import atexit
+import contextlib
+import contextvars
 import datetime
+import hashlib
+import json
 import os
+import queue
+import random
 import sys
 import logging
+import logging.handlers
 import traceback
 import io
 
+# Set per page by trace_context(); contextvars follow both threads and asyncio tasks.
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def trace_id(example_id, enum_params=None, page=None):
+    """Stable ID for one (example_id, enum combination, page), the same in every run."""
+    key = json.dumps([example_id, enum_params or {}, page], sort_keys=True, default=str)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+@contextlib.contextmanager
+def trace_context(example_id, enum_params=None, page=None):
+    """Tag every record logged inside the block with the page's trace ID."""
+    token = current_trace.set({
+        "trace_id": trace_id(example_id, enum_params, page),
+        "example_id": example_id,
+        "enum": enum_params or None,
+        "page": page,
+    })
+    try:
+        yield
+    finally:
+        current_trace.reset(token)
+
+class TraceFilter(logging.Filter):
+    """Copies the current trace onto the record. Runs in the thread that logs, before the record is queued."""
+
+    def filter(self, record):
+        trace = current_trace.get()
+        record.trace = trace
+        record.trace_id = trace["trace_id"] if trace else "-"
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps records at or below `level` with probability `rate`; everything above always passes."""
+
+    def __init__(self, rate=1.0, level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record):
+        if record.levelno > self.level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the trace fields when the record has them."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        trace = getattr(record, "trace", None)
+        if trace:
+            entry.update(trace)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
 class Recorder:
-    """Class wrapper for logging and traceback management."""
+    """
+    Class wrapper for logging and traceback management.
 
-    def __init__(self, script_name="script", directory="logs", level="INFO", days_of_logs=30):
+    Records from every logger go through a QueueHandler on the root logger, so the
+    calling thread only formats the message and enqueues it; a QueueListener thread
+    writes JSON lines to the daily log file and a plain line to stdout. Records logged
+    inside trace_context() carry its trace ID, and records at DEBUG level are kept
+    with probability debug_sample.
+    """
+
+    def __init__(self, script_name="script", directory="logs", level="INFO", days_of_logs=30, debug_sample=1.0):
         self.script_name = script_name
         self.today = datetime.date.today()
         self.log_path = os.path.join(os.getcwd(), directory)
         self.days_of_logs = days_of_logs
-        self.log_file = os.path.join(self.log_path, f"{self.today}_log.txt")
+        self.log_file = os.path.join(self.log_path, f"{self.today}_log.jsonl")
 
         if not os.path.exists(self.log_path):
             os.makedirs(self.log_path)
 
+        level = getattr(logging, level.upper(), logging.INFO)
         self.logger = logging.getLogger(script_name)
-        self.logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+        self.logger.setLevel(level)
 
-        file_handler = logging.FileHandler(self.log_file)
+        file_handler = logging.FileHandler(self.log_file, encoding="utf-8")
         console_handler = logging.StreamHandler(sys.stdout)
+        file_handler.setFormatter(JsonFormatter())
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = logging.handlers.QueueHandler(self.queue)
+        self.queue_handler.addFilter(TraceFilter())
+        self.sampler = SamplingFilter(debug_sample)
+        self.queue_handler.addFilter(self.sampler)
+        self.listener = logging.handlers.QueueListener(self.queue, file_handler, console_handler)
 
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(self.queue_handler)
+        self.listener.start()
+        atexit.register(self.close)
 
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+    def set_level(self, level, debug_sample=None):
+        """Change the level of the script and root loggers, and the DEBUG sampling rate."""
+        level = getattr(logging, level.upper(), logging.INFO)
+        self.logger.setLevel(level)
+        logging.getLogger().setLevel(level)
+        if debug_sample is not None:
+            self.sampler.rate = debug_sample
 
     def log(self, level, message):
         """Generic logging function."""
         log_function = getattr(self.logger, level.lower(), self.logger.info)
         log_function(message)
 
+    def close(self):
+        """Write out queued records and detach from the root logger."""
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+
     def trim_logs(self):
         """Remove log files older than n days."""
         days_ago = datetime.timedelta(self.days_of_logs)
         for filename in os.listdir(self.log_path):
             file_path = os.path.join(self.log_path, filename)
-            if filename.endswith('.txt'):
+            if filename.endswith(('.txt', '.jsonl')):
                 file_date = datetime.datetime.strptime(filename.split('_')[0], "%Y-%m-%d").date()
                 if file_date <= datetime.datetime.now().date() - days_ago:
                     os.remove(file_path)
@@ -0,0 +1,91 @@
+import json
+
+# orjson decodes noticeably faster when installed; the stdlib decoder is the fallback.
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+MISSING = (KeyError, TypeError, IndexError)
+
+def _keys(path):
+    if isinstance(path, str):
+        return tuple(path.split("."))
+    return tuple(path)
+
+def compile_path(path):
+    """Function returning the value at path in a dict, or None if any step is missing."""
+    keys = _keys(path)
+    if len(keys) == 1:
+        (a,) = keys
+        def get(data):
+            try:
+                return data[a]
+            except MISSING:
+                return None
+    elif len(keys) == 2:
+        a, b = keys
+        def get(data):
+            try:
+                return data[a][b]
+            except MISSING:
+                return None
+    elif len(keys) == 3:
+        a, b, c = keys
+        def get(data):
+            try:
+                return data[a][b][c]
+            except MISSING:
+                return None
+    else:
+        def get(data):
+            try:
+                for key in keys:
+                    data = data[key]
+                return data
+            except MISSING:
+                return None
+    return get
+
+def compile_array(fields):
+    """
+    Function mapping a list of dicts to dicts of the given field paths, keyed by the
+    dotted path like BaseClient.extract_array. Anything but a list gives [].
+    """
+    getters = [(".".join(_keys(field)), compile_path(field)) for field in fields]
+    def extract(items):
+        if not isinstance(items, list):
+            return []
+        return [{name: get(item) for name, get in getters} for item in items]
+    return extract
+
+def compile_getters(spec):
+    """
+    Compile {column: path} or {column: (path, transform)} into [(column, getter)],
+    for parsers that fill columns directly (see ColumnBuilder.extend_from).
+    """
+    getters = []
+    for column, path in spec.items():
+        transform = None
+        if isinstance(path, tuple) and len(path) == 2 and callable(path[1]):
+            path, transform = path
+        get = compile_path(path)
+        if transform is not None:
+            get = (lambda get, transform: lambda node: transform(get(node)))(get, transform)
+        getters.append((column, get))
+    return getters
+
+def compile_spec(spec):
+    """
+    Compile {column: path} or {column: (path, transform)} into a function building a
+    row dict from one node, so an endpoint declares its columns once instead of calling
+    safe_get per column. Paths are dotted strings or key tuples, resolved by chained
+    indexing in one try block; missing keys give None. Columns keep the spec's order.
+    """
+    getters = compile_getters(spec)
+
+    def extract(node):
+        return {column: get(node) for column, get in getters}
+    return extract
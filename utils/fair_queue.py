@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+from queue import Empty, Full
+
+class Lane:
+    """
+    One endpoint's side of a FairQueue, used like a bounded Queue by its id_feeder and
+    by the retry scheduler. Putting the sentinel closes the lane instead of queueing it.
+    """
+
+    def __init__(self, fair_queue, name, weight, maxsize):
+        self.fair_queue = fair_queue
+        self.name = name
+        self.weight = weight
+        self.maxsize = maxsize
+        self.items = collections.deque()
+        self.closed = False
+        # Service received so far divided by weight; the lane furthest behind is served next.
+        self.virtual_time = 0.0
+        # Running average of the seconds one item costs, charged when it is handed out.
+        self.estimate = 1.0
+        self.served = 0
+
+    def put(self, item, block=True, timeout=None):
+        condition = self.fair_queue.condition
+        with condition:
+            if item is self.fair_queue.sentinel:
+                self.closed = True
+                condition.notify_all()
+                return
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.maxsize and len(self.items) >= self.maxsize:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Full
+                condition.wait(remaining)
+            if not self.items:
+                # A lane coming back from idle joins at the current virtual time instead of
+                # spending the share it did not use while empty.
+                self.virtual_time = max(self.virtual_time, self.fair_queue.virtual_time())
+            self.items.append(item)
+            condition.notify_all()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def qsize(self):
+        return len(self.items)
+
+    def task_done(self):
+        pass
+
+class FairQueue:
+    """
+    Weighted fair queue over several endpoints' IDs, for workers shared by all of them.
+    get() hands out the next item of the backlogged lane with the lowest virtual time
+    (service received divided by weight). Service is measured in worker seconds: every
+    item is charged its lane's average cost when handed out, and task_done() corrects
+    the charge with the time it really took, so an endpoint with slow IDs gets fewer of
+    them and every endpoint receives a share of the workers proportional to its weight.
+    """
+
+    def __init__(self, weights, maxsize=0, sentinel=None):
+        self.condition = threading.Condition()
+        self.sentinel = sentinel
+        self.lanes = {name: Lane(self, name, max(weight, 1e-6), maxsize) for name, weight in weights.items()}
+
+    def lane(self, name):
+        return self.lanes[name]
+
+    def virtual_time(self):
+        backlogged = [lane.virtual_time for lane in self.lanes.values() if lane.items]
+        return min(backlogged) if backlogged else max(lane.virtual_time for lane in self.lanes.values())
+
+    def get(self, timeout=None):
+        """
+        (lane name, item, charge) from the lane furthest behind its share, charge being
+        the seconds of service the item was billed, to be passed back to task_done().
+        Returns the sentinel once every lane is closed and empty; raises Empty if
+        nothing arrives in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                backlogged = [lane for lane in self.lanes.values() if lane.items]
+                if backlogged:
+                    lane = min(backlogged, key=lambda lane: lane.virtual_time)
+                    item = lane.items.popleft()
+                    charge = lane.estimate
+                    lane.virtual_time += charge / lane.weight
+                    lane.served += 1
+                    self.condition.notify_all()
+                    return lane.name, item, charge
+                if all(lane.closed for lane in self.lanes.values()):
+                    return self.sentinel
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self.condition.wait(remaining)
+
+    def task_done(self, name, charge, cost):
+        """
+        An item of lane `name` billed `charge` seconds by get() took `cost` seconds:
+        replace the charge with the real cost. The estimate may have moved since the
+        item was handed out, so the correction uses what was actually charged.
+        """
+        with self.condition:
+            lane = self.lanes[name]
+            lane.virtual_time += (cost - charge) / lane.weight
+            lane.estimate = 0.8 * lane.estimate + 0.2 * cost
+
+    def qsize(self):
+        return sum(len(lane.items) for lane in self.lanes.values())
+
+    def stats(self):
+        """Items handed out and average cost per lane."""
+        with self.condition:
+            return {
+                name: {"weight": lane.weight, "served": lane.served, "avg_seconds": round(lane.estimate, 4)}
+                for name, lane in self.lanes.items()
+            }
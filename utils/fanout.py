@@ -0,0 +1,73 @@
+import threading
+
+class ResultAssembler:
+    """
+    Reassembles the pages of an ID whose pagination chains were fetched by different
+    workers. Each chain is one enum combination; its pages arrive in order because a
+    chain's next page is only scheduled once the previous one is back.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def start(self, example_id, record_count, chains):
+        """Register an ID with its number of pagination chains."""
+        with self.lock:
+            self.pending[example_id] = {
+                "record_count": record_count,
+                "outstanding": chains,
+                "pages": [[] for _ in range(chains)],
+                "failed": False,
+            }
+
+    def add_page(self, example_id, chain, data):
+        """
+        Append the next page of a chain and return its page number within the chain,
+        or None when the ID already failed and the page is dropped.
+        """
+        with self.lock:
+            entry = self.pending[example_id]
+            if entry["failed"]:
+                return None
+            pages = entry["pages"][chain]
+            pages.append(data)
+            return len(pages) - 1
+
+    def fail(self, example_id):
+        """
+        Mark an ID as failed and drop its pages; its chains still have to finish.
+        Returns True only for the first failure, so the ID is dead-lettered once.
+        """
+        with self.lock:
+            entry = self.pending[example_id]
+            if entry["failed"]:
+                return False
+            entry["failed"] = True
+            entry["pages"] = None
+            return True
+
+    def failed(self, example_id):
+        with self.lock:
+            entry = self.pending.get(example_id)
+            return entry is not None and entry["failed"]
+
+    def finish_chain(self, example_id):
+        """
+        Mark one chain as done (last page fetched or failed). Returns the ID's pages in
+        chain order once every chain is done, otherwise None. A failed ID returns None
+        and is forgotten once its last chain is done.
+        """
+        with self.lock:
+            entry = self.pending[example_id]
+            entry["outstanding"] -= 1
+            if entry["outstanding"] > 0:
+                return None
+            del self.pending[example_id]
+        if entry["failed"]:
+            return None
+        return [page for chain_pages in entry["pages"] for page in chain_pages]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pending)
@@ -1,51 +1,202 @@
-import itertools
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
+from utils.proxy_pool import ProxyPool
+from utils.rate_limit import rate_limiter, proxy_bucket_key, parse_retry_after
+from utils.metrics import proxy_label
 
 DEFAULT_TIMEOUT = 4
 logger = logging.getLogger("retry_logger")
 
 class RotatingProxyHTTPAdapter(HTTPAdapter):
-    def __init__(self, proxies, timeout=DEFAULT_TIMEOUT, *args, **kwargs):
-        self.timeout = timeout
-        ca_cert_kw = kwargs.pop("ca_cert", None)
+    """
+    Sends every request through the next proxy of a ProxyPool. One adapter can be mounted
+    on every worker's session so keep-alive connections (and the CONNECT/TLS handshakes
+    behind them) are shared: size pool_maxsize to the number of workers. Connections to
+    a proxy that has not been used for idle_timeout seconds are closed.
+    """
 
-        if not proxies:
-            raise ValueError("Please provide a non-empty list of proxies.")
+    def __init__(self, proxies, timeout=DEFAULT_TIMEOUT, observers=None, *args, idle_timeout=None, **kwargs):
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        ca_cert = kwargs.pop("ca_cert", None)
 
-        if all(isinstance(p, (list, tuple)) for p in proxies):
-            self.proxies_cycle = itertools.cycle(proxies)
+        if isinstance(proxies, ProxyPool):
+            self.proxy_pool = proxies
         else:
-            ca_cert = kwargs.pop("ca_cert", None)
-            if ca_cert is None:
-                raise ValueError("When proxies is a list of strings, please provide a 'ca_cert'.")
-            self.proxies_cycle = itertools.cycle([(p, ca_cert) for p in proxies])
+            self.proxy_pool = ProxyPool(proxies, ca_cert=ca_cert)
+        self.observers = [self.proxy_pool.observe] + list(observers or [])
+        self.last_used = {}
+        self.last_sweep = time.monotonic()
+        self.evicted = {}
+        self.evictions = 0
+        self.sweep_lock = threading.Lock()
         super().__init__(*args, **kwargs)
 
     def send(self, request, **kwargs):
-        proxy, ca_cert = next(self.proxies_cycle)
+        proxy, ca_cert = self.proxy_pool.acquire()
+        rate_limiter.acquire(proxy_bucket_key(proxy))
         kwargs["timeout"] = kwargs.get("timeout", self.timeout)
         kwargs["proxies"] = {"http": proxy, "https": proxy}
         kwargs["verify"] = ca_cert
-        return super().send(request, **kwargs)
 
-def requests_retry_session(retries=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), proxies=None, ca_cert=None, session=None):
-    session = session or requests.Session()
-    retry = Retry(
+        start = time.monotonic()
+        self.last_used[proxy] = start
+        if self.idle_timeout and start - self.last_sweep > self.idle_timeout / 2:
+            self.evict_idle(start)
+        try:
+            response = super().send(request, **kwargs)
+        except Exception as e:
+            self._notify(proxy, time.monotonic() - start, None, e)
+            raise
+        self._notify(proxy, time.monotonic() - start, response.status_code, None)
+        if response.status_code == 429:
+            rate_limiter.pause(proxy_bucket_key(proxy), parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    def _notify(self, proxy, latency, status, error):
+        """Report the outcome of a request to every observer as (proxy, latency, status, error)."""
+        for observer in self.observers:
+            try:
+                observer(proxy, latency, status, error)
+            except Exception as e:
+                logger.error(f"Request observer failed: {e}")
+
+    def _pool_counts(self, manager):
+        connections = requests_sent = 0
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return connections, requests_sent
+
+    def evict_idle(self, now=None):
+        """Close the pooled connections of proxies idle for longer than idle_timeout."""
+        now = now or time.monotonic()
+        if not self.sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_sweep = now
+            for proxy, manager in list(self.proxy_manager.items()):
+                if now - self.last_used.get(proxy, now) < self.idle_timeout or not len(manager.pools):
+                    continue
+                connections, requests_sent = self._pool_counts(manager)
+                totals = self.evicted.setdefault(proxy, [0, 0])
+                totals[0] += connections
+                totals[1] += requests_sent
+                manager.clear()
+                self.evictions += 1
+                logger.debug(f"Closed idle connections to {proxy_label(proxy)}")
+        finally:
+            self.sweep_lock.release()
+
+    def prewarm(self, url, connections=1):
+        """
+        Open `connections` keep-alive connections to url through every proxy before the
+        first request, so workers start on connections whose CONNECT tunnel and TLS
+        handshake are done. Returns the number of connections opened.
+        """
+        request = requests.Request("POST", url).prepare()
+        opened = 0
+        for proxy, ca_cert in [(state.url, state.ca_cert) for state in self.proxy_pool.states.values()]:
+            warm = []
+            try:
+                # A malformed proxy URL or CA bundle fails here; skip that proxy rather than the run.
+                pool = self.get_connection_with_tls_context(request, ca_cert, proxies={"http": proxy, "https": proxy})
+                self.cert_verify(pool, url, ca_cert, None)
+                for _ in range(connections):
+                    conn = pool._get_conn()
+                    conn.connect()
+                    warm.append(conn)
+            except Exception as e:
+                logger.warning(f"Could not pre-warm connections to {proxy_label(proxy)}: {e}")
+            finally:
+                for conn in warm:
+                    pool._put_conn(conn)
+            opened += len(warm)
+            self.last_used[proxy] = time.monotonic()
+        return opened
+
+    def pool_stats(self):
+        """Per proxy: connections opened, requests sent over them and how many reused a connection."""
+        stats = []
+        for proxy in sorted(set(self.proxy_manager) | set(self.evicted)):
+            connections, requests_sent = self.evicted.get(proxy, (0, 0))
+            if proxy in self.proxy_manager:
+                live_connections, live_requests = self._pool_counts(self.proxy_manager[proxy])
+                connections += live_connections
+                requests_sent += live_requests
+            stats.append({
+                "proxy": proxy_label(proxy),
+                "connections": connections,
+                "requests": requests_sent,
+                "reused": max(0, requests_sent - connections),
+            })
+        return stats
+
+class ObservedRetry(Retry):
+    """
+    urllib3 Retry that reports every retry it allows to on_retry(reason), reason being
+    the response status or the error's type name. urllib3 retries inside the adapter,
+    so these never reach the workers' own retry accounting.
+    """
+
+    def __init__(self, *args, on_retry=None, **kwargs):
+        self.on_retry = on_retry
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        # urllib3 makes a new Retry for every attempt
+        retry = super().new(**kwargs)
+        retry.on_retry = self.on_retry
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if self.on_retry is not None:
+            self.on_retry(response.status if response is not None else type(error).__name__)
+        return retry
+
+def retry_policy(retries=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), on_retry=None):
+    return ObservedRetry(
         total=retries,
         read=retries,
         connect=retries,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
-        allowed_methods=frozenset(["GET", "POST"])
+        allowed_methods=frozenset(["GET", "POST"]),
+        on_retry=on_retry
     )
 
-    if proxies is None:
-        raise ValueError("Please provide a list of proxies to rotate.")
+def shared_proxy_adapter(proxies, pool_maxsize, observers=None, idle_timeout=None, ca_cert=None, retries=3, on_retry=None):
+    """
+    One RotatingProxyHTTPAdapter for all workers: a pool per proxy holding up to
+    pool_maxsize connections (one per worker), so every proxy can serve every worker
+    on a kept-alive connection.
+    """
+    num_proxies = len(proxies.states) if isinstance(proxies, ProxyPool) else len(proxies)
+    return RotatingProxyHTTPAdapter(
+        proxies=proxies,
+        timeout=DEFAULT_TIMEOUT,
+        observers=observers,
+        ca_cert=ca_cert,
+        idle_timeout=idle_timeout,
+        max_retries=retry_policy(retries, on_retry=on_retry),
+        pool_connections=max(num_proxies, 10),
+        pool_maxsize=max(pool_maxsize, 1)
+    )
 
-    adapter = RotatingProxyHTTPAdapter(proxies=proxies, timeout=DEFAULT_TIMEOUT, ca_cert=ca_cert, max_retries=retry)
+def requests_retry_session(retries=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), proxies=None, ca_cert=None, session=None, observers=None, adapter=None, on_retry=None):
+    session = session or requests.Session()
+    if adapter is None:
+        if proxies is None:
+            raise ValueError("Please provide a list of proxies to rotate.")
+        retry = retry_policy(retries, backoff_factor, status_forcelist, on_retry)
+        adapter = RotatingProxyHTTPAdapter(proxies=proxies, timeout=DEFAULT_TIMEOUT, observers=observers, ca_cert=ca_cert, max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
-    return session
\ No newline at end of file
+    return session
@@ -0,0 +1,226 @@
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from itertools import islice
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+class IdSource(ABC):
+    """
+    Streams (example_id, record_count) tuples to mine. Implementations should
+    yield lazily so only the current chunk is held in memory.
+    """
+
+    @abstractmethod
+    def iter_ids(self):
+        """Yields (example_id, record_count) tuples."""
+
+    def next_range(self, after, count):
+        """
+        Bounds the `count` IDs that follow key `after` (None: the first IDs) for a lease:
+        returns (last_key, n), n being how many IDs there are up to and including
+        last_key, or (None, 0) when no IDs are left. This default walks iter_ids(),
+        which must then be ordered by ID; sources backed by a table look the keys up.
+        """
+        last_key, n = None, 0
+        for example_id, _ in self.iter_key_range(after, None):
+            last_key, n = example_id, n + 1
+            if n >= count:
+                break
+        return last_key, n
+
+    def iter_key_range(self, after, last):
+        """IDs after key `after` up to and including key `last` (None: no bound)."""
+        for item in self.iter_ids():
+            if after is not None and item[0] <= after:
+                continue
+            if last is not None and item[0] > last:
+                break
+            yield item
+
+    def __iter__(self):
+        return self.iter_ids()
+
+class FilteredIdSource(IdSource):
+    """
+    Skips IDs that `completed` reports as done, e.g. CheckpointJournal.completed_among.
+    IDs are checked chunk_size at a time, so only the current chunk is held in memory.
+    """
+
+    def __init__(self, source, completed, chunk_size=1000):
+        self.source = source
+        self.completed = completed
+        self.chunk_size = chunk_size
+
+    def iter_ids(self):
+        skipped = 0
+        items = iter(self.source)
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                break
+            done = self.completed([item[0] for item in chunk])
+            for item in chunk:
+                if str(item[0]) in done:
+                    skipped += 1
+                    continue
+                yield item
+        logger.info(f"Skipped {skipped} already processed IDs")
+
+class MockIdSource(IdSource):
+    """Sequential fake IDs, the streaming version of BaseClient.get_example_endpoint_ids."""
+
+    def __init__(self, limit=100, counter_filter=1):
+        self.limit = limit
+        self.counter_filter = counter_filter
+
+    def iter_ids(self):
+        for id in range(1, self.limit + 1):
+            yield (f"{id:07d}", self.counter_filter)
+
+    def next_range(self, after, count):
+        first = int(after) + 1 if after is not None else 1
+        last = min(first + count - 1, self.limit)
+        if last < first:
+            return None, 0
+        return f"{last:07d}", last - first + 1
+
+    def iter_key_range(self, after, last):
+        first = int(after) + 1 if after is not None else 1
+        last = min(int(last), self.limit) if last is not None else self.limit
+        for id in range(first, last + 1):
+            yield (f"{id:07d}", self.counter_filter)
+
+class DuckDBIdSource(IdSource):
+    """
+    Reads IDs from a DuckDB table through a cursor, chunk_size rows at a time.
+    record_count comes from counter_column when given, otherwise counter_filter.
+
+    `exclude` lists (table, id_column) pairs that already hold mined IDs, e.g. the
+    endpoint's table_name and failed_table. IDs found there are dropped by a NOT EXISTS
+    anti-join in the same query; with fresh_within, only rows whose time_column is
+    less than that many seconds old count, so older IDs are mined again.
+    """
+
+    def __init__(
+            self,
+            connection_string,
+            source_table,
+            id_column="id",
+            counter_column=None,
+            counter_filter=1,
+            limit=None,
+            order_type="desc",
+            chunk_size=10000,
+            exclude=(),
+            fresh_within=None,
+            time_column="recorded_at"
+    ):
+        if order_type.lower() not in ("asc", "desc"):
+            raise ValueError(f"Invalid order_type: {order_type}")
+        self.connection_string = connection_string
+        self.source_table = source_table
+        self.id_column = id_column
+        self.counter_column = counter_column
+        self.counter_filter = counter_filter
+        self.limit = limit
+        self.order_type = order_type
+        self.chunk_size = chunk_size
+        self.exclude = list(exclude)
+        self.fresh_within = fresh_within
+        self.time_column = time_column
+
+    def exclusion(self, con):
+        """NOT EXISTS condition against the exclude tables that exist, with its parameters."""
+        clauses = []
+        params = {}
+        for table, column in self.exclude:
+            schema, _, name = table.rpartition(".")
+            exists = con.execute(
+                "SELECT count(*) FROM information_schema.tables WHERE table_name = ? AND (? = '' OR table_schema = ?)",
+                [name, schema, schema]
+            ).fetchone()[0]
+            if not exists:
+                logger.warning(f"Not excluding IDs in {table}: table does not exist")
+                continue
+            clause = f"SELECT 1 FROM {table} m WHERE CAST(m.{column} AS VARCHAR) = CAST(s.{self.id_column} AS VARCHAR)"
+            if self.fresh_within:
+                clause += f" AND TRY_CAST(m.{self.time_column} AS TIMESTAMP) >= $fresh_since"
+                params["fresh_since"] = datetime.utcnow() - timedelta(seconds=self.fresh_within)
+            clauses.append(f"NOT EXISTS ({clause})")
+        return " AND ".join(clauses), params
+
+    def query(self, exclusion=("", {}), after=None, last=None, limit=None):
+        """
+        SQL and parameters selecting the IDs to mine in the source's order, optionally
+        only those after key `after` and up to key `last`. Leased ranges are bounded by
+        ID keys rather than row positions, so they stay the same while the table changes
+        and each range is found through the ID column instead of an OFFSET scan. The
+        exclusion from exclusion() and the deduplication are applied before LIMIT, so the
+        limit counts new, distinct IDs.
+        """
+        condition, params = exclusion
+        params = dict(params, counter_filter=self.counter_filter)
+        count = self.counter_column or "$counter_filter"
+        where = [f"{self.counter_column} >= $counter_filter"] if self.counter_column else []
+        if condition:
+            where.append(condition)
+        beyond, within = (">", "<=") if self.order_type.lower() == "asc" else ("<", ">=")
+        if after is not None:
+            where.append(f"s.{self.id_column} {beyond} $after")
+            params["after"] = after
+        if last is not None:
+            where.append(f"s.{self.id_column} {within} $last")
+            params["last"] = last
+
+        sql = f"SELECT s.{self.id_column}, {count} FROM {self.source_table} s"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # An ID listed several times in the source is mined once.
+        sql += f" QUALIFY row_number() OVER (PARTITION BY s.{self.id_column}) = 1"
+        sql += f" ORDER BY s.{self.id_column} {self.order_type}"
+        limit = limit or self.limit
+        if limit:
+            sql += " LIMIT $limit"
+            params["limit"] = limit
+        return sql, params
+
+    def iter_ids(self):
+        return self._stream()
+
+    def iter_key_range(self, after, last):
+        return self._stream(after, last)
+
+    def next_range(self, after, count):
+        con = duckdb.connect(self.connection_string)
+        try:
+            sql, params = self.query(
+                self.exclusion(con) if self.exclude else ("", {}),
+                after=after,
+                limit=count
+            )
+            bound = "max" if self.order_type.lower() == "asc" else "min"
+            return tuple(con.execute(f"SELECT {bound}({self.id_column}), count(*) FROM ({sql})", params).fetchone())
+        finally:
+            con.close()
+
+    def _stream(self, after=None, last=None):
+        logger.info(f"Streaming example IDs from table: {self.source_table}")
+        con = duckdb.connect(self.connection_string)
+        try:
+            sql, params = self.query(
+                self.exclusion(con) if self.exclude else ("", {}),
+                after=after,
+                last=last,
+                limit=None if last is not None else self.limit
+            )
+            cursor = con.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield (str(row[0]), row[1])
+        finally:
+            con.close()
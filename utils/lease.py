@@ -0,0 +1,209 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from utils.id_source import IdSource
+
+logger = logging.getLogger(__name__)
+
+# Range bounds are ID keys, stored untyped so integer IDs compare as integers.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lease_ranges (
+    job TEXT NOT NULL,
+    range_id INTEGER NOT NULL,
+    after_key,
+    last_key,
+    id_count INTEGER NOT NULL,
+    owner TEXT,
+    status TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    fed_count INTEGER,
+    attempts INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job, range_id)
+);
+"""
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseTable:
+    """
+    Shared SQLite table through which several processes or hosts split one job's IDs.
+
+    A range is the IDs after key after_key up to and including last_key in the source's
+    order, at most range_size of them. A node claims a range by cutting the next one
+    after the last range's last_key, or by taking over a range whose lease expired (its
+    owner stopped heartbeating) or was released. Because ranges are bounded by keys, not
+    row positions, they do not shift when rows are added to the source, and reading one
+    is a seek on the ID column. Leases stay held, and are renewed by a heartbeat thread,
+    until the node finishes its run and marks them done, so a crashed node's ranges are
+    mined again by whoever claims them next.
+    """
+
+    def __init__(self, path, job, worker_id=None, range_size=1000, ttl=60.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.job = job
+        self.worker_id = worker_id or default_worker_id()
+        self.range_size = range_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(SCHEMA)
+        self.held = set()
+
+        self.heartbeat_stop = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self._heartbeat, name="LeaseHeartbeat")
+        self.heartbeat_thread.daemon = True
+        self.heartbeat_thread.start()
+
+    def _transaction(self, statements):
+        """Run statements(con) inside BEGIN IMMEDIATE so claims are serialized across processes."""
+        with self.lock:
+            self.con.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.con)
+            except Exception:
+                self.con.execute("ROLLBACK")
+                raise
+            self.con.execute("COMMIT")
+            return result
+
+    def claim(self, source, limit=None):
+        """
+        Lease a range of `source` and return (range_id, after_key, last_key), or None
+        when nothing is claimable right now. With `limit`, the job's ranges together
+        hold at most that many IDs.
+        """
+        def statements(con):
+            now = time.time()
+            expires_at = now + self.ttl
+            updated_at = datetime.utcnow().isoformat()
+            row = con.execute(
+                "SELECT range_id, after_key, last_key, owner FROM lease_ranges WHERE job = ? "
+                "AND (status = 'released' OR (status = 'leased' AND expires_at < ?)) "
+                "ORDER BY range_id LIMIT 1",
+                (self.job, now)
+            ).fetchone()
+            if row:
+                range_id, after_key, last_key, previous_owner = row
+                con.execute(
+                    "UPDATE lease_ranges SET owner = ?, status = 'leased', expires_at = ?, fed_count = NULL, "
+                    "attempts = attempts + 1, updated_at = ? WHERE job = ? AND range_id = ?",
+                    (self.worker_id, expires_at, updated_at, self.job, range_id)
+                )
+                logger.info(f"Reassigned IDs {after_key}-{last_key} from {previous_owner} to {self.worker_id}")
+                return range_id, after_key, last_key
+
+            range_id, after_key, leased = con.execute(
+                "SELECT COALESCE(MAX(range_id), 0), "
+                "(SELECT last_key FROM lease_ranges WHERE job = ? ORDER BY range_id DESC LIMIT 1), "
+                "COALESCE(SUM(id_count), 0) FROM lease_ranges WHERE job = ?",
+                (self.job, self.job)
+            ).fetchone()
+            count = self.range_size if limit is None else min(self.range_size, limit - leased)
+            if count <= 0:
+                return None
+            last_key, id_count = source.next_range(after_key, count)
+            if not id_count:
+                return None
+            con.execute(
+                "INSERT INTO lease_ranges VALUES (?, ?, ?, ?, ?, ?, 'leased', ?, NULL, 1, ?)",
+                (self.job, range_id + 1, after_key, last_key, id_count, self.worker_id, expires_at, updated_at)
+            )
+            return range_id + 1, after_key, last_key
+
+        claimed = self._transaction(statements)
+        if claimed:
+            self.held.add(claimed[0])
+        return claimed
+
+    def fed(self, range_id, fed_count):
+        """Record how many IDs a range held once it has been fed to the workers."""
+        self._transaction(lambda con: con.execute(
+            "UPDATE lease_ranges SET fed_count = ?, updated_at = ? WHERE job = ? AND range_id = ? AND owner = ?",
+            (fed_count, datetime.utcnow().isoformat(), self.job, range_id, self.worker_id)
+        ))
+
+    def others_feeding(self):
+        """
+        Whether other nodes are still feeding leased ranges, which they could yet abandon.
+        Ranges already fed are not waited for: every node would end up waiting on the others.
+        """
+        with self.lock:
+            return self.con.execute(
+                "SELECT 1 FROM lease_ranges WHERE job = ? AND status = 'leased' AND fed_count IS NULL "
+                "AND owner != ? LIMIT 1",
+                (self.job, self.worker_id)
+            ).fetchone() is not None
+
+    def _heartbeat(self):
+        while not self.heartbeat_stop.wait(self.ttl / 3):
+            try:
+                renewed = self._transaction(lambda con: con.execute(
+                    "UPDATE lease_ranges SET expires_at = ?, updated_at = ? "
+                    "WHERE job = ? AND owner = ? AND status = 'leased'",
+                    (time.time() + self.ttl, datetime.utcnow().isoformat(), self.job, self.worker_id)
+                ).rowcount)
+            except sqlite3.Error as e:
+                logger.error(f"Lease heartbeat failed: {e}")
+                continue
+            if renewed < len(self.held):
+                logger.warning(f"{self.worker_id} lost {len(self.held) - renewed} leases to other nodes")
+
+    def close(self, done=True):
+        """
+        Stop heartbeating and settle this node's leases: done after a complete run,
+        otherwise released so another node can claim them straight away.
+        """
+        self.heartbeat_stop.set()
+        self.heartbeat_thread.join()
+        status = "done" if done else "released"
+        settled = self._transaction(lambda con: con.execute(
+            "UPDATE lease_ranges SET status = ?, owner = CASE WHEN ? = 'done' THEN owner END, updated_at = ? "
+            "WHERE job = ? AND owner = ? AND status = 'leased'",
+            (status, status, datetime.utcnow().isoformat(), self.job, self.worker_id)
+        ).rowcount)
+        logger.info(f"{self.worker_id} marked {settled} ranges of {self.job} as {status}")
+        with self.lock:
+            self.con.close()
+
+class LeasedIdSource(IdSource):
+    """
+    Yields only the ranges of `source` this node leased from a LeaseTable. When no
+    range is claimable but other nodes are still feeding theirs, it keeps polling so
+    ranges they abandon are picked up, until stop_event is set. Ranges abandoned after
+    every node finished feeding are left to the next run of the job.
+    """
+
+    def __init__(self, source, lease_table, stop_event=None):
+        self.source = source
+        self.lease_table = lease_table
+        self.stop_event = stop_event or threading.Event()
+
+    def iter_ids(self):
+        ranges = 0
+        while not self.stop_event.is_set():
+            claimed = self.lease_table.claim(self.source, getattr(self.source, "limit", None))
+            if claimed is None:
+                if not self.lease_table.others_feeding():
+                    break
+                self.stop_event.wait(self.lease_table.ttl / 3)
+                continue
+
+            range_id, after_key, last_key = claimed
+            ranges += 1
+            fed_count = 0
+            for item in self.source.iter_key_range(after_key, last_key):
+                fed_count += 1
+                yield item
+            self.lease_table.fed(range_id, fed_count)
+        logger.info(f"{self.lease_table.worker_id} mined {ranges} ranges of {self.lease_table.job}")
@@ -0,0 +1,300 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class Metric:
+    """Base for labelled metrics. Recording is a no-op until the registry is opened."""
+
+    type_name = None
+
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self):
+        return {
+            "type": self.type_name,
+            "help": self.help,
+            "samples": [{"labels": dict(zip(self.labels, labels)), "value": value} for labels, value in self.samples()],
+        }
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, registry, name, help, labels=()):
+        super().__init__(registry, name, help, labels)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.active:
+            return
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return sorted(self.values.items())
+
+class Gauge(Metric):
+    """Set directly, or from a function evaluated whenever the metrics are read (queue depths)."""
+
+    type_name = "gauge"
+
+    def __init__(self, registry, name, help, labels=()):
+        super().__init__(registry, name, help, labels)
+        self.values = {}
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, func, **labels):
+        self.set(func, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items(), key=lambda item: item[0])
+        samples = []
+        for labels, value in items:
+            if callable(value):
+                try:
+                    value = value()
+                except Exception as e:
+                    logger.error(f"Gauge {self.name} failed: {e}")
+                    continue
+            samples.append((labels, value))
+        return samples
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, registry, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+
+    def observe(self, value, **labels):
+        if not self.registry.active or value is None:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _cumulative(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.values.items())
+        result = []
+        for labels, (counts, total, count) in items:
+            running, cumulative = 0, []
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                cumulative.append((bound, running))
+            result.append((labels, cumulative, total, count))
+        return result
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, cumulative, total, count in self._cumulative():
+            for bound, running in cumulative:
+                le = [("le", _format_value(float(bound)))]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+    def snapshot(self):
+        return {
+            "type": self.type_name,
+            "help": self.help,
+            "samples": [
+                {
+                    "labels": dict(zip(self.labels, labels)),
+                    "buckets": {_format_value(float(bound)): running for bound, running in cumulative},
+                    "sum": total,
+                    "count": count,
+                }
+                for labels, cumulative, total, count in self._cumulative()
+            ],
+        }
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms for the whole process. Nothing is recorded until
+    open() is called; open() can also serve the metrics as Prometheus text on a local
+    port, and close() dumps them to a JSON file.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.server = None
+        self.thread = None
+        self.json_path = None
+        self._active = False
+
+    @property
+    def active(self):
+        return self._active
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(self, name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def open(self, port=None, json_path=None, host="127.0.0.1"):
+        self.json_path = json_path
+        self._active = True
+        if port:
+            self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+            self.server.daemon_threads = True
+            self.server.registry = self
+            self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer")
+            self.thread.daemon = True
+            self.thread.start()
+            logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+
+    def close(self):
+        if not self._active:
+            return
+        if self.json_path:
+            try:
+                self.dump(self.json_path)
+            except OSError as e:
+                logger.error(f"Could not write metrics to {self.json_path}: {e}")
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+        self._active = False
+
+def proxy_label(proxy):
+    """host:port of a proxy URL, without its credentials."""
+    return urlsplit(proxy).netloc.rsplit("@", 1)[-1] if proxy else ""
+
+metrics = MetricsRegistry()
+
+requests_total = metrics.counter(
+    "api_requests_total", "HTTP attempts by endpoint, proxy and status (or exception name).",
+    ("endpoint", "proxy", "status")
+)
+request_seconds = metrics.histogram(
+    "api_request_seconds", "HTTP attempt latency by endpoint and proxy.", ("endpoint", "proxy")
+)
+retries_total = metrics.counter("api_retries_total", "Requests repeated by the client.", ("endpoint", "reason"))
+pages_per_id = metrics.histogram("pages_per_id", "Pages fetched per ID.", ("endpoint",), buckets=COUNT_BUCKETS)
+rows_written_total = metrics.counter("rows_written_total", "Rows written to the database.", ("table",))
+failures_total = metrics.counter("failures_total", "Failed IDs by reason.", ("table", "reason"))
+flush_seconds = metrics.histogram("flush_seconds", "Duration of buffered writer flushes.", ("writer",))
+queue_depth = metrics.gauge("queue_depth", "Items waiting in the pipeline queues.", ("queue",))
+
+# Endpoint whose request a thread (or task) is making, for the observers of an adapter
+# shared by several endpoints.
+current_endpoint = contextvars.ContextVar("current_endpoint", default="")
+
+@contextlib.contextmanager
+def endpoint_context(endpoint):
+    """Label the requests made inside the block with `endpoint`."""
+    token = current_endpoint.set(endpoint)
+    try:
+        yield
+    finally:
+        current_endpoint.reset(token)
+
+def retry_observer(endpoint=None):
+    """
+    ObservedRetry callback counting the retries urllib3 makes in retries_total.
+    Without an endpoint, retries are counted for current_endpoint.
+    """
+    def observe(reason):
+        retries_total.inc(endpoint=endpoint or current_endpoint.get(), reason=str(reason))
+    return observe
+
+def request_observer(endpoint=None):
+    """
+    Adapter observer (proxy, latency, status, error) recording request counts and latency.
+    Without an endpoint, requests are labelled with current_endpoint.
+    """
+    def observe(proxy, latency, status, error):
+        proxy = proxy_label(proxy)
+        label = endpoint or current_endpoint.get()
+        requests_total.inc(endpoint=label, proxy=proxy, status=status if status is not None else type(error).__name__)
+        request_seconds.observe(latency, endpoint=label, proxy=proxy)
+    return observe
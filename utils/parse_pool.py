@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import logging.handlers
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Key marking a page that was already turned into rows by the parse pool.
+PARSED_ROWS = "__rows__"
+# Key marking a page whose body is left for the parse pool to decode.
+PAGE_BODY = "__body__"
+
+_configs = {}
+
+def _install_configs(configs):
+    global _configs
+    _configs = configs
+    # The parent handles Ctrl-C and shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The parent's queue-backed log handlers have no listener in a forked child.
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+
+def _call(func, endpoint, args):
+    return func(*args, config=_configs[endpoint])
+
+def parsed_page(rows):
+    """Wraps rows from a parse pool so they can travel through the assembler and journal like a page."""
+    return {PARSED_ROWS: rows or []}
+
+def body_page(raw, enum_params):
+    """
+    Wraps a response body (or a batch result that is already decoded) so it travels
+    with the ID's other pages until the pool parses them.
+    """
+    return {PAGE_BODY: raw, "enum_params": enum_params}
+
+def parse_bodies(bodies, example_id, config=None):
+    """
+    Runs in a pool process: decodes (body, enum_params) pairs with the endpoint's
+    decode_function and runs its filter_func over all of them at once. Results of
+    batched requests arrive already decoded and are used as they are.
+    """
+    pages = [
+        raw if isinstance(raw, dict) else config["decode_function"](raw, example_id, enum_params, config)[0]
+        for raw, enum_params in bodies
+    ]
+    return config["filter_func"](pages, example_id, config)
+
+def split_bodies(pages):
+    """(bodies, other pages): the (body, enum_params) of pages left for the pool, and the rest."""
+    bodies = []
+    others = []
+    for page in pages:
+        if isinstance(page, dict) and PAGE_BODY in page:
+            bodies.append((page[PAGE_BODY], page["enum_params"]))
+        else:
+            others.append(page)
+    return bodies, others
+
+def split_parsed(pages):
+    """
+    Separates pages parsed by the pool from raw pages: returns (parts, raw_pages) where
+    parts holds each parsed page's rows (a list of dicts or a RecordBatch).
+    """
+    parts = []
+    raw_pages = []
+    for page in pages:
+        if isinstance(page, dict) and PARSED_ROWS in page:
+            parts.append(page[PARSED_ROWS])
+        else:
+            raw_pages.append(page)
+    return parts, raw_pages
+
+class ParsePool:
+    """
+    Process pool that decodes response bodies and runs filter_func outside the
+    I/O threads, so parsing large pages is not serialized by the GIL. All pages of
+    an ID go to a child in one task, so an ID costs one round trip however many
+    pages it has.
+
+    Endpoint configs are installed once in every child process; calls pass the
+    endpoint name and a module-level function that accepts a `config` keyword.
+    """
+
+    def __init__(self):
+        self.executor = None
+
+    @property
+    def active(self):
+        return self.executor is not None
+
+    def start(self, configs, processes=None):
+        """
+        Start the pool with {endpoint_name: config} for the endpoints it will parse.
+        Call before starting worker threads: the children are created right away so
+        they are not forked while other threads hold locks.
+        """
+        if self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_install_configs,
+            initargs=(configs,)
+        )
+        self.executor.submit(int).result()
+        logger.info(f"Parse pool started with {processes or os.cpu_count()} processes")
+
+    def run(self, func, endpoint, *args):
+        return self.executor.submit(_call, func, endpoint, args).result()
+
+    async def run_async(self, func, endpoint, *args):
+        return await asyncio.wrap_future(self.executor.submit(_call, func, endpoint, args))
+
+    def parse_pages(self, pages, example_id, endpoint):
+        """An ID's pages with the bodies left for the pool replaced by one page of parsed rows."""
+        bodies, pages = split_bodies(pages)
+        if not bodies:
+            return pages
+        return [parsed_page(self.run(parse_bodies, endpoint, bodies, example_id))] + pages
+
+    async def parse_pages_async(self, pages, example_id, endpoint):
+        bodies, pages = split_bodies(pages)
+        if not bodies:
+            return pages
+        return [parsed_page(await self.run_async(parse_bodies, endpoint, bodies, example_id))] + pages
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+# Shared by the sync and async clients; started by main.py with --parse-processes.
+parse_pool = ParsePool()
@@ -1,8 +1,33 @@
+import sys
 import threading
+import time
 from tqdm import tqdm
 
-class ProgressUpdater:
+class HeadlessBar:
+    """Stand-in for the tqdm bar when there is no terminal; only keeps the count."""
+
     def __init__(self, total):
+        self.total = total
+        self.n = 0
+
+    def update(self, n=1):
+        self.n += n
+
+    def close(self):
+        pass
+
+class ProgressUpdater:
+    """
+    Progress count plus the emoji counters shown as the bar's postfix.
+
+    update() and increment_meta() only add to counters owned by the calling thread,
+    so workers never wait on each other or on the terminal. A background thread sums
+    the per-thread counters and redraws the bar every `refresh` seconds. Without a
+    TTY on stderr (or with headless=True) tqdm is skipped and, given a logger, a
+    progress line is logged every `log_interval` seconds instead.
+    """
+
+    def __init__(self, total, headless=None, refresh=0.5, logger=None, log_interval=30.0):
         self.meta = {
             "🫸": 0,  # remaining in record queue
             "🙋": 0,  # requests
@@ -10,30 +35,103 @@ class ProgressUpdater:
             "❌": 0,  # failed
             "✍️": 0,  # written to DB
         }
-        self.progress_bar = tqdm(
-            total=total,
-            position=1,
-            ncols=130,
-            colour="green",
-            leave=False,
-            postfix=self.meta
-        )
+        if headless is None:
+            headless = not sys.stderr.isatty()
+        self.headless = headless
+        if headless:
+            self.progress_bar = HeadlessBar(total)
+        else:
+            self.progress_bar = tqdm(
+                total=total,
+                position=1,
+                ncols=130,
+                colour="green",
+                leave=False,
+                postfix=self.meta
+            )
+        self.refresh = refresh
+        self.logger = logger
+        self.log_interval = log_interval
+
         self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counters = []
+        self.values = {}
+        self.offsets = {}
+        self.counted = set()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ProgressRenderer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _counter(self):
+        counter = getattr(self.local, "counter", None)
+        if counter is None:
+            counter = self.local.counter = {}
+            with self.lock:
+                self.counters.append(counter)
+        return counter
 
     def update(self, n=1):
-        with self.lock:
-            self.progress_bar.update(n)
+        counter = self._counter()
+        counter[None] = counter.get(None, 0) + n
+
+    def increment_meta(self, key, increment=1):
+        counter = self._counter()
+        counter[key] = counter.get(key, 0) + increment
+        self.counted.add(key)
 
     def set_meta(self, key, value):
-        with self.lock:
-            self.meta[key] = value
-            self.progress_bar.set_postfix(**self.meta)
+        if key in self.counted:
+            # Increments made so far are folded into the new value.
+            with self.lock:
+                self.offsets[key] = self._sum(key)
+                self.values[key] = value
+        else:
+            self.values[key] = value
 
-    def increment_meta(self, key, increment=1):
+    def _sum(self, key):
+        return sum(counter.get(key, 0) for counter in list(self.counters))
+
+    def totals(self):
+        """Current (count, meta) from all threads' counters."""
         with self.lock:
-            self.meta[key] += increment
-            self.progress_bar.set_postfix(**self.meta)
+            counters = list(self.counters)
+            values = dict(self.values)
+            offsets = dict(self.offsets)
+        sums = {}
+        for counter in counters:
+            for key, value in list(counter.items()):
+                sums[key] = sums.get(key, 0) + value
+        meta = {
+            key: values.get(key, 0) + sums.get(key, 0) - offsets.get(key, 0)
+            for key in list(self.meta) + [key for key in values if key not in self.meta]
+        }
+        return sums.get(None, 0), meta
+
+    def _render(self):
+        n, meta = self.totals()
+        self.meta = meta
+        if n > self.progress_bar.n:
+            self.progress_bar.update(n - self.progress_bar.n)
+        if not self.headless:
+            self.progress_bar.set_postfix(**meta)
+
+    def _log(self):
+        total = f"/{self.progress_bar.total}" if self.progress_bar.total else ""
+        meta = " ".join(f"{key} {value}" for key, value in self.meta.items())
+        self.logger.info(f"Progress: {self.progress_bar.n}{total} {meta}")
+
+    def _run(self):
+        last_log = time.monotonic()
+        while not self.stop_event.wait(self.refresh):
+            self._render()
+            if self.headless and self.logger is not None and time.monotonic() - last_log >= self.log_interval:
+                self._log()
+                last_log = time.monotonic()
 
     def close(self):
-        with self.lock:
-            self.progress_bar.close()
+        self.stop_event.set()
+        self.thread.join()
+        self._render()
+        self.progress_bar.close()
@@ -0,0 +1,133 @@
+import logging
+import random
+import threading
+import time
+from utils.metrics import proxy_label
+
+logger = logging.getLogger("retry_logger")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ProxyState:
+    """Health of a single proxy."""
+
+    def __init__(self, url, ca_cert, initial_latency):
+        self.url = url
+        self.ca_cert = ca_cert
+        self.latency = initial_latency
+        self.success_rate = 1.0
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def snapshot(self):
+        return {
+            "proxy": proxy_label(self.url),
+            "state": self.state,
+            "latency": round(self.latency, 3),
+            "success_rate": round(self.success_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+class ProxyPool:
+    """
+    Health-aware proxy scheduler shared by every worker.
+
+    Keeps an EWMA of latency and success per proxy and picks proxies at random
+    weighted by success_rate / latency. A proxy with failure_threshold consecutive
+    failures (transport error, 429 or 5xx) is opened and skipped for cooldown seconds,
+    then half-opened: a single probe request decides whether it closes again.
+    observe() matches the adapter observer signature.
+    """
+
+    def __init__(
+            self,
+            proxies,
+            ca_cert=None,
+            alpha=0.2,
+            failure_threshold=5,
+            cooldown=30.0,
+            initial_latency=1.0,
+            min_latency=0.05
+    ):
+        if not proxies:
+            raise ValueError("Please provide a non-empty list of proxies.")
+
+        if all(isinstance(p, (list, tuple)) for p in proxies):
+            entries = proxies
+        else:
+            if ca_cert is None:
+                raise ValueError("When proxies is a list of strings, please provide a 'ca_cert'.")
+            entries = [(p, ca_cert) for p in proxies]
+
+        self.states = {url: ProxyState(url, crt, initial_latency) for url, crt in entries}
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_latency = min_latency
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Pick a proxy for the next request. Returns (proxy_url, ca_cert)."""
+        now = time.monotonic()
+        with self.lock:
+            candidates = []
+            for state in self.states.values():
+                if state.state == OPEN and now - state.opened_at >= self.cooldown:
+                    state.state = HALF_OPEN
+                    state.probing = False
+                if state.state == HALF_OPEN and not state.probing:
+                    state.probing = True
+                    logger.info(f"Probing proxy {proxy_label(state.url)} after cooldown")
+                    return state.url, state.ca_cert
+                if state.state == CLOSED:
+                    candidates.append(state)
+
+            if not candidates:
+                # Everything is ejected: fall back to the proxy that has rested the longest.
+                state = min(self.states.values(), key=lambda s: s.opened_at)
+                return state.url, state.ca_cert
+
+            weights = [s.success_rate / max(s.latency, self.min_latency) + 1e-6 for s in candidates]
+            state = random.choices(candidates, weights=weights)[0]
+            return state.url, state.ca_cert
+
+    def observe(self, proxy, latency, status, error=None):
+        """Update the proxy's health from one request outcome."""
+        failed = error is not None or status is None or status == 429 or status >= 500
+        with self.lock:
+            state = self.states.get(proxy)
+            if state is None:
+                return
+
+            state.requests += 1
+            state.latency += self.alpha * (latency - state.latency)
+            state.success_rate += self.alpha * ((0.0 if failed else 1.0) - state.success_rate)
+
+            if not failed:
+                if state.state != CLOSED:
+                    logger.info(f"Proxy {proxy_label(proxy)} recovered, closing circuit")
+                state.state = CLOSED
+                state.consecutive_failures = 0
+                state.probing = False
+                return
+
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.state == HALF_OPEN or state.consecutive_failures >= self.failure_threshold:
+                if state.state != OPEN:
+                    logger.warning(f"Ejecting proxy {proxy_label(proxy)} for {self.cooldown}s after {state.consecutive_failures} failures")
+                state.state = OPEN
+                state.opened_at = time.monotonic()
+                state.probing = False
+
+    def snapshot(self):
+        """Current health of every proxy, labelled without credentials."""
+        with self.lock:
+            return [state.snapshot() for state in self.states.values()]
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from utils.metrics import proxy_label
+
+logger = logging.getLogger("retry_logger")
+
+DEFAULT_RETRY_AFTER = 5.0
+MAX_RETRY_AFTER = 300.0
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second up to `capacity`.
+    Callers reserve a token and are told how long to wait for it, so waiting
+    happens outside the lock and works for both threads and coroutines.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        # While paused, `updated` is in the future and no tokens accrue until then.
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, tokens=1):
+        """Take `tokens` now and return the seconds to wait before using them."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+
+            delay = self.updated - now
+            if self.tokens < 0:
+                delay += -self.tokens / self.rate
+            return max(0.0, delay)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (e.g. from a Retry-After header), then restart from empty."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now + seconds > self.updated:
+                self.updated = now + seconds
+                self.tokens = min(self.tokens, 0.0)
+
+class RateLimiter:
+    """
+    Named token buckets shared by every worker. Keys without a configured bucket
+    are not rate limited, so acquire() can be called unconditionally, but they
+    still honour pauses.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.paused_until = {}
+        self.lock = threading.Lock()
+
+    def configure(self, key, rate, burst=None):
+        with self.lock:
+            self.buckets[key] = TokenBucket(rate, burst)
+        logger.info(f"Rate limiting {key} to {rate}/s (burst {burst or max(1, rate)})")
+
+    def reserve(self, key):
+        bucket = self.buckets.get(key)
+        if bucket:
+            return bucket.reserve()
+        return max(0.0, self.paused_until.get(key, 0.0) - time.monotonic())
+
+    def acquire(self, key):
+        """Block the calling thread until `key` allows one more request."""
+        delay = self.reserve(key)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, key):
+        """Coroutine version of acquire."""
+        delay = self.reserve(key)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, key, seconds):
+        bucket = self.buckets.get(key)
+        if bucket:
+            bucket.pause(seconds)
+            return
+        with self.lock:
+            self.paused_until[key] = max(self.paused_until.get(key, 0.0), time.monotonic() + seconds)
+
+def endpoint_bucket_key(name):
+    return f"endpoint:{name}"
+
+def proxy_bucket_key(proxy):
+    """Bucket of a proxy, keyed by host:port so its credentials never reach the logs."""
+    return f"proxy:{proxy_label(proxy)}"
+
+def parse_retry_after(value, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait from a Retry-After header given as seconds or an HTTP date."""
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return default
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+# Shared by the adapters and clients of every worker in the process.
+rate_limiter = RateLimiter()
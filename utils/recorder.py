@@ -0,0 +1,141 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = "responses-*.ndjson.gz"
+STAT_KEYS = {"begin": "attempts", "page": "pages", "end": "ids"}
+
+class ResponseRecorder:
+    """
+    Appends raw response bodies to gzip-compressed NDJSON segments, rotated once a
+    segment holds segment_bytes of uncompressed lines. Each page line carries the
+    endpoint, ID, enum params, request cursor and timestamp; an end line per ID marks
+    that all of its pages were recorded, so a replay can rebuild the ID's page list.
+    A begin line starts every attempt at an ID, so pages of an attempt that failed
+    and was retried are dropped on replay instead of being counted twice.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.segment_bytes = None
+        self.lock = threading.Lock()
+        self.file = None
+        self.written = 0
+        self.segment = 0
+        self.started = None
+        self.stats = {"attempts": 0, "pages": 0, "ids": 0, "segments": 0}
+
+    @property
+    def active(self):
+        return self.directory is not None
+
+    def open(self, directory, segment_bytes=64 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.started = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    def _write(self, record):
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with self.lock:
+            if self.file is None or self.written >= self.segment_bytes:
+                self._rotate()
+            self.file.write(line)
+            self.written += len(line)
+            self.stats[STAT_KEYS[record["type"]]] += 1
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+        self.segment += 1
+        # The PID keeps processes recording into one directory from sharing a name, and
+        # "x" refuses to overwrite a segment should they still collide.
+        path = os.path.join(self.directory, f"responses-{self.started}-{os.getpid()}-{self.segment:05d}.ndjson.gz")
+        self.file = gzip.open(path, "xb", compresslevel=5)
+        self.written = 0
+        self.stats["segments"] += 1
+
+    def begin(self, endpoint, example_id):
+        self._write({
+            "type": "begin",
+            "endpoint": endpoint,
+            "example_id": example_id,
+            "recorded_at": datetime.utcnow().isoformat(),
+        })
+
+    def page(self, endpoint, example_id, enum_params, cursor, body):
+        self._write({
+            "type": "page",
+            "endpoint": endpoint,
+            "example_id": example_id,
+            "enum_params": enum_params,
+            "cursor": cursor,
+            "recorded_at": datetime.utcnow().isoformat(),
+            "body": body.decode("utf-8") if isinstance(body, bytes) else body,
+        })
+
+    def end(self, endpoint, example_id, record_count):
+        self._write({
+            "type": "end",
+            "endpoint": endpoint,
+            "example_id": example_id,
+            "record_count": record_count,
+            "recorded_at": datetime.utcnow().isoformat(),
+        })
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.directory = None
+
+def iter_recorded(directory, endpoint):
+    """
+    Replays recorded segments in order, yielding (example_id, record_count, pages) per
+    ID of `endpoint`, where pages are (body, enum_params) tuples in recorded order.
+    A segment cut short by a crash is read up to its last complete line, IDs without
+    an end marker are skipped, and a begin marker discards the pages of the ID's
+    earlier, failed attempts.
+    """
+    pending = {}
+    run = None
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+        # Pages of an ID never span two runs; drop what an interrupted run left open.
+        segment_run = os.path.basename(path).rsplit("-", 1)[0]
+        if segment_run != run:
+            if pending:
+                logger.warning(f"{len(pending)} recorded IDs of {run} have no end marker and were skipped")
+            pending = {}
+            run = segment_run
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping truncated line in {path}")
+                        continue
+                    if record.get("endpoint") != endpoint:
+                        continue
+                    example_id = record["example_id"]
+                    if record["type"] == "begin":
+                        pending[example_id] = []
+                    elif record["type"] == "page":
+                        pending.setdefault(example_id, []).append((record["body"], record["enum_params"]))
+                    elif record["type"] == "end":
+                        yield example_id, record["record_count"], pending.pop(example_id, [])
+        except (EOFError, OSError, zlib.error) as e:
+            logger.warning(f"Segment {path} ends early: {e}")
+    if pending:
+        logger.warning(f"{len(pending)} recorded IDs of {run} have no end marker and were skipped")
+
+# Shared by the clients and workers; opened by main.py with --record.
+response_recorder = ResponseRecorder()
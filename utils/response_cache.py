@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+EVICTION_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+"""
+
+class ResponseCache:
+    """
+    On-disk cache of raw response bodies, keyed by a hash of the endpoint, persisted
+    query hash and canonical (key-sorted) variables. Bodies are zlib-compressed in
+    files named by that hash; an SQLite index tracks sizes and access times so entries
+    older than ttl are ignored and the least recently used are evicted beyond max_bytes.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.ttl = None
+        self.max_bytes = None
+        self.con = None
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @property
+    def active(self):
+        return self.con is not None
+
+    def open(self, directory, ttl=7 * 24 * 3600, max_bytes=1024 ** 3):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.con = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(SCHEMA)
+        self.total_bytes = self.con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        logger.info(f"Response cache at {directory} holds {self.total_bytes} bytes")
+
+    @staticmethod
+    def key(endpoint, query_hash, variables):
+        canonical = json.dumps([endpoint, query_hash, variables], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.z")
+
+    def get(self, key):
+        """The cached body for key, or None if it is missing or older than ttl."""
+        now = time.time()
+        with self.lock:
+            row = self.con.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[0] > self.ttl):
+                self.stats["misses"] += 1
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._delete(key)
+                self.stats["misses"] += 1
+                return None
+            with self.con:
+                self.con.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return body
+
+    def put(self, key, body):
+        compressed = zlib.compress(body)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self.lock:
+            previous = self.con.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            with self.con:
+                self.con.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, len(compressed), now, now)
+                )
+            self.total_bytes += len(compressed) - (previous[0] if previous else 0)
+            self.stats["stores"] += 1
+            if self.max_bytes and self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        row = self.con.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        with self.con:
+            self.con.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.total_bytes -= row[0]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Drop least recently used entries (expired ones first) until 90% of max_bytes,
+        looking them up EVICTION_BATCH at a time rather than loading every key.
+        """
+        target = self.max_bytes * 0.9
+        expired_before = time.time() - self.ttl if self.ttl else 0
+        while self.total_bytes > target:
+            rows = self.con.execute(
+                "SELECT key FROM entries ORDER BY created_at >= ?, accessed_at LIMIT ?",
+                (expired_before, EVICTION_BATCH)
+            ).fetchall()
+            if not rows:
+                break
+            for (key,) in rows:
+                if self.total_bytes <= target:
+                    break
+                self._delete(key)
+                self.stats["evictions"] += 1
+
+    def close(self):
+        if self.con is None:
+            return
+        with self.lock:
+            self.con.close()
+            self.con = None
+
+# Shared by the sync and async clients; opened by main.py with --cache-dir.
+response_cache = ResponseCache()
@@ -0,0 +1,144 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from http import HTTPStatus
+
+logger = logging.getLogger(__name__)
+
+# Worth asking again later; every other 4xx is a permanent answer.
+TRANSIENT_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+class FetchFailure(Exception):
+    """A request that produced no page. reason_code ends up in the failed table when dead-lettered."""
+
+    transient = False
+
+    def __init__(self, reason_code, message=""):
+        super().__init__(message or reason_code)
+        self.reason_code = reason_code
+
+class TransientFailure(FetchFailure):
+    transient = True
+
+class PermanentFailure(FetchFailure):
+    transient = False
+
+def status_reason(status):
+    try:
+        return f"{status} {HTTPStatus(status).phrase}"
+    except ValueError:
+        return str(status)
+
+def failure_for_status(status, message=""):
+    """TransientFailure for throttling, timeouts and 5xx; PermanentFailure for other HTTP errors."""
+    failure = TransientFailure if status in TRANSIENT_STATUSES else PermanentFailure
+    return failure(status_reason(status), message)
+
+class RetryScheduler:
+    """
+    Delay queue for work that failed transiently. schedule() puts the item back on its
+    queue after an exponential backoff with jitter, until max_attempts retries of the
+    same key have been made; then it returns None and the caller dead-letters the item.
+
+    `pending` counts retries that are waiting or were released but not yet finished
+    (workers call done() after every item), so workers can hold on to their sentinel
+    while a retry may still come through the queue.
+    """
+
+    def __init__(self):
+        self.max_attempts = 0
+        self.base_delay = 1.0
+        self.max_delay = 60.0
+        self.heap = []
+        self.sequence = itertools.count()
+        self.attempts = {}
+        self.released = {}
+        self.outstanding = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+        self.stats = {"scheduled": 0, "exhausted": 0, "dropped": 0}
+
+    @property
+    def active(self):
+        return self.thread is not None
+
+    @property
+    def pending(self):
+        return self.outstanding
+
+    def start(self, max_attempts=3, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="RetryScheduler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def delay(self, attempt):
+        """Exponential backoff with equal jitter: half the delay is fixed, half random."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def attempts_for(self, key):
+        return self.attempts.get(key, 0)
+
+    def schedule(self, key, item, target):
+        """Put item back on target after a backoff. Returns the attempt number, or None when the budget is spent."""
+        with self.condition:
+            attempt = self.attempts.get(key, 0) + 1
+            if not self.active or self.closed or attempt > self.max_attempts:
+                self.stats["exhausted"] += 1
+                return None
+            self.attempts[key] = attempt
+            due = time.monotonic() + self.delay(attempt)
+            heapq.heappush(self.heap, (due, next(self.sequence), key, item, target))
+            self.outstanding += 1
+            self.stats["scheduled"] += 1
+            self.condition.notify()
+        return attempt
+
+    def done(self, key):
+        """A worker finished an item; if it was a released retry it is no longer pending."""
+        if not self.outstanding:
+            return
+        with self.condition:
+            count = self.released.get(key, 0)
+            if not count:
+                return
+            if count == 1:
+                del self.released[key]
+            else:
+                self.released[key] = count - 1
+            self.outstanding -= 1
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.condition.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if self.closed:
+                    return
+                _, _, key, item, target = heapq.heappop(self.heap)
+                self.released[key] = self.released.get(key, 0) + 1
+            target.put(item)
+
+    def stop(self):
+        """Stop releasing retries; anything still waiting is dropped."""
+        if self.thread is None:
+            return
+        with self.condition:
+            self.closed = True
+            self.stats["dropped"] += len(self.heap)
+            self.heap.clear()
+            self.outstanding = 0
+            self.released.clear()
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+
+retry_scheduler = RetryScheduler()
@@ -0,0 +1,279 @@
+from abc import ABC, abstractmethod
+import datetime
+import itertools
+import json
+import logging
+import os
+import time
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.data_store import write_to_disk, write_to_duckdb, write_arrow_to_duckdb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "output"
+DEFAULT_FILE_BYTES = 128 * 1024 * 1024
+DEFAULT_FILE_AGE = 300.0
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+def date_partition(value):
+    """Partition transform for timestamps, as datetimes or ISO strings: the YYYY-MM-DD date."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def widen_nulls(schema):
+    """schema with columns typed null, which had no value in the rows it was inferred from, typed as strings."""
+    return pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+        for field in schema
+    ])
+
+class Sink(ABC):
+    """
+    Destination for the rows of one table. write() takes a list of row dicts or an
+    Arrow RecordBatch and returns True once the rows are stored; the writer journals
+    and counts only what was written.
+    """
+
+    name = "sink"
+
+    @abstractmethod
+    def write(self, rows):
+        """Stores rows; returns True once they are written."""
+
+    def finish_aged(self):
+        """Called by the writer's flusher while it has no rows, for sinks with time limits."""
+
+    def close(self):
+        pass
+
+class DuckDBSink(Sink):
+    """Inserts into an existing DuckDB table over the sink's own connection."""
+
+    name = "duckdb"
+
+    def __init__(self, connection_string, table_name, progress_updater):
+        self.table_name = table_name
+        self.progress_updater = progress_updater
+        self.con = duckdb.connect(connection_string)
+
+    def write(self, rows):
+        if isinstance(rows, pa.RecordBatch):
+            return write_arrow_to_duckdb(rows, self.table_name, self.con, self.progress_updater)
+        return write_to_duckdb(rows, self.table_name, self.con, self.progress_updater)
+
+    def close(self):
+        self.con.close()
+
+class RollingFileSink(Sink):
+    """
+    Appends rows to files under <path>/<table_name>/, one open file per partition.
+    partition_by maps a directory key to a column, or to (column, transform) as in
+    compile_spec, e.g. {"recorded_date": ("recorded_at", date_partition)}, giving
+    Hive-style <key>=<value>/ directories. A file is finished once it reaches
+    max_bytes or has been open for max_age seconds, checked on every write and by the
+    writer's flusher while it is idle. Files are written under an
+    .inprogress name and renamed when finished, so readers only see complete files;
+    names carry the process ID so several processes can write the same table.
+
+    Rows are converted to an Arrow table of `schema`, or of the schema inferred from
+    the first batch with its all-null columns typed as strings; later keys outside it
+    are dropped and missing ones are null. Rows that cannot be written are saved with
+    write_to_disk, as DuckDBSink does.
+    """
+
+    extension = ""
+
+    def __init__(
+            self,
+            path,
+            table_name,
+            progress_updater,
+            schema=None,
+            partition_by=None,
+            max_bytes=DEFAULT_FILE_BYTES,
+            max_age=DEFAULT_FILE_AGE
+    ):
+        self.root = os.path.join(path, table_name.replace(".", "_"))
+        self.table_name = table_name
+        self.progress_updater = progress_updater
+        self.schema = schema
+        self.partition_by = partition_by or {}
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sequence = itertools.count()
+        self.open_files = {}
+        self.files_written = 0
+        self.rows_written = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def to_table(self, rows):
+        if isinstance(rows, pa.RecordBatch):
+            table = pa.Table.from_batches([rows])
+        elif self.schema is None:
+            table = pa.Table.from_pylist(rows)
+        else:
+            return pa.Table.from_pylist(rows, schema=self.schema)
+
+        if self.schema is None:
+            self.schema = widen_nulls(table.schema)
+            widened = [name for name in table.column_names if pa.types.is_null(table.schema.field(name).type)]
+            if widened:
+                logger.warning(f"No values for {', '.join(widened)} in the first rows of {self.table_name}, writing them as strings; give the sink a schema to type them")
+        if not table.schema.equals(self.schema):
+            table = table.select(self.schema.names).cast(self.schema)
+        return table
+
+    def partitions(self, table):
+        """(directory, rows) for every partition present in table."""
+        if not self.partition_by:
+            yield "", table
+            return
+        columns = []
+        for spec in self.partition_by.values():
+            column, transform = spec if isinstance(spec, tuple) else (spec, None)
+            if column in table.column_names:
+                values = table.column(column).to_pylist()
+            else:
+                values = [None] * table.num_rows
+            if transform is not None:
+                values = [transform(value) if value is not None else None for value in values]
+            columns.append(values)
+
+        groups = {}
+        for index, key in enumerate(zip(*columns)):
+            groups.setdefault(key, []).append(index)
+        for key, indices in groups.items():
+            directory = os.path.join(*(
+                f"{name}={NULL_PARTITION if value is None else str(value).replace('/', '_')}"
+                for name, value in zip(self.partition_by, key)
+            ))
+            yield directory, table.take(indices)
+
+    def write(self, rows):
+        try:
+            table = self.to_table(rows)
+            for directory, part in self.partitions(table):
+                current = self.open_files.get(directory) or self._open(directory)
+                self._append(current, part)
+                current["bytes"] = os.path.getsize(current["temp_path"])
+                if current["bytes"] >= self.max_bytes:
+                    self._finish(directory)
+            self.finish_aged()
+        except (OSError, pa.ArrowException, ValueError) as e:
+            logger.error(f"Error writing {len(rows)} rows to {self.root}: {e}")
+            write_to_disk(rows.to_pylist() if isinstance(rows, pa.RecordBatch) else rows, self.table_name)
+            return False
+
+        self.rows_written += table.num_rows
+        self.progress_updater.increment_meta("✍️", table.num_rows)
+        logger.info(f"Wrote {table.num_rows} records to {self.root} (Total: {self.rows_written})")
+        return True
+
+    def _open(self, directory):
+        folder = os.path.join(self.root, directory)
+        os.makedirs(folder, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(folder, f"part-{stamp}-{os.getpid()}-{next(self.sequence):05d}.{self.extension}")
+        current = {
+            "path": path,
+            "temp_path": path + ".inprogress",
+            "opened": time.monotonic(),
+            "bytes": 0,
+        }
+        current["handle"] = self._open_handle(current["temp_path"])
+        self.open_files[directory] = current
+        return current
+
+    def _finish(self, directory):
+        current = self.open_files.pop(directory)
+        current["handle"].close()
+        os.replace(current["temp_path"], current["path"])
+        self.files_written += 1
+        logger.debug(f"Finished {current['path']} ({current['bytes']} bytes)")
+
+    def finish_aged(self):
+        """Finish the files open for max_age seconds, even when no rows arrive for them."""
+        if not self.max_age:
+            return
+        now = time.monotonic()
+        for directory, current in list(self.open_files.items()):
+            if now - current["opened"] >= self.max_age:
+                self._finish(directory)
+
+    def close(self):
+        for directory in list(self.open_files):
+            try:
+                self._finish(directory)
+            except (OSError, pa.ArrowException) as e:
+                logger.error(f"Error finishing {directory or self.root}: {e}")
+        if self.files_written:
+            logger.info(f"Wrote {self.rows_written} rows for {self.table_name} to {self.files_written} files under {self.root}")
+
+    @abstractmethod
+    def _open_handle(self, path):
+        """Opens the file at path for writing and returns its handle."""
+
+    @abstractmethod
+    def _append(self, current, table):
+        """Appends table to the open file described by current."""
+
+class ParquetSink(RollingFileSink):
+    """Rolling Parquet files, one row group per write, compressed with `compression` (zstd)."""
+
+    name = "parquet"
+    extension = "parquet"
+
+    def __init__(self, *args, compression="zstd", **kwargs):
+        self.compression = compression
+        super().__init__(*args, **kwargs)
+
+    def _open_handle(self, path):
+        return pq.ParquetWriter(path, self.schema, compression=self.compression)
+
+    def _append(self, current, table):
+        current["handle"].write_table(table)
+
+class NDJSONSink(RollingFileSink):
+    """Rolling newline-delimited JSON files, one object per row."""
+
+    name = "ndjson"
+    extension = "ndjson"
+
+    def _open_handle(self, path):
+        return open(path, "w", encoding="utf-8")
+
+    def _append(self, current, table):
+        handle = current["handle"]
+        handle.writelines(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in table.to_pylist())
+        handle.flush()
+
+SINKS = {
+    "duckdb": DuckDBSink,
+    "parquet": ParquetSink,
+    "ndjson": NDJSONSink,
+}
+
+def make_sink(config, table_name, connection_string, progress_updater):
+    """
+    The sink an endpoint's "sink" setting asks for, for one of its tables, e.g.
+    {"type": "parquet", "path": "output", "partition_by": {...}, "max_bytes": ...}.
+    Without one, rows go to DuckDB. The endpoint's arrow_schema is used for its
+    results table.
+    """
+    options = dict(config.get("sink") or {})
+    kind = options.pop("type", "duckdb")
+    if kind not in SINKS:
+        raise ValueError(f"Unknown sink: {kind}")
+    if kind == "duckdb":
+        return DuckDBSink(connection_string, table_name, progress_updater)
+    schema = config.get("arrow_schema") if table_name == config["table_name"] else None
+    return SINKS[kind](
+        options.pop("path", DEFAULT_PATH),
+        table_name,
+        progress_updater,
+        schema=schema,
+        **options
+    )
@@ -1,13 +1,64 @@
 import logging
-from queue import Empty
-import duckdb
+from queue import Empty, Full
+import pyarrow as pa
 import time
 from datetime import datetime
-from utils.data_store import write_to_duckdb, write_to_disk
+from utils.data_store import ArrowBatchBuilder, write_to_disk
+from utils.sinks import make_sink
 from utils.http_retry import requests_retry_session
+from utils.buffered_writer import DoubleBufferedWriter
+from utils.parse_pool import parse_pool, body_page, split_parsed
+from utils.recorder import response_recorder, iter_recorded
+from utils.metrics import metrics, endpoint_context, request_observer, retry_observer, pages_per_id, rows_written_total, failures_total, retries_total
+from utils.retry_scheduler import retry_scheduler, FetchFailure
 
 logger = logging.getLogger(__name__)
 
+def id_feeder(
+        id_source,
+        record_queue,
+        num_sentinels,
+        terminate_flag,
+        progress_updater,
+        sentinel
+):
+    """
+    Streams IDs from id_source into the bounded record_queue, blocking while it is
+    full, then adds one sentinel per consumer. Sources yield IDs in order and
+    DuckDBIdSource already drops duplicates in its query, so an ID is only compared
+    with the one before it to skip repeats, without remembering every ID fed.
+    """
+    fed = 0
+    duplicates = 0
+    previous = None
+    try:
+        for item in id_source:
+            if item[0] == previous:
+                duplicates += 1
+                continue
+            previous = item[0]
+            while not terminate_flag.is_set():
+                try:
+                    record_queue.put(item, timeout=1)
+                    break
+                except Full:
+                    continue
+            if terminate_flag.is_set():
+                break
+            fed += 1
+            if fed % 1000 == 0:
+                progress_updater.set_meta("🫸", record_queue.qsize())
+    except Exception as e:
+        logger.error(f"Error reading IDs: {e}")
+
+    logger.info(f"Fed {fed} IDs to the workers")
+    if duplicates:
+        logger.info(f"Skipped {duplicates} duplicate IDs")
+    if not terminate_flag.is_set():
+        for _ in range(num_sentinels):
+            record_queue.put(sentinel)
+    return fed
+
 def writer_thread(
         result_queue,
         record_queue,
@@ -19,39 +70,334 @@ def writer_thread(
         writer_terminate_flag,
         progress_updater,
         sentinel,
+        journal=None,
+        flush_rows=None,
+        flush_bytes=None,
+        flush_age=None
 ):
     """
     Single thread responsible for aggregating data from result_queue and writing it to DuckDB.
+    Rows are double-buffered: the DuckDB insert runs on a background flusher while this thread
+    keeps draining result_queue into the other buffer. A buffer is flushed at flush_rows rows
+    (default min(thread * batch_size // 2, max_records)), flush_bytes estimated bytes or once
+    its oldest row is flush_age seconds old.
+    Endpoints that declare an "arrow_schema" are aggregated into typed columns and written as
+    Arrow record batches. Rows go to the endpoint's sink (DuckDB unless its "sink" setting picks
+    Parquet or NDJSON files), written from the flusher thread. With a CheckpointJournal, the IDs
+    in every successfully written batch are marked as completed.
     """
-    aggregated_batch = []
-    aggregation_threshold = min(thread * batch_size // 2, max_records)
-    con_writer = duckdb.connect(connection_string)
+    if config.get("arrow_schema") is not None:
+        new_buffer = lambda: ArrowBatchBuilder(config["arrow_schema"])
+    else:
+        new_buffer = list
+    if not flush_rows:
+        flush_rows = min(thread * batch_size // 2, max_records) if max_records else thread * batch_size // 2
+    sink = make_sink(config, config["table_name"], connection_string, progress_updater)
+    buffered = DoubleBufferedWriter(
+        lambda buffer: flush_batch(buffer, config, sink, progress_updater, journal),
+        new_buffer,
+        flush_rows,
+        max_bytes=flush_bytes,
+        max_age=flush_age,
+        name=f"{config['name']}Flusher",
+        # Rolling files past their max_age are finished even when no rows come in.
+        on_idle=sink.finish_aged
+    )
 
     while True:
         try:
-            batch = result_queue.get(timeout=3)
+            batch = result_queue.get(timeout=buffered.time_until_due())
             if batch is sentinel:
                 result_queue.task_done()
                 break
             progress_updater.increment_meta("🤔", len(batch))
-            aggregated_batch.extend(batch)
+            if isinstance(batch, pa.RecordBatch) and config.get("arrow_schema") is None:
+                batch = batch.to_pylist()
+            buffered.add(batch)
             result_queue.task_done()
         except Empty:
-            continue
+            buffered.maybe_swap()
         except Exception as e:
             logger.error(f"Error in writer thread: {e}")
 
-        if len(aggregated_batch) >= aggregation_threshold:
-            write_to_duckdb(aggregated_batch, config["table_name"], con_writer, progress_updater)
-            progress_updater.increment_meta("🤔", -len(aggregated_batch))
-            aggregated_batch.clear()
+    buffered.close()
+    sink.close()
+
+def arrow_rows(builder, config):
+    """
+    The builder's rows as one RecordBatch. Rows with a value that does not fit the
+    arrow_schema (say "12k" in an int64 column) would fail the whole batch, so the IDs
+    they belong to are backed up with write_to_disk and the rest is returned (None
+    when nothing is left).
+    """
+    try:
+        return builder.to_record_batch()
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        record_batch, rejected = builder.split_invalid(config.get("id_column", "item_id"))
+        logger.error(f"{len(rejected)} rows do not fit the schema of {config['table_name']}, backing them up: {e}")
+        write_to_disk(rejected, config["table_name"])
+        return record_batch
+
+def flush_batch(aggregated_batch, config, sink, progress_updater, journal=None):
+    """
+    Writes the aggregated rows to the sink and journals them. Workers only hand over
+    complete IDs, so every ID in a written batch is finished.
+    """
+    id_column = config.get("id_column", "item_id")
+    if isinstance(aggregated_batch, ArrowBatchBuilder):
+        rows = arrow_rows(aggregated_batch, config)
+        written = rows is not None and sink.write(rows)
+        example_ids = rows.column(id_column).to_pylist() if written and journal is not None else []
+    else:
+        rows = aggregated_batch
+        written = sink.write(rows)
+        example_ids = [row[id_column] for row in rows] if written and journal is not None else []
+
+    if written:
+        rows_written_total.inc(len(rows), table=config["table_name"])
+    if written and journal is not None:
+        journal.mark_completed(set(example_ids))
+        journal.record_batch(config["table_name"], len(rows))
+    progress_updater.increment_meta("🤔", -len(aggregated_batch))
+    aggregated_batch.clear()
+
+def collect_results(
+        resp_data,
+        example_id,
+        record_count,
+        config,
+        local_batch,
+        batch_size,
+        result_queue,
+        failure_queue,
+        progress_updater
+):
+    """
+    Runs the endpoint's filter_func over all pages of an ID and adds the rows to
+    local_batch, handing it to the writer once it reaches batch_size. With the parse
+    pool running, the ID's bodies are parsed there in one task and contribute their
+    rows directly. RecordBatches from columnar parsers are gathered the same way and
+    combined when handed over.
+    """
+    if response_recorder.active:
+        response_recorder.end(config["name"], example_id, record_count)
+    pages_per_id.observe(len(resp_data or []), endpoint=config["name"])
+
+    if not resp_data:
+        logger.error(f"No data returned for ID {example_id} with {record_count} records")
+        return
+
+    if parse_pool.active:
+        resp_data = parse_pool.parse_pages(resp_data, example_id, config["name"])
+    parts, raw_pages = split_parsed(resp_data)
+    if raw_pages:
+        parts.append(config["filter_func"](raw_pages, example_id, config))
+    parts = [part for part in parts if part is not None and len(part)]
+    if not parts:
+        format_failed(
+            example_id=example_id,
+            reason_code="No Data",
+            error_message="No data returned",
+            table_name=config["table_name"],
+            failure_queue=failure_queue,
+            progress_updater=progress_updater
+        )
+        logger.error(f"Filtering failed for {example_id} with {record_count} records")
+        return
+
+    for part in parts:
+        if isinstance(part, pa.RecordBatch):
+            local_batch.append(part)
+        else:
+            local_batch.extend(part)
+    if buffered_rows(local_batch) >= batch_size:
+        hand_off(local_batch, result_queue)
+
+def buffered_rows(local_batch):
+    """
+    Rows in local_batch, which holds row dicts or, for an endpoint with a columnar
+    parser, one RecordBatch per ID.
+    """
+    if local_batch and isinstance(local_batch[0], pa.RecordBatch):
+        return sum(part.num_rows for part in local_batch)
+    return len(local_batch)
+
+def hand_off(local_batch, result_queue):
+    """
+    Puts the rows gathered in local_batch on result_queue and empties it. RecordBatches
+    are combined into one, so the writer gets an item per batch_size rows either way.
+    """
+    batches = [part for part in local_batch if isinstance(part, pa.RecordBatch)]
+    rows = [part for part in local_batch if not isinstance(part, pa.RecordBatch)]
+    if batches:
+        for batch in pa.Table.from_batches(batches).combine_chunks().to_batches():
+            result_queue.put(batch)
+    if rows:
+        result_queue.put(rows)
+    local_batch.clear()
+
+def replay_worker(
+        directory,
+        result_queue,
+        failure_queue,
+        batch_size,
+        config,
+        terminate_flag,
+        progress_updater
+):
+    """
+    Feeds responses recorded by a ResponseRecorder through the endpoint's decode_function
+    and collect_results, so parsing and writing run at disk speed without the network.
+    """
+    local_batch = []
+    replayed = 0
+    for example_id, record_count, pages in iter_recorded(directory, config["name"]):
+        if terminate_flag.is_set():
+            break
+        try:
+            progress_updater.update(1)
+            resp_data = []
+            for body, enum_params in pages:
+                if parse_pool.active:
+                    resp_data.append(body_page(body, enum_params))
+                    continue
+                data, _ = config["decode_function"](body, example_id, enum_params, config)
+                resp_data.append(data)
+            collect_results(
+                resp_data,
+                example_id,
+                record_count,
+                config,
+                local_batch,
+                batch_size,
+                result_queue,
+                failure_queue,
+                progress_updater
+            )
+            replayed += 1
+        except Exception as e:
+            logger.error(f"Error replaying ID {example_id}: {e}")
+
+    hand_off(local_batch, result_queue)
+    logger.info(f"Replayed {replayed} IDs from {directory}")
 
-    if aggregated_batch:
-        write_to_duckdb(aggregated_batch, config["table_name"], con_writer, progress_updater)
-        progress_updater.increment_meta("🤔", -len(aggregated_batch))
-        aggregated_batch.clear()
+def schedule_retry(failure, key, item, target_queue, config):
+    """
+    Schedules a transient failure to be put back on target_queue after a backoff.
+    Returns False when it is permanent or out of attempts.
+    """
+    if not failure.transient:
+        return False
+    attempt = retry_scheduler.schedule(key, item, target_queue)
+    if attempt is None:
+        return False
+    retries_total.inc(endpoint=config["name"], reason=failure.reason_code)
+    logger.warning(f"{failure.reason_code} for {key}, retry {attempt} scheduled")
+    return True
 
-    con_writer.close()
+def dead_letter(failure, key, example_id, config, failure_queue, progress_updater):
+    """Writes a failure that will not be retried to the failed table."""
+    message = str(failure)
+    if failure.transient:
+        message = f"{failure} (gave up after {retry_scheduler.attempts_for(key) + 1} attempts)"
+    format_failed(
+        example_id=example_id,
+        reason_code=failure.reason_code,
+        error_message=message,
+        table_name=config["table_name"],
+        failure_queue=failure_queue,
+        progress_updater=progress_updater
+    )
+
+def retry_or_dead_letter(failure, key, item, target_queue, config, failure_queue, progress_updater):
+    """
+    Schedules a transient failure to be put back on target_queue after a backoff, or
+    writes it to the failed table once it is permanent or out of attempts. Returns
+    True if the item will be retried.
+    """
+    if schedule_retry(failure, key, item, target_queue, config):
+        return True
+    dead_letter(failure, key, item[0], config, failure_queue, progress_updater)
+    return False
+
+def request_observers(config, controller=None):
+    """
+    Observers for a worker's HTTP session: the concurrency controller and request
+    metrics. Without a config, requests are labelled with the endpoint_context they
+    are made in, for sessions shared by several endpoints.
+    """
+    observers = [controller.observe] if controller is not None else []
+    if metrics.active:
+        observers.append(request_observer(config["name"] if config else None))
+    return observers or None
+
+def take_batch(record_queue, first, size, sentinel):
+    """
+    first plus up to size - 1 more items that are already waiting on record_queue.
+    A sentinel met on the way is put back for the next read.
+    """
+    items = [first]
+    while len(items) < size:
+        try:
+            item = record_queue.get_nowait()
+        except Empty:
+            break
+        if item is sentinel:
+            record_queue.put(sentinel)
+            record_queue.task_done()
+            break
+        items.append(item)
+    return items
+
+def process_batch(
+        items,
+        record_queue,
+        session,
+        config,
+        local_batch,
+        batch_size,
+        result_queue,
+        failure_queue,
+        progress_updater
+):
+    """
+    Fetches several IDs at once with the endpoint's batch_function and hands every ID's
+    pages to collect_results, or its failure to retry_or_dead_letter.
+    """
+    for example_id, _ in items:
+        progress_updater.increment_meta("🙋", 1)
+        if not retry_scheduler.attempts_for(example_id):
+            progress_updater.update(1)
+    try:
+        outcomes = config["batch_function"](items, config, session=session)
+    except Exception as e:
+        logger.error(f"Error processing a batch of {len(items)} IDs: {e}")
+        outcomes = {}
+
+    for item in items:
+        example_id, record_count = item
+        try:
+            outcome = outcomes.get(example_id)
+            if isinstance(outcome, FetchFailure):
+                retry_or_dead_letter(outcome, example_id, item, record_queue, config, failure_queue, progress_updater)
+            else:
+                collect_results(
+                    outcome,
+                    example_id,
+                    record_count,
+                    config,
+                    local_batch,
+                    batch_size,
+                    result_queue,
+                    failure_queue,
+                    progress_updater
+                )
+        except Exception as e:
+            logger.error(f"Error processing ID {example_id}: {e}")
+        finally:
+            retry_scheduler.done(example_id)
+            record_queue.task_done()
+    progress_updater.set_meta("🫸", record_queue.qsize())
 
 def worker(
         record_queue,
@@ -63,64 +409,342 @@ def worker(
         terminate_flag,
         progress_updater,
         proxies,
-        sentinel
+        sentinel,
+        controller=None,
+        worker_index=0,
+        adapter=None
 ):
     """
     Each worker processes items from the record_queue for a single endpoint.
+    With an AdaptiveConcurrencyController the worker parks while worker_index is
+    above the controller's current limit. Given a shared adapter (see
+    shared_proxy_adapter) the worker's session uses its connection pools.
+    Endpoints with "batch_operations" take up to that many queued IDs at a time
+    and fetch them through their batch_function.
     """
     time.sleep(1)
-    session = requests_retry_session(proxies=proxies)
+    session = requests_retry_session(
+        proxies=proxies,
+        observers=request_observers(config, controller),
+        adapter=adapter,
+        on_retry=retry_observer(config["name"])
+    )
     local_batch = []
 
     while not terminate_flag.is_set():
+        if controller is not None:
+            controller.wait_for_slot(worker_index, terminate_flag)
+            if terminate_flag.is_set():
+                break
+
         try:
             item = record_queue.get(timeout=3)
         except Empty:
             continue
 
         if item is sentinel:
+            if retry_scheduler.pending:
+                # A retry can still come through the queue; keep the sentinel behind it.
+                record_queue.put(sentinel)
+                record_queue.task_done()
+                time.sleep(0.2)
+                continue
             record_queue.task_done()
             progress_updater.set_meta("🫸", record_queue.qsize())
+            if controller is not None:
+                controller.drain()
             break
 
+        if config.get("batch_operations"):
+            items = take_batch(record_queue, item, config["batch_operations"], sentinel)
+            process_batch(
+                items,
+                record_queue,
+                session,
+                config,
+                local_batch,
+                batch_size,
+                result_queue,
+                failure_queue,
+                progress_updater
+            )
+            continue
+
         example_id, record_count = item
 
         try:
             progress_updater.increment_meta("🙋", 1)
-            progress_updater.update(1)
+            if not retry_scheduler.attempts_for(example_id):
+                progress_updater.update(1)
             resp_data = config["get_function"](example_id, record_count, config, session=session)
+            collect_results(
+                resp_data,
+                example_id,
+                record_count,
+                config,
+                local_batch,
+                batch_size,
+                result_queue,
+                failure_queue,
+                progress_updater
+            )
+        except FetchFailure as e:
+            retry_or_dead_letter(e, example_id, item, record_queue, config, failure_queue, progress_updater)
+        except Exception as e:
+            logger.error(f"Error processing ID {example_id}: {e}")
+        finally:
+            retry_scheduler.done(example_id)
+            record_queue.task_done()
+            progress_updater.set_meta("🫸", record_queue.qsize())
+
+    hand_off(local_batch, result_queue)
+
+def multi_worker(
+        fair_queue,
+        routes,
+        batch_size,
+        terminate_flag,
+        progress_updater,
+        sentinel,
+        controller=None,
+        worker_index=0,
+        adapter=None
+):
+    """
+    Worker shared by several endpoints. Takes (endpoint, item, charge) from a FairQueue,
+    fetches each with its endpoint's get_function, and routes rows and failures to the
+    endpoint's own result and failure queues. `routes` maps endpoint name to {"config",
+    "result_queue", "failure_queue"}. Every endpoint goes through the one shared adapter,
+    with requests labelled for metrics by endpoint_context. Retries go back to the
+    endpoint's lane, and the time spent on every item is reported to the FairQueue so
+    endpoints share the workers by weight.
+    """
+    time.sleep(1)
+    session = requests_retry_session(adapter=adapter)
+    local_batches = {name: [] for name in routes}
+
+    while not terminate_flag.is_set():
+        if controller is not None:
+            controller.wait_for_slot(worker_index, terminate_flag)
+            if terminate_flag.is_set():
+                break
+
+        try:
+            got = fair_queue.get(timeout=3)
+        except Empty:
+            continue
+
+        if got is sentinel:
+            if retry_scheduler.pending:
+                time.sleep(0.2)
+                continue
+            if controller is not None:
+                controller.drain()
+            break
+
+        name, item, charge = got
+        route = routes[name]
+        config = route["config"]
+        example_id, record_count = item
+        key = (name, example_id)
+        start = time.monotonic()
+
+        try:
+            progress_updater.increment_meta("🙋", 1)
+            if not retry_scheduler.attempts_for(key):
+                progress_updater.update(1)
+            with endpoint_context(name):
+                resp_data = config["get_function"](example_id, record_count, config, session=session)
+            collect_results(
+                resp_data,
+                example_id,
+                record_count,
+                config,
+                local_batches[name],
+                batch_size,
+                route["result_queue"],
+                route["failure_queue"],
+                progress_updater
+            )
+        except FetchFailure as e:
+            retry_or_dead_letter(e, key, item, fair_queue.lane(name), config, route["failure_queue"], progress_updater)
+        except Exception as e:
+            logger.error(f"Error processing {name} ID {example_id}: {e}")
+        finally:
+            retry_scheduler.done(key)
+            fair_queue.task_done(name, charge, time.monotonic() - start)
+            progress_updater.set_meta("🫸", fair_queue.qsize())
 
-            if not resp_data:
-                logger.error(f"No data returned for ID {example_id} with {record_count} records")
+    for name, local_batch in local_batches.items():
+        hand_off(local_batch, routes[name]["result_queue"])
+
+def fanout_worker(
+        record_queue,
+        unit_queue,
+        assembler,
+        result_queue,
+        failure_queue,
+        batch_size,
+        config,
+        connection_string,
+        terminate_flag,
+        progress_updater,
+        proxies,
+        sentinel,
+        controller=None,
+        worker_index=0,
+        journal=None,
+        adapter=None
+):
+    """
+    Worker for endpoints with "fanout" enabled. Instead of fetching a whole ID, it
+    splits the ID into pagination chains (config["plan_function"]) and fetches one
+    page at a time (config["page_function"]), scheduling every other chain and every
+    follow-up page on the shared unit_queue so idle workers can pick them up.
+    unit_queue is drained before new IDs are taken, so started IDs finish first.
+    The worker that completes an ID's last chain runs filter_func on all its pages,
+    unless one of its chains failed: then the ID is dead-lettered once and none of
+    its rows are written.
+    With a CheckpointJournal every page and its endCursor is journaled, and a resumed
+    journal's pages are reloaded so chains continue from their last cursor.
+    """
+    time.sleep(1)
+    session = requests_retry_session(
+        proxies=proxies,
+        observers=request_observers(config, controller),
+        adapter=adapter,
+        on_retry=retry_observer(config["name"])
+    )
+    local_batch = []
+
+    while not terminate_flag.is_set():
+        if controller is not None:
+            controller.wait_for_slot(worker_index, terminate_flag)
+            if terminate_flag.is_set():
+                break
+
+        try:
+            unit = unit_queue.get_nowait()
+        except Empty:
+            unit = None
+
+        if unit is None:
+            try:
+                item = record_queue.get(timeout=0.2)
+            except Empty:
                 continue
 
-            filtered = config["filter_func"](resp_data, example_id, config)
-            if not filtered:
-                format_failed(
-                    example_id=example_id,
-                    reason_code="No Data",
-                    error_message="No data returned",
-                    table_name=config["table_name"],
-                    failure_queue=failure_queue,
-                    progress_updater=progress_updater
+            if item is not sentinel:
+                example_id, record_count = item
+                try:
+                    progress_updater.update(1)
+                    chains = config["plan_function"](example_id, record_count, config)
+                    assembler.start(example_id, record_count, len(chains))
+                    saved = journal.load_pages(example_id) if journal is not None and journal.resumed else {}
+                    for chain, enum_params in enumerate(chains):
+                        pages, cursor = saved.get(chain, ([], None))
+                        for data in pages:
+                            assembler.add_page(example_id, chain, data)
+                        if not pages or cursor:
+                            unit_queue.put((example_id, record_count, chain, enum_params, cursor))
+                            continue
+                        # Chain was fully paginated before the interruption.
+                        resp_data = assembler.finish_chain(example_id)
+                        if resp_data is not None:
+                            collect_results(
+                                resp_data,
+                                example_id,
+                                record_count,
+                                config,
+                                local_batch,
+                                batch_size,
+                                result_queue,
+                                failure_queue,
+                                progress_updater
+                            )
+                except Exception as e:
+                    logger.error(f"Error planning ID {example_id}: {e}")
+                finally:
+                    record_queue.task_done()
+                    progress_updater.set_meta("🫸", record_queue.qsize())
+                continue
+
+            if not len(assembler):
+                record_queue.task_done()
+                progress_updater.set_meta("🫸", record_queue.qsize())
+                if controller is not None:
+                    controller.drain()
+                break
+
+            # Other workers still have chains in flight that may schedule more pages,
+            # so leave the sentinel for later and wait for one of those pages instead.
+            record_queue.put(sentinel)
+            record_queue.task_done()
+            try:
+                unit = unit_queue.get(timeout=0.2)
+            except Empty:
+                continue
+
+        example_id, record_count, chain, enum_params, cursor = unit
+        next_cursor = None
+        try:
+            # Another chain of the ID failed: nothing of it will be written.
+            if not assembler.failed(example_id):
+                progress_updater.increment_meta("🙋", 1)
+                page = config["page_function"](
+                    example_id,
+                    record_count,
+                    config,
+                    session=session,
+                    enum_params=enum_params,
+                    cursor=cursor
                 )
-                logger.error(f"Filtering failed for {example_id} with {record_count} records")
+                if page is not None:
+                    data, next_cursor = page
+                    page_no = assembler.add_page(example_id, chain, data)
+                    if page_no is None:
+                        next_cursor = None
+                    elif journal is not None:
+                        journal.record_page(example_id, chain, page_no, enum_params, next_cursor, data)
+        except FetchFailure as e:
+            # A retried unit keeps its chain open in the assembler until it comes back.
+            if schedule_retry(e, (example_id, chain), unit, unit_queue, config):
+                retry_scheduler.done((example_id, chain))
                 continue
+            # The first chain to fail dead-letters the ID; the others only close.
+            if assembler.fail(example_id):
+                dead_letter(e, (example_id, chain), example_id, config, failure_queue, progress_updater)
+            next_cursor = None
+        except Exception as e:
+            logger.error(f"Error processing ID {example_id} chain {chain}: {e}")
+            # Left unwritten and unjournaled, so a resumed run fetches it again.
+            assembler.fail(example_id)
+            next_cursor = None
+        retry_scheduler.done((example_id, chain))
 
-            local_batch.extend(filtered)
-            if len(local_batch) >= batch_size:
-                result_queue.put(local_batch.copy())
-                local_batch.clear()
+        if next_cursor:
+            unit_queue.put((example_id, record_count, chain, enum_params, next_cursor))
+            continue
 
+        resp_data = assembler.finish_chain(example_id)
+        if resp_data is None:
+            continue
+        try:
+            collect_results(
+                resp_data,
+                example_id,
+                record_count,
+                config,
+                local_batch,
+                batch_size,
+                result_queue,
+                failure_queue,
+                progress_updater
+            )
         except Exception as e:
             logger.error(f"Error processing ID {example_id}: {e}")
-        finally:
-            record_queue.task_done()
-            progress_updater.set_meta("🫸", record_queue.qsize())
 
-    if local_batch:
-        result_queue.put(local_batch.copy())
-        local_batch.clear()
+    hand_off(local_batch, result_queue)
 
 def failure_worker(
         failure_queue,
@@ -131,14 +755,16 @@ def failure_worker(
         connection_string,
         failure_terminate_flag,
         progress_updater,
-        sentinel
+        sentinel,
+        journal=None
 ):
     """
-    Stores failure records in a global dictionary and writes to DuckDB.
+    Stores failure records in a global dictionary and writes them to the endpoint's sink.
+    With a CheckpointJournal, written failures are marked as completed so a resumed run skips them.
     """
     failed_aggregated_batch = []
     failed_threshold = min(batch_size, max_records)
-    con_failure_worker = duckdb.connect(connection_string)
+    sink = make_sink(config, config["failed_table"], connection_string, progress_updater)
 
     while True:
         try:
@@ -152,35 +778,33 @@ def failure_worker(
         except Empty:
             if failure_terminate_flag.is_set():
                 break
+            try:
+                sink.finish_aged()
+            except Exception as e:
+                logger.error(f"Error finishing aged files of {config['failed_table']}: {e}")
             continue
         except Exception as e:
             logger.error(f"Error in failure_worker: {e}")
 
         if len(failed_aggregated_batch) >= failed_threshold:
-            write_to_duckdb(
-                failed_aggregated_batch,
-                config["failed_table"],
-                con_failure_worker,
-                progress_updater
-            )
+            written = sink.write(failed_aggregated_batch)
+            if written and journal is not None:
+                journal.mark_completed([f["example_id"] for f in failed_aggregated_batch], status="failed")
             failed_aggregated_batch.clear()
 
     if failed_aggregated_batch:
-        time.sleep(5)
-        write_to_duckdb(
-            failed_aggregated_batch,
-            config["failed_table"],
-            con_failure_worker,
-            progress_updater
-        )
+        written = sink.write(failed_aggregated_batch)
+        if written and journal is not None:
+            journal.mark_completed([f["example_id"] for f in failed_aggregated_batch], status="failed")
         failed_aggregated_batch.clear()
-    con_failure_worker.close()
+    sink.close()
 
 def format_failed(example_id, reason_code, error_message, table_name, failure_queue, progress_updater):
     """
     Format failed record before sending to failure worker.
     """
     progress_updater.increment_meta("❌", 1)
+    failures_total.inc(table=table_name, reason=reason_code)
 
     failure_data = {
         "example_id": example_id,